@@ -0,0 +1,117 @@
+"""
+Benchmark: ad-hoc article dicts vs ArticleRecord in the research graph.
+
+Measures memory per article and the per-node costs that the dict version
+paid on every step: copying feed metadata into the scraped article entry and
+re-parsing ISO date strings when formatting the response.
+
+Usage:
+    python -m benchmarks.bench_article_records [--articles 10000] [--text-chars 0]
+"""
+import argparse
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from dateutil import parser as date_parser
+
+from src.schemas.article_record import ArticleRecord
+
+SOURCES = ["elpais.com", "eluniversal.com.mx", "bbc.com", "reuters.com", "milenio.com"]
+
+def metadata_fields(i: int):
+    published = datetime(2025, 6, 5) - timedelta(minutes=i)
+    return {
+        "title": f"Titular de la noticia número {i} sobre economía",
+        "link": f"https://news.google.com/rss/articles/CBMi{i:08d}",
+        "description": f"Descripción breve de la noticia {i}",
+        "published": published,
+        "url": f"https://www.{SOURCES[i % len(SOURCES)]}/seccion/noticia-{i}",
+    }
+
+def build_dicts(n: int, text: str):
+    metadata = []
+    for i in range(n):
+        f = metadata_fields(i)
+        metadata.append({"title": f["title"], "link": f["link"], "pubDate": f["published"].isoformat(), "description": f["description"]})
+    return [
+        {"title": m["title"], "url": metadata_fields(i)["url"], "description": m["description"], "text": text, "date": m["pubDate"],
+         "summary": {"title": m["title"], "url": metadata_fields(i)["url"], "bullet_summary": "* uno\n* dos"},
+         "topics": ["economía"], "bias": "center", "bias_explanation": "Equilibrado"}
+        for i, m in enumerate(metadata)
+    ]
+
+def build_records(n: int, text: str):
+    records = []
+    for i in range(n):
+        f = metadata_fields(i)
+        record = ArticleRecord(title=f["title"], url=f["link"], description=f["description"], published=f["published"])
+        record = record.with_page(f["url"], text)
+        record.summary = "* uno\n* dos"
+        record.topics = ["economía"]
+        record.bias = "center"
+        record.bias_explanation = "Equilibrado"
+        records.append(record)
+    return records
+
+def measure_memory(build, n, text):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    items = build(n, text)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return items, size / n
+
+def format_dicts(articles):
+    summaries = []
+    for article in articles:
+        lines = article["summary"]["bullet_summary"].strip().split("\n")
+        summaries.append({
+            "title": article["summary"]["title"],
+            "url": article["summary"]["url"],
+            "bullets": [line.strip("* ").strip() for line in lines if line.startswith("*")],
+            "date": date_parser.parse(article.get("date", "missing")),
+            "topics": article.get("topics"),
+            "bias": article.get("bias"),
+            "bias_explanation": article.get("bias_explanation"),
+        })
+    summaries.sort(key=lambda x: x["date"], reverse=True)
+    return summaries
+
+def format_records(records):
+    return [record.to_summary() for record in sorted(records, key=lambda r: r.published or datetime.min, reverse=True)]
+
+def copy_dicts(articles):
+    return [{"title": a["title"], "url": a["url"], "description": a["description"], "text": a["text"], "date": a["date"]} for a in articles]
+
+def copy_records(records):
+    return [record.with_page(record.url, record.text) for record in records]
+
+def timed(fn, items, runs=5):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(items)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=10000)
+    parser.add_argument("--text-chars", type=int, default=0, help="Article text size (shared string, excluded from per-article cost)")
+    args = parser.parse_args()
+    text = "x" * args.text_chars
+
+    dicts, dict_bytes = measure_memory(build_dicts, args.articles, text)
+    records, record_bytes = measure_memory(build_records, args.articles, text)
+    print(f"{args.articles} articles")
+    print(f"memory per article: dict {dict_bytes:.0f} B, record {record_bytes:.0f} B ({dict_bytes / record_bytes:.2f}x)")
+
+    for name, dict_fn, record_fn in (("format_results", format_dicts, format_records), ("scrape copy", copy_dicts, copy_records)):
+        dict_time = timed(dict_fn, dicts)
+        record_time = timed(record_fn, records)
+        print(f"{name}: dict {dict_time * 1e3:.1f} ms, record {record_time * 1e3:.1f} ms ({dict_time / record_time:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: thread-only vs process-pool HTML parsing in the research agent.
+
+Simulates 20 large article pages whose download has a fixed network latency
+and compares end-to-end throughput of iter_scraped_articles when parsing runs
+on the download threads versus the shared parsing process pool.
+
+Usage:
+    python -m benchmarks.bench_html_parsing [--pages 20] [--paragraphs 20000] [--latency 0.3] [--workers 4]
+"""
+import argparse
+import os
+import time
+from unittest.mock import Mock, patch
+
+from src.nodes import research_nodes
+from src.schemas.article_record import ArticleRecord
+from src.services.process_pool import get_process_pool, shutdown_process_pools
+
+def build_page(index: int, paragraphs: int) -> bytes:
+    """Build a large HTML page with nested markup."""
+    body = "".join(
+        f"<div class='p'><p>Párrafo {i} del artículo {index} con <b>texto</b> y <a href='#'>enlaces</a>.</p></div>"
+        for i in range(paragraphs)
+    )
+    return f"<html><head><title>Articulo {index}</title></head><body>{body}</body></html>".encode()
+
+def run(pages, latency, download_workers, parse_pool):
+    metadata = [
+        ArticleRecord(title=f"Articulo {i}", url=f"https://news.google.com/{i}")
+        for i in range(len(pages))
+    ]
+
+    def fake_get(url, headers=None, timeout=None):
+        time.sleep(latency)
+        response = Mock()
+        response.status_code = 200
+        response.content = pages[int(url.rsplit("/", 1)[1])]
+        return response
+
+    with patch.object(research_nodes, "gnewsdecoder", lambda link: {"decoded_url": link.replace("news.google.com", "example.com")}), \
+         patch.object(research_nodes.requests, "get", fake_get):
+        start = time.perf_counter()
+        results = list(research_nodes.iter_scraped_articles(metadata, download_workers, parse_pool))
+        elapsed = time.perf_counter() - start
+    assert all(article for article, _ in results)
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--latency", type=float, default=0.3, help="Simulated download latency (s)")
+    parser.add_argument("--download-workers", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Parsing processes")
+    args = parser.parse_args()
+
+    pages = [build_page(i, args.paragraphs) for i in range(args.pages)]
+    size_mb = sum(len(p) for p in pages) / 1e6
+    print(f"{args.pages} pages, {size_mb:.1f} MB of HTML, {args.latency}s latency, {args.download_workers} download threads")
+
+    os.environ["HTML_PARSER_WORKERS"] = "0"
+    thread_only = run(pages, args.latency, args.download_workers, None)
+
+    pool = get_process_pool("html_parsing", args.workers)
+    # Warm up the pool so worker start-up is not billed to the run
+    list(pool.map(len, ["warm-up"] * args.workers))
+    pooled = run(pages, args.latency, args.download_workers, pool)
+    shutdown_process_pools()
+
+    for label, elapsed in (("thread-only", thread_only), (f"pool ({args.workers} procs)", pooled)):
+        print(f"{label:>18}: {elapsed:6.2f}s  {args.pages / elapsed:6.2f} pages/s  {size_mb / elapsed:6.1f} MB/s")
+    print(f"speed-up: {thread_only / pooled:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: per-task latency and cost of the light vs heavy Bedrock models.
+
+Runs a representative prompt for each routed task against both tiers and
+reports median latency, token usage and estimated cost per call (prices from
+src/config/model_routing.json). Requires AWS credentials with Bedrock access.
+
+Usage:
+    python -m benchmarks.bench_model_tiering --light <model-id> --heavy <model-id> [--runs 3] [--tasks select_top_urls,state_of_art]
+"""
+import argparse
+import statistics
+import time
+
+from langchain_aws import ChatBedrockConverse
+
+from src.services.model_router import model_router
+
+ARTICLES = "\n".join(
+    f"https://example.com/noticia-{i}\nResumen breve de la noticia {i} sobre el precio de los combustibles en México."
+    for i in range(10)
+)
+ARTICLE_TEXT = " ".join(
+    ["La Secretaría de Energía anunció nuevas medidas para estabilizar el precio de la gasolina."] * 40
+)
+
+# Representative prompts, one per routed task
+TASK_PROMPTS = {
+    "select_top_urls": f"Based on the user news query 'precio gasolina' reply with a list of up to 3 relevant urls.\n{ARTICLES}",
+    "bias_analysis": f"Classify the political bias of this article as center, left, right or humor and return JSON with topics, bias and bias_explanation.\n{ARTICLE_TEXT}",
+    "intent_analysis": 'Analiza la consulta "ventas de diésel por cliente en 2024" y responde solo con JSON {"required_tables": [], "primary_intent": "", "required_fields": [], "confidence": 0.0}. Tablas: Vis_Ventas, vis_CarteraClientes, IngresosClientes.',
+    "article_summary": f"Create a * bulleted tl;dr summary of the article in Spanish.\n{ARTICLE_TEXT}",
+    "state_of_art": f"Redacta un informe de contexto en Markdown con panorama actual, tendencias, debates y conclusión.\n{ARTICLE_TEXT}",
+    "generate_response": "Basándote en estos resultados [{'cliente': 'A', 'total': 1200.5}, {'cliente': 'B', 'total': 980.0}] responde de manera clara: ¿quién compró más?",
+}
+
+def run_task(model_id, prompt, runs):
+    llm = ChatBedrockConverse(model=model_id, temperature=0)
+    latencies, input_tokens, output_tokens = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = llm.invoke(prompt)
+        latencies.append(time.perf_counter() - start)
+        usage = response.usage_metadata or {}
+        input_tokens.append(usage.get("input_tokens", 0))
+        output_tokens.append(usage.get("output_tokens", 0))
+
+    pricing = model_router.get_pricing(model_id)
+    cost = None
+    if pricing:
+        cost = (statistics.mean(input_tokens) * pricing["input"] + statistics.mean(output_tokens) * pricing["output"]) / 1000
+    return statistics.median(latencies), statistics.mean(input_tokens), statistics.mean(output_tokens), cost
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--light", required=True, help="Light-tier model ID")
+    parser.add_argument("--heavy", required=True, help="Heavy-tier model ID")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--tasks", default=",".join(TASK_PROMPTS))
+    args = parser.parse_args()
+
+    print(f"{'task':<18} {'tier':<6} {'model':<45} {'p50 s':>7} {'in tok':>7} {'out tok':>8} {'USD/call':>10}")
+    for task in args.tasks.split(","):
+        configured_tier = model_router.routing.get("tasks", {}).get(task, {}).get("tier", "?")
+        for tier, model_id in (("light", args.light), ("heavy", args.heavy)):
+            latency, tokens_in, tokens_out, cost = run_task(model_id, TASK_PROMPTS[task], args.runs)
+            marker = "*" if tier == configured_tier else " "
+            cost_text = f"{cost:.5f}" if cost is not None else "n/a"
+            print(f"{task:<18} {tier + marker:<6} {model_id:<45} {latency:7.2f} {tokens_in:7.0f} {tokens_out:8.0f} {cost_text:>10}")
+    print("* = tier currently routed for the task")
+
+if __name__ == "__main__":
+    main()
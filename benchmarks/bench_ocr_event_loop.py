@@ -0,0 +1,100 @@
+"""
+Benchmark: event-loop responsiveness during a large OCR batch.
+
+Uploads a batch of files to /ocragent/extract with Textract replaced by a
+blocking sleep, while a second client pings a trivial endpoint on the same
+event loop every --ping-interval seconds. Compares the async OCR path
+(blocking work on the OCR executor) with the previous behaviour of running
+OCR directly on the event loop.
+
+Usage:
+    python -m benchmarks.bench_ocr_event_loop [--files 16] [--ocr-latency 0.5] [--ping-interval 0.05]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+from langchain_core.language_models import FakeListChatModel
+
+from src.nodes import ocr_nodes
+from src.routers.auth_route import get_current_user
+from src.routers.ocr_agent import router as ocr_router
+from src.services import ocr_service
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(ocr_router, prefix="/ocragent")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(username="bench")
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+async def run(files: int, ocr_latency: float, ping_interval: float):
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        ping_latencies = []
+        done = asyncio.Event()
+
+        async def pinger():
+            # Latency is measured from when the ping was due, so time spent
+            # waiting for a blocked event loop is included
+            while not done.is_set():
+                due = time.perf_counter() + ping_interval
+                await asyncio.sleep(ping_interval)
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - due)
+
+        async def upload():
+            response = await client.post(
+                "/ocragent/extract",
+                files=[("files", (f"page{i}.png", b"\x89PNG fake", "image/png")) for i in range(files)],
+                data={"schema": json.dumps({"total": ["str", False, "Total"]})}
+            )
+            lines = [json.loads(line) for line in response.text.splitlines()]
+            assert len(lines) == files and all("structured" in line for line in lines), lines[:1]
+
+        ping_task = asyncio.create_task(pinger())
+        start = time.perf_counter()
+        await upload()
+        elapsed = time.perf_counter() - start
+        done.set()
+        await ping_task
+    return elapsed, ping_latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=16)
+    parser.add_argument("--ocr-latency", type=float, default=0.5, help="Simulated Textract time per file (s)")
+    parser.add_argument("--ping-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    def fake_ocr_document(image_bytes, doc_hash=None):
+        time.sleep(args.ocr_latency)
+        return {"lines": ["Total: 100"], "pages": [{"page": 1, "source": "textract", "chars": 10}]}
+
+    async def blocking_ocr_document_async(image_bytes, doc_hash=None):
+        # Previous behaviour: the SDK call runs on the event loop thread
+        return ocr_service.ocr_document(image_bytes)
+
+    print(f"{args.files} files, {args.ocr_latency}s OCR each")
+    for name, ocr_async in (("blocking", blocking_ocr_document_async), ("async", ocr_service.ocr_document_async)):
+        with patch.object(ocr_service, "ocr_document", fake_ocr_document), \
+             patch.object(ocr_nodes, "ocr_document_async", ocr_async), \
+             patch.object(ocr_nodes, "get_llm", lambda task: FakeListChatModel(responses=['{"total": "100"}'])):
+            elapsed, pings = asyncio.run(run(args.files, args.ocr_latency, args.ping_interval))
+        pings_ms = sorted(p * 1e3 for p in pings)
+        p95 = pings_ms[round(0.95 * (len(pings_ms) - 1))]
+        print(f"{name:>8}: batch {elapsed:.2f}s, {len(pings_ms)} pings, "
+              f"ping p50 {statistics.median(pings_ms):.1f} ms, p95 {p95:.1f} ms, max {pings_ms[-1]:.1f} ms")
+
+if __name__ == "__main__":
+    main()
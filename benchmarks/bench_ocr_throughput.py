@@ -0,0 +1,162 @@
+"""
+Benchmark: /ocragent/extract throughput against the local Textract stand-in.
+
+Runs three upload scenarios through the real router, OCR service and
+rasterizer, served by uvicorn on a local port (httpx's in-process ASGI
+transport buffers whole responses, which would hide streaming), with
+Textract replaced by LocalTextract (OCR_TEXTRACT_LOCAL) and the LLM by a
+fake:
+
+    single  one scanned PDF of --pages pages
+    multi   --files scanned PNGs, one result line per file
+    batch   the same PNGs with batch_mode, one result for all
+
+For each it reports pages per second, time until the first per-page
+progress event, per-file latency (time until each result line arrives),
+peak anonymous memory growth and event-loop lag, measured by a client
+pinging the same app every --ping-interval seconds.
+
+Usage:
+    python -m benchmarks.bench_ocr_throughput [--pages 12] [--files 12] [--latency-ms 800] [--tps 0]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import fitz
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from langchain_core.language_models import FakeListChatModel
+
+from benchmarks.bench_rasterization import scan_page
+from benchmarks.bench_upload_memory import PeakRss
+
+def build_app() -> FastAPI:
+    from src.routers.auth_route import get_current_user
+    from src.routers.ocr_agent import router as ocr_router
+
+    app = FastAPI()
+    app.include_router(ocr_router, prefix="/ocragent")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, username="bench")
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+def serve(app: FastAPI) -> str:
+    """Start uvicorn on a free local port in a background thread and return its URL"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+def build_fixtures(pages: int, files: int):
+    """A scanned PDF and scanned PNG pages, without text layers"""
+    doc = fitz.open()
+    for i in range(max(pages, files)):
+        scan_page(doc, 150 + i % 3)
+    pngs = [doc.load_page(i).get_pixmap(dpi=150, colorspace=fitz.csGRAY).tobytes("png") for i in range(files)]
+    doc.select(list(range(pages)))
+    pdf = doc.tobytes()
+    doc.close()
+    return pdf, pngs
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[round(fraction * (len(values) - 1))]
+
+async def run_scenario(base_url: str, files, batch_mode: bool, ping_interval: float):
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        lags = []
+        done = asyncio.Event()
+
+        async def pinger():
+            while not done.is_set():
+                due = time.perf_counter() + ping_interval
+                await asyncio.sleep(ping_interval)
+                await client.get("/ping")
+                lags.append(time.perf_counter() - due)
+
+        ping_task = asyncio.create_task(pinger())
+        start = time.perf_counter()
+        latencies, results, page_events = [], [], []
+        async with client.stream(
+            "POST", "/ocragent/extract", files=files,
+            data={"schema": json.dumps({"total": ["str", False, "Total"]}), "batch_mode": str(batch_mode).lower(), "progress": "true"}
+        ) as response:
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event.get("event") == "page":
+                    page_events.append(time.perf_counter() - start)
+                else:
+                    latencies.append(time.perf_counter() - start)
+                    results.append(event)
+        elapsed = time.perf_counter() - start
+        done.set()
+        await ping_task
+    assert all("error" not in result for result in results), results[:1]
+    pages = sum(len(result["pages"]) for result in results)
+    return elapsed, pages, page_events[0], latencies, lags
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=12)
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--latency-ms", type=float, default=800, help="Mean simulated Textract latency per call")
+    parser.add_argument("--tps", type=float, default=0, help="Simulated Textract rate limit (0 = none)")
+    parser.add_argument("--ping-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    os.environ.update({
+        "OCR_TEXTRACT_LOCAL": "true",
+        "OCR_TEXTRACT_LOCAL_LATENCY_MS": str(args.latency_ms),
+        "OCR_TEXTRACT_LOCAL_TPS": str(args.tps),
+        "OCR_CACHE_ENABLED": "false",
+    })
+    from src.nodes import ocr_nodes
+    from src.services import aws_clients, ocr_service
+    aws_clients.reset_clients()
+    # Start the preprocessing workers up front so the first scenario is not billed for them
+    pool = ocr_service.get_preprocess_pool()
+    if pool is not None:
+        list(pool.map(ocr_service.preprocess_image, [b""] * 4))
+
+    pdf, pngs = build_fixtures(args.pages, args.files)
+    scenarios = [
+        ("single", [("files", ("scan.pdf", pdf, "application/pdf"))], False),
+        ("multi", [("files", (f"page{i}.png", png, "image/png")) for i, png in enumerate(pngs)], False),
+        ("batch", [("files", (f"page{i}.png", png, "image/png")) for i, png in enumerate(pngs)], True),
+    ]
+    base_url = serve(build_app())
+    print(f"Local Textract: {args.latency_ms:.0f} ms/call, tps limit {args.tps or 'none'}")
+    with patch.object(ocr_nodes, "get_llm", lambda task: FakeListChatModel(responses=['{"total": "100"}'])):
+        for name, files, batch_mode in scenarios:
+            with PeakRss() as peak:
+                elapsed, pages, first_page, latencies, lags = asyncio.run(run_scenario(base_url, files, batch_mode, args.ping_interval))
+            lags_ms = [lag * 1e3 for lag in lags]
+            print(
+                f"{name:>6}: {pages} pages in {elapsed:.2f}s ({pages / elapsed:.1f} pages/s), first page {first_page:.2f}s, "
+                f"file latency p50 {statistics.median(latencies):.2f}s max {max(latencies):.2f}s, "
+                f"peak RSS +{peak.growth()['RssAnon'] / 1024:.0f} MB, "
+                f"loop lag p95 {percentile(lags_ms, 0.95):.1f} ms max {max(lags_ms):.1f} ms"
+            )
+    print(f"Textract calls: {aws_clients.get_textract_client().stats}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark: OCR image preprocessing throughput by process pool size.
+
+Preprocesses a mix of skewed scanned PDF pages (rasterize, deskew, encode)
+and rotated phone photos (EXIF rotation, downscale, grayscale, deskew) on
+the calling thread and in the preprocessing pool with 1, 2, 4 and 8
+workers, reporting pages per second and the speed-up over the thread.
+Speed-ups flatten out at the number of available cores.
+
+Usage:
+    python -m benchmarks.bench_preprocessing [--pages 16] [--photos 8] [--workers 1 2 4 8]
+"""
+import argparse
+import io
+import time
+
+import fitz
+from PIL import Image, ImageDraw, ImageFont
+
+from src.services import ocr_service
+from src.services.process_pool import available_cpus, get_process_pool, shutdown_process_pools
+
+def skewed_text_image(width: int, height: int, angle: float, seed: int) -> Image.Image:
+    """A page of text lines, rotated like a crooked scan"""
+    img = Image.new("L", (width, height), 245)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=max(12, height // 70))
+    for i, y in enumerate(range(height // 12, height - height // 12, height // 45)):
+        draw.text((width // 12, y), f"Concepto {seed}-{i}  Cantidad 3  Importe $1,250.00  IVA 16%", fill=20, font=font)
+    return img.rotate(angle, resample=Image.BICUBIC, fillcolor=245)
+
+def build_work(pages: int, photos: int):
+    """(function, bytes) preprocessing jobs as ocr_service submits them"""
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        scan = skewed_text_image(1700, 2200, angle=(i % 5) - 2, seed=i)  # 200 dpi letter page
+        buffer = io.BytesIO()
+        scan.save(buffer, format="PNG")
+        page.insert_image(page.rect, stream=buffer.getvalue())
+    work = [(ocr_service.rasterize_pdf_page, ocr_service._extract_page(doc, i)) for i in range(pages)]
+    doc.close()
+    for i in range(photos):
+        photo = skewed_text_image(4032, 3024, angle=1.5, seed=100 + i).convert("RGB")
+        exif = Image.Exif()
+        exif[ocr_service.EXIF_ORIENTATION] = 6  # Taken with the phone held upright
+        buffer = io.BytesIO()
+        photo.save(buffer, format="JPEG", quality=90, exif=exif)
+        work.append((ocr_service.preprocess_image, buffer.getvalue()))
+    return work
+
+def run(work, pool=None):
+    start = time.perf_counter()
+    if pool is None:
+        results = [fn(data) for fn, data in work]
+    else:
+        results = [future.result() for future in [pool.submit(fn, data) for fn, data in work]]
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(len(result) for result in results)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=16, help="Skewed scanned PDF pages")
+    parser.add_argument("--photos", type=int, default=8, help="12 MP phone photos with EXIF rotation")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    work = build_work(args.pages, args.photos)
+    items = len(work)
+    input_mb = sum(len(data) for _, data in work) / 1e6
+    print(f"{args.pages} scanned pages + {args.photos} photos ({input_mb:.1f} MB in), {available_cpus()} cores available")
+
+    baseline, output_bytes = run(work)
+    print(f"{'thread':>10}: {baseline:6.2f}s  {items / baseline:6.2f} pages/s  ({output_bytes / 1e6:.1f} MB out)")
+    for workers in args.workers:
+        pool = get_process_pool("ocr_preprocessing", workers)
+        # Warm up every worker so start-up and imports are not billed to the run
+        list(pool.map(ocr_service.preprocess_image, [b""] * workers * 2))
+        elapsed, _ = run(work, pool)
+        shutdown_process_pools()
+        print(f"{workers:>2} workers: {elapsed:6.2f}s  {items / elapsed:6.2f} pages/s  speed-up {baseline / elapsed:.2f}x")
+
+if __name__ == "__main__":
+    main()
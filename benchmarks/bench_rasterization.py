@@ -0,0 +1,76 @@
+"""
+Benchmark: page rasterization for Textract.
+
+Renders synthetic pages with the previous settings (default 72 dpi RGB PNG)
+and with the adaptive rasterizer, reporting payload size, pixel dimensions
+and render time per page type.
+
+Usage:
+    python -m benchmarks.bench_rasterization [--runs 3]
+"""
+import argparse
+import random
+import time
+
+import fitz
+
+from src.services import ocr_service
+
+def scan_page(doc, dpi: int, color: bool = False):
+    """A page holding one scanned image at the given resolution"""
+    page = doc.new_page()
+    width, height = int(page.rect.width / 72 * dpi), int(page.rect.height / 72 * dpi)
+    pix = fitz.Pixmap(fitz.csRGB if color else fitz.csGRAY, fitz.IRect(0, 0, width, height), False)
+    pix.clear_with(245)
+    rng = random.Random(dpi)
+    # Dark strokes standing in for lines of text
+    for row in range(height // 40, height - height // 20, max(1, height // 50)):
+        for col in range(width // 10, width - width // 10, max(1, width // 60)):
+            if rng.random() < 0.7:
+                shade = (20, 20, 90) if color and row % 3 == 0 else (20, 20, 20)
+                pix.set_rect(fitz.IRect(col, row, col + width // 80, row + height // 150), shade if color else shade[:1])
+    page.insert_image(page.rect, pixmap=pix)
+
+def text_page(doc, fontsize: float):
+    page = doc.new_page()
+    y = 72
+    while y < page.rect.height - 72:
+        page.insert_text((72, y), "Concepto 0042  Cantidad 3  Importe $1,250.00  IVA 16%", fontsize=fontsize)
+        y += fontsize * 1.6
+
+def legacy_rasterize(doc, page_num: int) -> bytes:
+    return doc.load_page(page_num).get_pixmap().tobytes("png")
+
+def timed(fn, doc, page_num, runs):
+    best, data = float("inf"), None
+    for _ in range(runs):
+        start = time.perf_counter()
+        data = fn(doc, page_num)
+        best = min(best, time.perf_counter() - start)
+    return data, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    doc = fitz.open()
+    pages = [
+        ("scan 300dpi gray", lambda: scan_page(doc, 300)),
+        ("scan 200dpi color", lambda: scan_page(doc, 200, color=True)),
+        ("text 12pt", lambda: text_page(doc, 12)),
+        ("text 6pt", lambda: text_page(doc, 6)),
+    ]
+    for _, build in pages:
+        build()
+
+    for page_num, (name, _) in enumerate(pages):
+        results = []
+        for fn in (legacy_rasterize, ocr_service._rasterize_page):
+            data, seconds = timed(fn, doc, page_num, args.runs)
+            pix = fitz.Pixmap(data)
+            results.append(f"{len(data) / 1024:7.0f} KiB {pix.width}x{pix.height} n={pix.n} {seconds * 1e3:5.0f} ms")
+        print(f"{name:>18}: legacy {results[0]} | adaptive {results[1]}")
+
+if __name__ == "__main__":
+    main()
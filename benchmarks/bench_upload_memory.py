@@ -0,0 +1,156 @@
+"""
+Benchmark: peak memory of one /ocragent/extract request with large PDFs.
+
+Each mode runs in a fresh subprocess and reports how much resident memory
+grew over the request, split into anonymous memory (heap, buffers) and
+file-backed pages (memory-mapped PDFs, which the kernel can drop and
+re-read at will). "spooled" is the endpoint as shipped: uploads
+are copied to temporary files, PDFs are memory-mapped and each file is
+released after its OCR. "buffered" reproduces the previous router, which
+read every upload into memory up front and held it for the whole request.
+Textract and the LLM are stubbed; the PDFs have text layers, so no pages
+are rasterized and the numbers reflect upload handling only.
+
+Usage:
+    python -m benchmarks.bench_upload_memory [--files 8] [--pages 4] [--image-mb 3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import fitz
+import httpx
+from fastapi import FastAPI, File, UploadFile
+from langchain_core.language_models import FakeListChatModel
+
+def build_pdf(path: str, pages: int, image_mb: float):
+    """Pages with a text layer and an incompressible image, like scanned-and-OCRed PDFs"""
+    side = int((image_mb * 1024 * 1024 / 3) ** 0.5)
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        pix = fitz.Pixmap(fitz.csRGB, side, side, os.urandom(side * side * 3), False)
+        page.insert_image(page.rect, pixmap=pix)
+        page.insert_text((72, 72), f"Factura {i + 1}: concepto, cantidad, importe y total a pagar")
+    doc.save(path)
+    doc.close()
+
+def build_app(mode: str) -> FastAPI:
+    from src.routers.auth_route import get_current_user
+    from src.routers.ocr_agent import router as ocr_router
+    from src.services import ocr_service
+
+    app = FastAPI()
+    app.include_router(ocr_router, prefix="/ocragent")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(username="bench")
+
+    @app.post("/buffered")
+    async def buffered(files: list[UploadFile] = File(...)):
+        # Previous behaviour: every upload held in memory for the whole request
+        contents = [await file.read() for file in files]
+        results = [ocr_service.ocr_document(content)["pages"] for content in contents]
+        return {"files": len(results)}
+
+    return app
+
+def rss_kb() -> dict:
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    return {name: int(fields[name].split()[0]) for name in ("RssAnon", "RssFile")}
+
+class PeakRss:
+    """Samples /proc/self/status in a thread and keeps the peak of each RSS field"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = rss_kb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for name, value in rss_kb().items():
+                self.peak[name] = max(self.peak[name], value)
+
+    def __enter__(self):
+        self.baseline = rss_kb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def growth(self) -> dict:
+        return {name: self.peak[name] - self.baseline[name] for name in self.peak}
+
+async def send(app: FastAPI, mode: str, paths: list):
+    handles = [open(path, "rb") for path in paths]
+    try:
+        files = [("files", (os.path.basename(path), handle, "application/pdf")) for path, handle in zip(paths, handles)]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            if mode == "spooled":
+                response = await client.post(
+                    "/ocragent/extract", files=files,
+                    data={"schema": json.dumps({"total": ["str", False, "Total"]})}
+                )
+                lines = [json.loads(line) for line in response.text.splitlines()]
+                assert len(lines) == len(paths) and all("structured" in line for line in lines), lines[:1]
+            else:
+                response = await client.post("/buffered", files=files)
+                assert response.status_code == 200, response.text
+    finally:
+        for handle in handles:
+            handle.close()
+
+def run_mode(mode: str, paths: list):
+    """Run one request in this process and print the peak RSS growth in KiB as JSON"""
+    os.environ["OCR_CACHE_ENABLED"] = "false"
+    from src.nodes import ocr_nodes
+    from src.services import ocr_service
+
+    app = build_app(mode)
+    with patch.object(ocr_service, "get_textract_client", lambda: None), \
+         patch.object(ocr_nodes, "get_llm", lambda task: FakeListChatModel(responses=['{"total": "100"}'])):
+        with PeakRss() as peak:
+            asyncio.run(send(app, mode, paths))
+    print(json.dumps(peak.growth()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--image-mb", type=float, default=3)
+    parser.add_argument("--mode", choices=["spooled", "buffered"], help=argparse.SUPPRESS)
+    parser.add_argument("paths", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.paths)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"doc{i}.pdf") for i in range(args.files)]
+        for path in paths:
+            build_pdf(path, args.pages, args.image_mb)
+        total_mb = sum(os.path.getsize(path) for path in paths) / 1024 / 1024
+        print(f"{args.files} PDFs, {total_mb:.0f} MB uploaded")
+        for mode in ("buffered", "spooled"):
+            output = subprocess.run(
+                [sys.executable, "-W", "ignore", "-m", "benchmarks.bench_upload_memory", "--mode", mode, *paths],
+                capture_output=True, text=True, check=True
+            ).stdout
+            growth = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:>9}: peak RSS growth anonymous {growth['RssAnon'] / 1024:.0f} MB, "
+                  f"file-backed {growth['RssFile'] / 1024:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,12 @@ from src.nodes.research_nodes import (
     format_results,
     articles_text_decision,   
     extract_topics_bias,
-    state_of_art
+    state_of_art,
+    retrieve_known_articles,
+    known_articles_decision,
+    store_processed_articles,
+    metadata_decision,
+    summarize_headlines
 )
 
 class ResearchAgent():
@@ -24,18 +29,37 @@ class ResearchAgent():
         # Add Nodes to Graph
         #workflow.add_node("generate_params",generate_newsapi_params)
         workflow.add_node("generate_params",generate_rss_feed_url)
+        workflow.add_node("knowledge_base",retrieve_known_articles)
         workflow.add_node("fetch_metadata",retrieve_articles_metadata)
         workflow.add_node("articles_text",retrieve_articles_text)
+        workflow.add_node("headlines",summarize_headlines)
         workflow.add_node("top_urls",select_top_urls)
         workflow.add_node("summarize",summarize_articles_parallel)
         workflow.add_node("format",format_results)
         workflow.add_node("analysis",extract_topics_bias)
         workflow.add_node("stateofart",state_of_art)
+        workflow.add_node("store",store_processed_articles)
         
         # Flow of the graph       
         workflow.add_edge(START,"generate_params")
-        workflow.add_edge("generate_params","fetch_metadata") 
-        workflow.add_edge("fetch_metadata", "articles_text")      
+        workflow.add_edge("generate_params","knowledge_base")
+        workflow.add_conditional_edges(
+            "knowledge_base",
+            known_articles_decision,
+            {
+                "not_enough_articles": "fetch_metadata",
+                "enough_articles": "summarize"
+            }
+        )
+        workflow.add_conditional_edges(
+            "fetch_metadata",
+            metadata_decision,
+            {
+                "scrape": "articles_text",
+                "fast": "headlines"
+            }
+        )
+        workflow.add_edge("headlines","stateofart")
         workflow.add_conditional_edges(
             "articles_text",
             articles_text_decision,
@@ -49,7 +73,8 @@ class ResearchAgent():
         workflow.add_edge("summarize","analysis")
         workflow.add_edge("analysis","stateofart")
         workflow.add_edge("stateofart","format")
-        workflow.add_edge("format",END)
+        workflow.add_edge("format","store")
+        workflow.add_edge("store",END)
 
         return workflow.compile()
     
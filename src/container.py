@@ -1,6 +1,5 @@
 from dependency_injector import containers, providers
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from langchain_aws import ChatBedrockConverse
 
 from .config import settings
 from .services.query_service import BigQueryService
@@ -8,6 +7,7 @@ from .services.schema_service import SchemaFactory
 from .services.streaming_service import StreamingService
 from .services.intent_service import IntentAnalysisService
 from .services.finance_orchestrator import FinanceQueryOrchestrator
+from .services.model_router import get_llm
 
 class Container(containers.DeclarativeContainer):
     """Dependency injection container"""
@@ -28,10 +28,15 @@ class Container(containers.DeclarativeContainer):
         expire_on_commit=False
     )
     
-    # LLM Client
+    # LLM Clients (routed per task, see config/model_routing.json)
     llm_client = providers.Singleton(
-        ChatBedrockConverse,
-        model_id=config.provided.reasoning_model
+        get_llm,
+        task="generate_response"
+    )
+    
+    intent_llm_client = providers.Singleton(
+        get_llm,
+        task="intent_analysis"
     )
     
     # Services
@@ -42,7 +47,7 @@ class Container(containers.DeclarativeContainer):
     
     intent_service = providers.Factory(
         IntentAnalysisService,
-        llm_client=llm_client
+        llm_client=intent_llm_client
     )
     
     # Orchestrators
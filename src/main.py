@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+import os
+from fastapi import Depends, FastAPI
 from contextlib import asynccontextmanager
 
 from src.routers.news_agent import router as news_agent_router
@@ -11,8 +12,11 @@ from src.routers.contexts import router as context_router
 from src.routers.finanzas import router as finanzas_router
 from src.routers.esquemas import router as esquemas_router
 from src.models.models import Base
-from src.routers.auth_route import router as auth_router
+from src.routers.auth_route import router as auth_router, require_admin
 from src.services.db_connection import engine
+from src.services.process_pool import shutdown_process_pools
+from src.metrics import metrics
+from src.middleware import RequestSizeLimitMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
@@ -28,6 +32,8 @@ async def lifespan(app:FastAPI):
     except Exception as e:
             print(f"Error al crear las tablas de usuarios: {e}")
     yield
+    # Stop the persistent worker pools (HTML parsing, etc.)
+    shutdown_process_pools()
 
 app = FastAPI(title="Sistema de Agentes Inteligentes Petroil",version="0.1",lifespan=lifespan)
 
@@ -42,6 +48,13 @@ app.include_router(rag_agent_router, prefix="/ragagent", tags=["Agents"])
 app.include_router(context_router,tags=["Context"])
 app.include_router(esquemas_router, prefix="/esquemas", tags=["Esquemas"])
 
+# OCR uploads are spooled to disk; cap what a single request can make us store
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_bytes=int(os.getenv("OCR_MAX_REQUEST_MB", 200)) * 1024 * 1024,
+    path_prefixes=("/ocragent/",)
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -67,4 +80,9 @@ def init_page():
 
 @app.get("/health")
 def health_check():
-    return {"message":"Agente Operativo"}
\ No newline at end of file
+    return {"message":"Agente Operativo"}
+
+@app.get("/metrics", tags=["Admin"])
+def metrics_report(admin = Depends(require_admin)):
+    """Internal counters and timings (client setup, etc.), for administrators only."""
+    return metrics.snapshot()
\ No newline at end of file
@@ -0,0 +1,29 @@
+from threading import Lock
+from typing import Dict
+
+class MetricsRegistry:
+    """Process-wide timings and counters (count, total, min, max, last per name)"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, value: float) -> None:
+        """Record one observation of a metric"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                self._metrics[name] = {"count": 1, "total": value, "min": value, "max": value, "last": value}
+            else:
+                metric["count"] += 1
+                metric["total"] += value
+                metric["min"] = min(metric["min"], value)
+                metric["max"] = max(metric["max"], value)
+                metric["last"] = value
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of all metrics recorded so far"""
+        with self._lock:
+            return {name: dict(metric) for name, metric in self._metrics.items()}
+
+metrics = MetricsRegistry()
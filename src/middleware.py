@@ -1,6 +1,6 @@
 import time
 import uuid
-from fastapi import Request, Response
+from fastapi import HTTPException, Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 import logging
@@ -55,4 +55,42 @@ class ExceptionHandlerMiddleware(BaseHTTPMiddleware):
             return JSONResponse(
                 status_code=500,
                 content={"detail": "Internal server error", "request_id": getattr(request.state, "request_id", None)}
-            )
\ No newline at end of file
+            )
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies larger than max_bytes with 413.
+
+    The declared Content-Length is checked up front, and the received body is
+    counted while it streams in, so oversized (or chunked) uploads are cut
+    off before they are fully read and spooled.
+    """
+
+    def __init__(self, app, max_bytes: int, path_prefixes: tuple = ("/",)):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefixes = path_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds the {self.max_bytes // (1024 * 1024)} MB limit"
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await JSONResponse(status_code=413, content={"detail": detail})(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside body parsing, so FastAPI answers with a 413
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
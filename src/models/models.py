@@ -1,4 +1,4 @@
-from sqlalchemy import Column,String,Integer,ForeignKey,Table,DateTime,Text,text
+from sqlalchemy import Column,String,Integer,ForeignKey,Table,DateTime,Text,text,JSON,Index,literal_column
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -50,4 +50,44 @@ class Esquema(Base):
     description=Column(Text, nullable=True)
     schema_data=Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=text("now()"))
-        
\ No newline at end of file
+
+# Text search configuration used by the article full-text index
+ARTICLE_SEARCH_CONFIG = "spanish"
+
+def search_vector(title, summary, body):
+    """tsvector expression over an article's title, summary and text."""
+    document = (
+        func.coalesce(title, literal_column("''"))
+        .op("||")(literal_column("' '"))
+        .op("||")(func.coalesce(summary, literal_column("''")))
+        .op("||")(literal_column("' '"))
+        .op("||")(func.coalesce(body, literal_column("''")))
+    )
+    return func.to_tsvector(literal_column(f"'{ARTICLE_SEARCH_CONFIG}'::regconfig"), document)
+
+class Article(Base):
+    """Processed news articles reused by the research agent as a first-tier source."""
+    __tablename__ = "articles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, unique=True, nullable=False)  # canonical URL
+    title = Column(Text, nullable=False)
+    published_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    source = Column(String, nullable=True, index=True)  # domain, e.g. 'elpais.com'
+    language = Column(String, nullable=True)
+    text = Column(Text, nullable=True)  # cleaned article text
+    summary = Column(Text, nullable=True)  # * bulleted tl;dr
+    topics = Column(JSON, nullable=True)
+    bias = Column(String, nullable=True)
+    bias_explanation = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Full-text GIN index, only created on PostgreSQL
+    __table_args__ = (
+        Index(
+            "ix_articles_search_vector",
+            search_vector(title, summary, text),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
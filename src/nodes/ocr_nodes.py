@@ -1,14 +1,86 @@
 import os
+import asyncio
+from typing import List, Tuple
 from dotenv import load_dotenv
-from langchain_aws import ChatBedrockConverse
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.prompts import PromptTemplate
-from src.services.ocr_service import textract_service
+from src.services.extraction_schemas import CompiledSchema
+from src.services.ocr_service import ocr_document_async
+from src.services.text_chunking import chunk_text, estimate_tokens
+from src.services.textract_forms import match_form_fields
 from src.schemas.schemas import OcrAgentState
 from src.logger import logger
+from src.services.model_router import get_llm
 
+def merge_extractions(parts: List[dict], field_names: List[str]) -> Tuple[dict, dict]:
+    """
+    Merge partial extractions, in document order, field by field.
+
+    Lists are concatenated. Other fields keep the first non-null value; later
+    values that differ from it are reported as conflicts.
+
+    Returns:
+        (merged, conflicts) where conflicts maps a field to its distinct values
+    """
+    merged = {name: None for name in field_names}
+    conflicts = {}
+    for part in parts:
+        for name, value in part.items():
+            if value is None or value == "" or name not in merged:
+                continue
+            current = merged[name]
+            if isinstance(value, list):
+                merged[name] = (current if isinstance(current, list) else []) + value
+            elif current is None:
+                merged[name] = value
+            elif value != current:
+                values = conflicts.setdefault(name, [current])
+                if value not in values:
+                    values.append(value)
+    return merged, conflicts
+
+async def extract_in_chunks(schema: CompiledSchema, text: str, chunk_tokens: int) -> Tuple[dict, dict]:
+    """
+    Extract the schema from a long text chunk by chunk and merge the results.
+
+    Chunks are extracted concurrently (up to OCR_EXTRACTION_CONCURRENCY at
+    once) against an all-optional copy of the schema. Chunks that fail are
+    logged and left out of the merge.
+
+    Returns:
+        (structured, conflicts) as returned by merge_extractions
+    """
+    chunks = chunk_text(text, chunk_tokens)
+    partial = schema.partial
+    chain = partial.prompt | get_llm("ocr_extraction") | partial.parser
+    results = await chain.abatch(
+        [{"text": chunk, "part": i + 1, "parts": len(chunks)} for i, chunk in enumerate(chunks)],
+        config={"max_concurrency": int(os.getenv("OCR_EXTRACTION_CONCURRENCY", 4))},
+        return_exceptions=True,
+    )
+    parts = [result for result in results if isinstance(result, dict)]
+    if not parts:
+        raise next((result for result in results if isinstance(result, Exception)), ValueError("No chunk could be parsed"))
+    if len(parts) < len(results):
+        logger.warning(f"Extraction failed for {len(results) - len(parts)} of {len(results)} chunks")
+    logger.info(f"Extracted schema from {len(chunks)} chunks")
+    return merge_extractions(parts, list(schema.model.model_fields))
+
+def fill_from_forms(structured: dict, field_names: List[str], confident: dict, uncertain: dict) -> dict:
+    """
+    Combine LLM output with values read from the document's form fields.
+
+    Confident form values win; uncertain ones only fill fields the LLM left
+    empty. Fields are returned in schema order.
+    """
+    merged = {**structured, **confident}
+    for name, value in uncertain.items():
+        if merged.get(name) in (None, ""):
+            merged[name] = value
+    ordered = {name: merged[name] for name in field_names if name in merged}
+    ordered.update(merged)
+    return ordered
 
-def ocr_step(state:OcrAgentState)->OcrAgentState:
+
+async def ocr_step(state:OcrAgentState)->OcrAgentState:
     """
     OCR Step: Extract text from images using OCR.
     
@@ -19,18 +91,35 @@ def ocr_step(state:OcrAgentState)->OcrAgentState:
         The updated state with extracted text
     """
     logger.debug("Starting OCR step")
+    upload = state['file']
     try:
-        extracted_text = textract_service(state['file'])    
-        state["extracted_text"] = extracted_text
+        with upload.buffer() as data:
+            result = await ocr_document_async(data, upload.sha256, state.get("on_page"))
+        state["extracted_text"] = result["lines"]
+        state["ocr_pages"] = result["pages"]
+        state["ocr_key_values"] = result.get("key_values", [])
         return state
     except Exception as e:
         logger.error(f"Error in OCR step: {e}")       
         raise e
+    finally:
+        # Extraction only needs the text, so free the spooled file right away
+        upload.close()
+        state["file"] = None
     
-def build_pydantic_schema(state:OcrAgentState)->OcrAgentState:
+async def build_pydantic_schema(state:OcrAgentState)->OcrAgentState:
     """
     Build Pydantic Schema: Create a Pydantic schema for the extracted text.
 
+    Fields answered with high confidence by Textract key-values (see
+    match_form_fields) are filled directly, and the LLM is only asked for the
+    rest, with a prompt for just those fields; if the form answers every
+    field, the LLM is not called at all.
+
+    Texts longer than OCR_EXTRACTION_CHUNK_TOKENS are extracted in chunks
+    (see extract_in_chunks); fields that got different values from different
+    chunks are stored in extraction_conflicts.
+
     Args:
         state: The current state of the agent
 
@@ -38,18 +127,37 @@ def build_pydantic_schema(state:OcrAgentState)->OcrAgentState:
         The updated state with the Pydantic schema
     """
     logger.debug("Starting Pydantic schema step")
+    timeout = float(os.getenv("OCR_EXTRACTION_TIMEOUT_SECONDS", 120))
     try:
         load_dotenv()
-        parser = JsonOutputParser(pydantic_object=state["schema"])
-        prompt = PromptTemplate(
-            template="Extract the following information from the text: {text}\n{format_instructions}\nIMPORTANT: Return only valid JSON with double-quoted property names.",
-            input_variables=["text"],
-            partial_variables={"format_instructions": parser.get_format_instructions()},
-        )
-        model = os.getenv("REASONING_MODEL")
-        llm = ChatBedrockConverse(model=model, temperature=0)
-        chain = prompt | llm | parser
-        state["structured"] = chain.invoke({"text": state["extracted_text"]})
+        # Parser and prompt come precompiled with the schema (see SchemaRegistry)
+        schema = state["schema"]
+        field_names = list(schema.model.model_fields)
+        confident, uncertain = match_form_fields(schema.model, state.get("ocr_key_values") or [])
+        pending = [name for name in field_names if name not in confident]
+        if not pending:
+            logger.info(f"All {len(field_names)} fields filled from Textract key-values, skipping the LLM")
+            state["structured"] = fill_from_forms({}, field_names, confident, uncertain)
+            return state
+        if confident:
+            logger.info(f"{len(confident)} fields filled from Textract key-values, asking the LLM for {len(pending)}")
+            schema = schema.subset(pending)
+
+        chunk_tokens = int(os.getenv("OCR_EXTRACTION_CHUNK_TOKENS", 6000))
+        text = "\n".join(state["extracted_text"])
+        if chunk_tokens > 0 and estimate_tokens(text) > chunk_tokens:
+            structured, state["extraction_conflicts"] = await asyncio.wait_for(
+                extract_in_chunks(schema, text, chunk_tokens), timeout=timeout
+            )
+        else:
+            llm = get_llm("ocr_extraction")
+            chain = schema.prompt | llm | schema.parser
+            structured = await asyncio.wait_for(chain.ainvoke({"text": state["extracted_text"]}), timeout=timeout)
+        state["structured"] = fill_from_forms(structured, field_names, confident, uncertain) if confident or uncertain else structured
+        return state
+    except asyncio.TimeoutError:
+        logger.error(f"Pydantic schema step timed out after {timeout:.0f}s")
+        state["structured"] = {"error": f"Schema parsing timed out after {timeout:.0f}s"}
         return state
     except Exception as e:
         logger.error(f"Error in Pydantic schema step: {e}")
@@ -2,24 +2,30 @@ import os
 from multiprocessing import cpu_count
 import re
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 import requests
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from urllib.parse import quote_plus
 
-from dateutil import parser
+from botocore.config import Config
 
 from dotenv import load_dotenv
 from feedparser import parse as feedparser_parse
 from googlenewsdecoder import gnewsdecoder
 
-from bs4 import BeautifulSoup
-
-from langchain_aws import ChatBedrockConverse
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import PromptTemplate
 
-from src.schemas.schemas import AgentState,ArticleAnalysis,ArticleBulletSummary
+from src.schemas.article_record import ArticleRecord
+from src.schemas.schemas import AgentState,ArticleAnalysis,ArticleBulletSummary,HeadlineBriefing,PackedBulletSummaries
+from src.services.html_extraction import extract_text_from_html
+from src.services.process_pool import get_process_pool, discard_process_pool
+from src.services.db_connection import AsyncSessionLocal
+from src.services.article_store import search_recent_articles, upsert_articles, canonicalize_url
+from src.services.research_context import memoize
+from src.services.model_router import get_llm, get_model_id
+from src.services.text_chunking import estimate_tokens, pack_by_token_budget
 
 # Configure logging to display on console
 logging.basicConfig(
@@ -69,6 +75,90 @@ def generate_rss_feed_url(state: AgentState)-> AgentState:
     state["urls"] = urls_by_source    
     return state
 
+async def retrieve_known_articles(state: AgentState) -> AgentState:
+    """
+    Query the article knowledge base for recent, already-summarized articles.
+
+    Matches are reused as-is, so RSS retrieval and scraping only have to cover
+    the shortfall. Lookup errors are logged and the agent falls back to RSS.
+    """
+    state["known_articles"] = []
+    if os.getenv("NEWS_KB_ENABLED", "true").lower() != "true":
+        return state
+
+    max_age_hours = int(os.getenv("NEWS_KB_MAX_AGE_HOURS", 48))
+    num_articles_tldr = state["num_articles_tldr"]
+    try:
+        async with AsyncSessionLocal() as db:
+            rows = await search_recent_articles(
+                db,
+                state["news_query"],
+                max_age_hours=max_age_hours,
+                limit=num_articles_tldr,
+                sources=state.get("sources")
+            )
+    except Exception as e:
+        logging.warning(f"Knowledge base lookup failed, falling back to RSS: {e}")
+        return state
+
+    known_articles = [known_article_from_row(row) for row in rows]
+    state["known_articles"] = known_articles
+    if len(known_articles) >= num_articles_tldr:
+        state["tldr_articles"] = known_articles[:num_articles_tldr]
+    logging.info(f"Knowledge base returned {len(known_articles)}/{num_articles_tldr} articles")
+    return state
+
+def known_article_from_row(row) -> ArticleRecord:
+    """Convert a stored Article into the tldr article record used by the graph."""
+    return ArticleRecord(
+        title=row.title,
+        url=row.url,
+        published=row.published_at.astimezone(timezone.utc).replace(tzinfo=None) if row.published_at else None,
+        text=row.text or "",
+        summary=row.summary,
+        topics=list(row.topics or []),
+        bias=row.bias,
+        bias_explanation=row.bias_explanation,
+        from_knowledge_base=True
+    )
+
+def known_articles_decision(state: AgentState) -> str:
+    """Skip RSS retrieval when the knowledge base covered the whole request."""
+    if len(state.get("known_articles", [])) >= state["num_articles_tldr"]:
+        return "enough_articles"
+    return "not_enough_articles"
+
+async def store_processed_articles(state: AgentState) -> AgentState:
+    """Save newly summarized articles to the knowledge base for later requests."""
+    # Fast-mode headlines are not summaries of the full text
+    if os.getenv("NEWS_KB_ENABLED", "true").lower() != "true" or state.get("mode") == "fast":
+        return state
+
+    language = state.get("languages", ["es"])[0]
+    new_articles = []
+    for article in state.get("tldr_articles", []):
+        if article.from_knowledge_base or article.summary in (None, SUMMARY_ERROR_BULLET):
+            continue
+        new_articles.append({
+            "url": article.url,
+            "title": article.title,
+            "published_at": article.published.replace(tzinfo=timezone.utc) if article.published else None,
+            "language": language,
+            "text": article.text,
+            "summary": article.summary,
+            "topics": article.topics,
+            "bias": article.bias,
+            "bias_explanation": article.bias_explanation
+        })
+
+    try:
+        async with AsyncSessionLocal() as db:
+            stored = await upsert_articles(db, new_articles)
+        logging.info(f"Stored {stored} articles in the knowledge base")
+    except Exception as e:
+        logging.warning(f"Could not store articles in the knowledge base: {e}")
+    return state
+
 def retrieve_articles_metadata(state: AgentState) -> AgentState:
     """Retrieve metadata for each url feed created"""
     # Function entry logging
@@ -92,7 +182,7 @@ def retrieve_articles_metadata(state: AgentState) -> AgentState:
         for url_index, url in enumerate(urls):
             try:
                 logging.debug(f"Parsing feed {url_index+1}/{len(urls)}: {url}")
-                feed = feedparser_parse(url)
+                feed = memoize(state.get("shared_context"), "feeds", url, lambda: feedparser_parse(url))
                 
                 # Check if parsing was successful
                 if getattr(feed, 'bozo', False) and feed.get('bozo_exception'):
@@ -129,13 +219,13 @@ def retrieve_articles_metadata(state: AgentState) -> AgentState:
             
             # Create metadata for all new entries at once
             new_metadata = [
-                {
-                    "title": getattr(entry, "title", ""),
-                    "link": getattr(entry, "link", ""),
-                    "pubDate": datetime(*entry.published_parsed[:6]).isoformat() 
-                              if getattr(entry, "published_parsed", None) else "",
-                    "description": clean_description(getattr(entry, "description", ""))
-                }
+                ArticleRecord(
+                    title=getattr(entry, "title", ""),
+                    url=getattr(entry, "link", ""),
+                    published=datetime(*entry.published_parsed[:6])
+                              if getattr(entry, "published_parsed", None) else None,
+                    description=clean_description(getattr(entry, "description", ""))
+                )
                 for entry in new_entries
             ]
             
@@ -168,6 +258,11 @@ def clean_description(raw_html):
 def retrieve_articles_text(state: AgentState) -> AgentState:
     """
     Retrieve full text content for article metadata using parallel processing.
+
+    Downloads run on a thread pool while HTML parsing is handed to the shared
+    parsing process pool, so CPU-bound extraction does not compete with the
+    downloads for the GIL. Set HTML_PARSER_WORKERS=0 to parse on the download
+    threads instead.
     
     Args:
         state: The current agent state containing articles_metadata
@@ -186,28 +281,16 @@ def retrieve_articles_text(state: AgentState) -> AgentState:
     retrieved_articles = []
     retrieved_urls = []
     
-    # Process articles in parallel
-    futures = []
-    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
-        # Submit tasks and collect futures
-        futures = [executor.submit(scrape_article, article) for article in articles_metadata]
-        
-    # Process results
+    # Process results as they are parsed
     success_count = 0
     failure_count = 0
-    for future in futures:
-        try:
-            # Get result, handling any exceptions that occurred during execution
-            article_data, url = future.result(timeout=10)  # 10 second timeout for retrieving results
-            if article_data:
-                retrieved_articles.append(article_data)
-                retrieved_urls.append(url)
-                success_count += 1
-            else:
-                failure_count += 1
-        except Exception as e:
-            logging.error(f"Error processing article: {str(e)}")
-            failure_count += 1    
+    for article_data, url in iter_scraped_articles(articles_metadata, MAX_CONCURRENT_REQUESTS, context=state.get("shared_context")):
+        if article_data:
+            retrieved_articles.append(article_data)
+            retrieved_urls.append(url)
+            success_count += 1
+        else:
+            failure_count += 1
             
     # Log results
     logging.info(f"Article retrieval complete: {success_count} successful, {failure_count} failed")
@@ -215,38 +298,134 @@ def retrieve_articles_text(state: AgentState) -> AgentState:
     # Update state
     state["potential_articles"].extend(retrieved_articles)    
     state["scraped_urls"].extend(retrieved_urls)
-    state["max_feed_entries"]= state["num_articles_tldr"] - len(state["potential_articles"])   
+    state["max_feed_entries"]= state["num_articles_tldr"] - len(state.get("known_articles", [])) - len(state["potential_articles"])   
     state["num_searches_remaining"] -= 1
     
     logging.info(f"State updated: {len(retrieved_articles)} new articles added, {state['num_searches_remaining']} searches remaining")
     
     return state
 
-# Function That will be distributed among threads
-def scrape_article(article):
+# How often the scrape loop checks for parses cancelled by a pool shutdown
+CANCELLED_PARSE_POLL_SECONDS = 1.0
+
+def get_html_parsing_pool():
+    """Return the shared HTML parsing process pool, or None for thread-only parsing."""
+    workers = int(os.getenv("HTML_PARSER_WORKERS", min(4, cpu_count())))
+    if workers <= 0:
+        return None
+    return get_process_pool("html_parsing", workers)
+
+def iter_scraped_articles(articles_metadata, max_download_workers, parse_pool=None, context=None):
+    """
+    Download articles on threads and parse them in a process pool.
+
+    Raw HTML bytes are submitted to the pool as soon as each download lands,
+    and results are yielded as soon as each page is parsed.
+
+    Args:
+        articles_metadata: Feed metadata dicts to scrape
+        max_download_workers: Number of download threads
+        parse_pool: Executor for parsing (defaults to get_html_parsing_pool())
+        context: Optional SharedResearchContext to reuse pages across queries
+
+    Yields:
+        (article_data, url) tuples, or (None, None) for failed articles
+    """
+    parse_pool = parse_pool or get_html_parsing_pool()
+    if not articles_metadata:
+        return
+
+    with ThreadPoolExecutor(max_workers=max_download_workers) as downloader:
+        if parse_pool is None:
+            # Thread-only mode: download and parse on the same thread
+            for future in as_completed([downloader.submit(scrape_article, article, context) for article in articles_metadata]):
+                yield future.result()
+            return
+
+        downloads = {downloader.submit(fetch_article_html, article, context): article for article in articles_metadata}
+        parses = {}
+        pending = set(downloads)
+        while pending:
+            done, pending = wait(pending, timeout=CANCELLED_PARSE_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            # Futures cancelled by a pool shutdown never wake wait(), so pick them up here
+            cancelled = {future for future in pending if future.cancelled()}
+            done, pending = done | cancelled, pending - cancelled
+            for future in done:
+                if future in downloads:
+                    real_url, content = future.result()
+                    if content is None:
+                        yield None, None
+                        continue
+                    # Queries sharing a context wait on the same parse future
+                    try:
+                        parse_future = memoize(
+                            context, "parsed_pages", real_url,
+                            lambda: parse_pool.submit(extract_text_from_html, content)
+                        )
+                    except RuntimeError as e:
+                        # The pool broke or was shut down by another request: parse here
+                        logging.warning(f"Parsing {real_url} in-thread, parse pool unavailable: {e}")
+                        discard_process_pool("html_parsing", parse_pool)
+                        yield scrape_article_content(downloads[future], real_url, content)
+                        continue
+                    parses.setdefault(parse_future, []).append((downloads[future], real_url, content))
+                    pending.add(parse_future)
+                else:
+                    for article, real_url, content in parses.pop(future):
+                        try:
+                            text = future.result()
+                        except (BrokenProcessPool, CancelledError):
+                            # A worker died, or another request discarded the pool and
+                            # cancelled this parse: recreate the pool next time and parse here
+                            discard_process_pool("html_parsing", parse_pool)
+                            yield scrape_article_content(article, real_url, content)
+                            continue
+                        except Exception as e:
+                            logging.error(f"Error parsing {real_url}: {e}")
+                            yield None, None
+                            continue
+                        yield article.with_page(real_url, text), real_url
+
+def fetch_article_html(article, context=None):
+    """Decode the Google News link and download the raw article HTML."""
     try:
-        HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36'}
-        real_url = gnewsdecoder(article['link'])["decoded_url"]
-        response = requests.get(real_url, headers=HEADERS, timeout=20)
-
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'lxml')  # Uses lxml parser
-            text = soup.get_text(strip=True)
-
-            return {
-                "title": article["title"],
-                "url": real_url,
-                "description": article["description"],
-                "text": text,
-                "date": article["pubDate"]
-            }, real_url
+        real_url = memoize(context, "decoded_urls", article.url, lambda: gnewsdecoder(article.url)["decoded_url"])
+        content = memoize(context, "pages", real_url, lambda: download_page(real_url))
+
+        if content is not None:
+            return real_url, content
     except Exception as e:
         # Sanitize article link to prevent log injection
-        safe_link = re.sub(r'[\r\n\t\x00-\x1f\x7f-\x9f]', '', str(article.get('link', 'unknown')))
+        safe_link = re.sub(r'[\r\n\t\x00-\x1f\x7f-\x9f]', '', str(article.url))
         print(f"Error fetching {safe_link}: {e}")
     
     return None, None
 
+def download_page(url):
+    """Download a page and return its raw bytes, or None if the request failed."""
+    HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36'}
+    response = requests.get(url, headers=HEADERS, timeout=20)
+    if response.status_code == 200:
+        return response.content
+    return None
+
+# Function That will be distributed among threads
+def scrape_article(article, context=None):
+    real_url, content = fetch_article_html(article, context)
+    if content is None:
+        return None, None
+    return scrape_article_content(article, real_url, content, context)
+
+def scrape_article_content(article, real_url, content, context=None):
+    """Parse downloaded HTML on the current thread."""
+    try:
+        text = memoize(context, "page_texts", real_url, lambda: extract_text_from_html(content))
+        return article.with_page(real_url, text), real_url
+    except Exception as e:
+        logging.error(f"Error parsing {real_url}: {e}")
+    
+    return None, None
+
 def sanitize_prompt_input(text):
     """Sanitize text to prevent prompt injection attacks."""
     if text is None:
@@ -259,27 +438,33 @@ def sanitize_prompt_input(text):
 def select_top_urls(state:AgentState) -> AgentState:
     """Based on article texts, choose the top-k articles to summarize"""   
     
-    model = os.getenv("REASONING_MODEL")
+    model = get_model_id("select_top_urls")
     if not model:
-        logging.error("REASONING_MODEL environment variable not set")
+        logging.error("No model configured for select_top_urls (set REASONING_MODEL or LIGHT_MODEL)")
         return state        
     try:
-        llm = ChatBedrockConverse(model=model, temperature=0)       
+        llm = get_llm("select_top_urls")       
         news_query = state.get("news_query", "")
         news_query = sanitize_prompt_input(news_query) 
-        num_articles_tldr = state.get("num_articles_tldr", 3)  # Default to 3 if not specified
-        potential_articles = state.get("potential_articles", [])
+        known_articles = state.get("known_articles", [])
+        # Only select the articles the knowledge base could not cover
+        num_articles_tldr = state.get("num_articles_tldr", 3) - len(known_articles)  # Default to 3 if not specified
+        known_urls = {article.url for article in known_articles}
+        potential_articles = [
+            article for article in state.get("potential_articles", [])
+            if canonicalize_url(article.url) not in known_urls
+        ]
         
-        if not potential_articles:
+        if not potential_articles or num_articles_tldr <= 0:
             logging.warning("No potential articles available for selection")
-            state["tldr_articles"] = []
+            state["tldr_articles"] = known_articles
             return state
             
         # Sanitize each article description and URL before joining
         sanitized_metadata = []
         for article in potential_articles:
-            safe_url = sanitize_prompt_input(article.get('url', ''))
-            safe_description = sanitize_prompt_input(article.get('description', ''))
+            safe_url = sanitize_prompt_input(article.url)
+            safe_description = sanitize_prompt_input(article.description)
             sanitized_metadata.append(f"{safe_url}\n{safe_description}")
             
         formatted_metadata = "\n".join(sanitized_metadata)
@@ -311,20 +496,20 @@ def select_top_urls(state:AgentState) -> AgentState:
             
         # Filter articles that match the extracted URLs
         tldr_articles = [article for article in potential_articles 
-                        if article.get('url', '') in urls]
+                        if article.url in urls]
         
         if not tldr_articles:
             logging.warning("No articles matched the selected URLs")
             
         # Update state
-        state["tldr_articles"] = tldr_articles
+        state["tldr_articles"] = known_articles + tldr_articles[:num_articles_tldr]
         logging.info(f"Selected {len(tldr_articles)} articles for summarization")
         
     except Exception as e:
         logging.error(f"Error in select_top_urls: {e}")
         # Ensure tldr_articles exists even if there's an error
         if "tldr_articles" not in state:
-            state["tldr_articles"] = []
+            state["tldr_articles"] = state.get("known_articles", [])
     
     return state
 
@@ -343,14 +528,25 @@ def retry_on_throttling(chain,inputs,retries=4):
                 raise
     raise RuntimeError("Too many throttling errors.")
 
+# Fallback bullet used when an article cannot be summarized
+SUMMARY_ERROR_BULLET = "* Unable to generate summary due to an error."
+
 def summarize_articles_parallel(state:AgentState)-> AgentState:
-    """Summarize the articles based on full text in parallel."""
+    """
+    Summarize the articles based on full text.
+
+    Short articles are packed into one structured call per
+    SUMMARY_PACK_TOKEN_BUDGET estimated tokens (at most SUMMARY_PACK_MAX_ARTICLES
+    per call), so N articles cost about N/k Bedrock invocations. Articles longer
+    than half the budget, and articles a pack fails to return, get one call each.
+    SUMMARY_PACK_TOKEN_BUDGET=0 disables packing.
+    """
     MAX_CHARS = 16000
     tldr_articles = state["tldr_articles"][:MAX_CHARS]
-    model = os.getenv("REASONING_MODEL")    
-    llm = ChatBedrockConverse(model=model,temperature=0)
+    llm = get_llm("article_summary")
     bullet_parser = JsonOutputParser(pydantic_object=ArticleBulletSummary)
     language = state["languages"][0]
+    context = state.get("shared_context")
 
     template = """
     Create a * bulleted summarizing tldr for the article using {language} language. Translate if it is neccesary.
@@ -366,45 +562,136 @@ def summarize_articles_parallel(state:AgentState)-> AgentState:
 
     Each * bullet must be in a new line
     """
-    
-    # Iterate over the selected articles and collect summaries synchronously
-    for i,_ in enumerate(tldr_articles):       
-        text = tldr_articles[i]["text"]
-        title = tldr_articles[i]["title"]
-        url = tldr_articles[i]["url"]
+    prompt_template = PromptTemplate(
+        template=template,
+        input_variables=["text", "language","title","url"],
+        partial_variables={"format_instructions": bullet_parser.get_format_instructions()}
+    )
+    chain = prompt_template | llm | bullet_parser
+
+    # Articles that still need a summary (knowledge base ones already have one)
+    pending = []
+    for i, article in enumerate(tldr_articles):
+        if article.from_knowledge_base:
+            continue
+        cached = context.get("summaries", (article.url, language)) if context is not None else None
+        if cached is not None:
+            article.summary = cached["bullet_summary"]
+        else:
+            pending.append(i)
+
+    token_budget = int(os.getenv("SUMMARY_PACK_TOKEN_BUDGET", 6000))
+    max_pack_articles = int(os.getenv("SUMMARY_PACK_MAX_ARTICLES", 5))
+    article_tokens = lambda i: estimate_tokens(tldr_articles[i].text[:MAX_CHARS])
+    packs = []
+    if token_budget > 0 and max_pack_articles > 1:
+        short = [i for i in pending if article_tokens(i) <= token_budget // 2]
+        packs = [pack for pack in pack_by_token_budget(short, article_tokens, token_budget, max_pack_articles) if len(pack) > 1]
+    packed = {i for pack in packs for i in pack}
+    singles = [i for i in pending if i not in packed]
+
+    calls = 0
+    for pack in packs:
+        calls += 1
+        summaries = summarize_article_pack(llm, [tldr_articles[i] for i in pack], language, MAX_CHARS)
+        for position, i in enumerate(pack):
+            if position in summaries:
+                url = tldr_articles[i].url
+                result = memoize(context, "summaries", (url, language), lambda: summaries[position])
+                tldr_articles[i].summary = result["bullet_summary"]
+            else:
+                singles.append(i)
+        if len(summaries) < len(pack):
+            logging.warning(f"Pack returned {len(summaries)} of {len(pack)} summaries, summarizing the rest one by one")
+
+    # Iterate over the remaining articles and collect summaries synchronously
+    for i in sorted(singles):
+        text = tldr_articles[i].text
+        title = tldr_articles[i].title
+        url = tldr_articles[i].url
 
         logging.info(f"Summarizing article:{url}")        
-        
-        prompt_template = PromptTemplate(
-            template=template,
-            input_variables=["text", "language","title","url"],
-            partial_variables={"format_instructions": bullet_parser.get_format_instructions()}
-        )
-        chain = prompt_template | llm | bullet_parser
-        
+        calls += 1
         try:
             # Pass both text and language when invoking
-            result = retry_on_throttling(chain, {
+            result = memoize(context, "summaries", (url, language), lambda: retry_on_throttling(chain, {
             "text": text[:MAX_CHARS],
             "language": language,
             "title": title,
             "url": url
-            })
+            }))
 
-            tldr_articles[i]["summary"] = result
+            tldr_articles[i].summary = result["bullet_summary"]
         except Exception as e:
             logging.error(f"Error summarizing article {i} ({title}): {e}")
             # Provide a fallback summary
-            tldr_articles[i]["summary"] = {
-                "title": title,
-                "url": url,
-                "bullet_summary": "* Unable to generate summary due to an error."
-            }
-        
+            tldr_articles[i].summary = SUMMARY_ERROR_BULLET
+
+    logging.info(f"Summarized {len(pending)} articles with {calls} LLM calls ({len(packs)} packed)")
     state["tldr_articles"] = tldr_articles
     
     return state
 
+def summarize_article_pack(llm, articles: list, language: str, max_chars: int) -> dict:
+    """
+    Summarize several articles in one structured LLM call.
+
+    Args:
+        llm: Chat model for the article_summary task
+        articles: Article records to summarize
+        language: Output language
+        max_chars: Maximum characters of text sent per article
+
+    Returns:
+        Dict mapping each article's position in the pack to its summary. Articles
+        missing from the response (or all of them, if it cannot be parsed) are
+        left out so the caller can summarize them one by one.
+    """
+    pack_parser = JsonOutputParser(pydantic_object=PackedBulletSummaries)
+    template = """
+    Create a * bulleted summarizing tldr for each of the following articles using {language} language. Translate if it is neccesary.
+    Summarize every article on its own, without mixing facts between them.
+
+    {articles}
+
+    You must return a param dict object with one summary per article, keyed by the article index, with the following formatting:
+    {format_instructions}
+
+    Each * bullet must be in a new line
+    """
+    prompt_template = PromptTemplate(
+        template=template,
+        input_variables=["language", "articles"],
+        partial_variables={"format_instructions": pack_parser.get_format_instructions()}
+    )
+    chain = prompt_template | llm | pack_parser
+    articles_block = "\n\n".join(
+        f'<article index="{position}">\nTitle: {article.title}\nUrl: {article.url}\n{article.text[:max_chars]}\n</article>'
+        for position, article in enumerate(articles)
+    )
+
+    logging.info(f"Summarizing {len(articles)} articles in one call")
+    try:
+        result = retry_on_throttling(chain, {"language": language, "articles": articles_block})
+        items = result.get("summaries", []) if isinstance(result, dict) else []
+    except Exception as e:
+        logging.error(f"Error summarizing article pack: {e}")
+        return {}
+
+    summaries = {}
+    for item in items:
+        index = item.get("index") if isinstance(item, dict) else None
+        bullet_summary = item.get("bullet_summary") if isinstance(item, dict) else None
+        if isinstance(index, int) and 0 <= index < len(articles) and index not in summaries \
+                and isinstance(bullet_summary, str) and bullet_summary.strip():
+            # Title and url come from the article, not from the model
+            summaries[index] = {
+                "title": articles[index].title,
+                "url": articles[index].url,
+                "bullet_summary": bullet_summary
+            }
+    return summaries
+
 def extract_topics_bias(state: AgentState) -> AgentState:
     """
     Extract the main topics and analyze political bias of news articles.
@@ -424,14 +711,14 @@ def extract_topics_bias(state: AgentState) -> AgentState:
         return state
 
     # Get configuration with validation
-    model = os.getenv("REASONING_MODEL")
+    model = get_model_id("bias_analysis")
     if not model:
-        logging.error("REASONING_MODEL environment variable not set")
+        logging.error("No model configured for bias_analysis (set REASONING_MODEL or LIGHT_MODEL)")
         return state
      
     # Initialize analysis components
     try:
-        llm = ChatBedrockConverse(model=model, temperature=0)
+        llm = get_llm("bias_analysis")
         analysis_parser = JsonOutputParser(pydantic_object=ArticleAnalysis)
         language = state.get("languages", ["en"])[0]  # Default to English if not specified
         tldr_articles=state["tldr_articles"]
@@ -464,6 +751,8 @@ def extract_topics_bias(state: AgentState) -> AgentState:
     
     # Iterate over the selected articles and extract topics and bias
     for i, _ in enumerate(tldr_articles):
+        if tldr_articles[i].from_knowledge_base and tldr_articles[i].bias:
+            continue  # Analysis already stored in the knowledge base
         prompt_template = PromptTemplate(
             template=template,
             input_variables=["text", "language"],  # Changed from 'variables' to 'input_variables'
@@ -472,27 +761,124 @@ def extract_topics_bias(state: AgentState) -> AgentState:
         chain = prompt_template | llm | analysis_parser
         
         # Pass both text and language when invoking
-        result = retry_on_throttling(chain, {
-            "text": tldr_articles[i]["text"],
+        result = memoize(state.get("shared_context"), "analyses", (tldr_articles[i].url, language), lambda: retry_on_throttling(chain, {
+            "text": tldr_articles[i].text,
             "language": language
-            })        
+            }))        
         try:
             # Safely access result dictionary keys with get() method
-            tldr_articles[i]["topics"] = result.get("topics", [])
-            tldr_articles[i]["bias"] = result.get("bias", "unknown")
-            tldr_articles[i]["bias_explanation"] = result.get("bias_explanation", "No explanation available")
+            tldr_articles[i].topics = list(result.get("topics", []))
+            tldr_articles[i].bias = result.get("bias", "unknown")
+            tldr_articles[i].bias_explanation = result.get("bias_explanation", "No explanation available")
         except (KeyError, TypeError, IndexError) as e:
             logging.error(f"Error updating article {i} with analysis results: {e}")
             # Set default values if an error occurs
-            tldr_articles[i]["topics"] = []
-            tldr_articles[i]["bias"] = "error"
-            tldr_articles[i]["bias_explanation"] = f"Error during analysis: {str(e)}"
+            tldr_articles[i].topics = []
+            tldr_articles[i].bias = "error"
+            tldr_articles[i].bias_explanation = f"Error during analysis: {str(e)}"
 
    
     state["tldr_articles"] = tldr_articles
     
     return state
 
+def metadata_decision(state: AgentState) -> str:
+    """Fast mode builds the briefing from feed metadata; other modes scrape."""
+    if state.get("mode") == "fast":
+        return "fast"
+    return "scrape"
+
+def summarize_headlines(state: AgentState) -> AgentState:
+    """
+    Fast mode: rank feed items and write bullets from RSS metadata alone.
+
+    Uses the title and description captured by retrieve_articles_metadata,
+    with no link decoding or page fetches and a single LLM call for the whole
+    set. If that call fails or times out, the first feed items are returned
+    with their description as the only bullet.
+    """
+    known_articles = state.get("known_articles", [])
+    num_headlines = state.get("num_articles_tldr", 3) - len(known_articles)
+    language = state.get("languages", ["es"])[0]
+
+    # Drop items without title and repeated headlines from different feeds
+    candidates = []
+    seen_titles = set()
+    for article in state.get("articles_metadata", []):
+        title = article.title.strip()
+        if title and title.lower() not in seen_titles:
+            seen_titles.add(title.lower())
+            candidates.append(article)
+
+    if num_headlines <= 0 or not candidates:
+        state["tldr_articles"] = known_articles
+        return state
+
+    items = "\n".join(
+        f"[{i}] {sanitize_prompt_input(article.title)} | {sanitize_prompt_input(article.description)}"
+        for i, article in enumerate(candidates)
+    )
+    briefing_parser = JsonOutputParser(pydantic_object=HeadlineBriefing)
+    template = """
+    Based on the user news query:
+    <query>
+    {query}
+    </query>
+
+    Select up to {num_headlines} of the most relevant news items below, most relevant first.
+    For each one write one to three short bullets in {language} language using only its title and description.
+    Don't add facts that are not in the item.
+
+    <items>
+    {items}
+    </items>
+
+    You must return a param dict object with the following formatting:
+    {format_instructions}
+    """
+    prompt_template = PromptTemplate(
+        template=template,
+        input_variables=["query", "num_headlines", "language", "items"],
+        partial_variables={"format_instructions": briefing_parser.get_format_instructions()}
+    )
+
+    selected = []
+    try:
+        timeout = int(os.getenv("FAST_MODE_LLM_TIMEOUT", 3))
+        llm = get_llm("headline_briefing", config=Config(read_timeout=timeout, retries={"max_attempts": 1}))
+        chain = prompt_template | llm | briefing_parser
+        result = chain.invoke({
+            "query": sanitize_prompt_input(state.get("news_query", "")),
+            "num_headlines": num_headlines,
+            "language": language,
+            "items": items
+        })
+        for item in result.get("items", []):
+            index = item.get("index")
+            if isinstance(index, int) and 0 <= index < len(candidates) and index not in [i for i, _ in selected]:
+                selected.append((index, [bullet for bullet in item.get("bullets", []) if bullet]))
+    except Exception as e:
+        logging.warning(f"Headline briefing failed, using feed order: {e}")
+
+    if not selected:
+        selected = [(i, []) for i in range(min(num_headlines, len(candidates)))]
+
+    headlines = []
+    for index, bullets in selected[:num_headlines]:
+        article = candidates[index]
+        bullets = bullets or [article.description or article.title]
+        headlines.append(ArticleRecord(
+            title=article.title,
+            url=article.url,
+            description=article.description,
+            published=article.published or datetime.now(timezone.utc).replace(tzinfo=None),
+            summary="\n".join(f"* {bullet}" for bullet in bullets)
+        ))
+
+    state["tldr_articles"] = known_articles + headlines
+    logging.info(f"Fast mode: built {len(headlines)} headlines from feed metadata")
+    return state
+
 def state_of_art(state: AgentState) -> AgentState:
     """Generate a state-of-the-art report based on analyzed articles."""
     
@@ -503,23 +889,22 @@ def state_of_art(state: AgentState) -> AgentState:
     if mode == "advanced" and tldr_articles:
         try:
             # Get configuration
-            model = os.getenv("REASONING_MODEL")
             language = state.get("languages", ["en"])[0]
             
             # Build articles block using list comprehension and join
             article_blocks = []
             for i, art in enumerate(tldr_articles, 1):
                 article_block = f"""Artículo {i}:
-                Título: {art.get('title', 'No title')}
-                Tendencia política: {art.get('bias', 'Unknown')}
-                Contenido: {art.get('text', 'No content')}
+                Título: {art.title or 'No title'}
+                Tendencia política: {art.bias or 'Unknown'}
+                Contenido: {art.text or art.description or 'No content'}
                 ---"""
                 article_blocks.append(article_block)
             
             articles_text = "\n".join(article_blocks)
             
             # Create LLM instance
-            llm = ChatBedrockConverse(model=model, temperature=0)
+            llm = get_llm("state_of_art")
             
             # Use a separate template variable for better readability
             report_template = f"""
@@ -568,28 +953,11 @@ def format_results(state: AgentState) -> AgentState:
     # load a list of past search queries
     past_queries = state["news_query"]
     tldr_articles = state["tldr_articles"]    
-    formatted_summaries = []
-    for article in tldr_articles:
-              
-        lines = article["summary"]["bullet_summary"].strip().split("\n")
-        
-        title = article["summary"]["title"]
-        url = article["summary"]["url"]
-        date = article.get('date','missing')         
-        bullets = [line.strip("* ").strip() for line in lines if line.startswith("*")]
-        
-        formatted_summaries.append({
-            "title": title,
-            "url": url,
-            "bullets": bullets,
-            "date": parser.parse(date),
-            "topics":article.get('topics'),
-            "bias": article.get('bias'),
-            "bias_explanation":article.get('bias_explanation'),
-        })
-    
-    # Sort formatted_summaries by date in descending order (newest first)
-    formatted_summaries.sort(key=lambda x: x["date"], reverse=True)
+    # Sort by date in descending order (newest first), undated articles last
+    formatted_summaries = [
+        article.to_summary()
+        for article in sorted(tldr_articles, key=lambda a: a.published or datetime.min, reverse=True)
+    ]
 
     state["formatted_results"] = {
         "header": f"Top {len(tldr_articles)} articulo(s) encontrados para los siguientes términos de búsqueda: {(past_queries)}",
@@ -602,14 +970,15 @@ def format_results(state: AgentState) -> AgentState:
 # Decision Edges
 def articles_text_decision(state: AgentState) -> str:
     """Check results of retrieve_articles_text to determine next step."""
+    num_known = len(state.get("known_articles", []))
     if state["num_searches_remaining"] == 0:        
-        if len(state["scraped_urls"]) == 0:
+        if len(state["scraped_urls"]) == 0 and num_known == 0:
             state["formatted_results"] = "No articles with text found."
             return "END"        
         else:
             return "enough_articles"
     else:       
-        if len(state["scraped_urls"]) < state["num_articles_tldr"]:
+        if len(state["scraped_urls"]) + num_known < state["num_articles_tldr"]:
             return "not_enough_articles"        
         else:
             return "enough_articles"
\ No newline at end of file
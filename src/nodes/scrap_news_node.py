@@ -1,157 +1,332 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+from typing import Callable, List, Optional
+
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
-from langchain_aws import ChatBedrockConverse
+from langgraph.graph import END
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
 from src.schemas.schemas import ScraperAgentState
+from src.services.model_router import get_llm
+from src.services.text_chunking import CHARS_PER_TOKEN, chunk_text, estimate_tokens
+from src.logger import logger
 
 load_dotenv()
 
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36'
+}
+
+# Shared HTTP session so repeated scrap requests reuse pooled connections
+_session = None
+_session_lock = Lock()
+
+def get_scrap_session() -> requests.Session:
+    """Return the process-wide scraping session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = int(os.getenv("SCRAP_MAX_CONCURRENCY", 8))
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+def fetch_page(url: str, deadline_seconds: float) -> bytes:
+    """
+    Download a page, giving up once the whole request exceeds its deadline.
+
+    The body is streamed so a slow server cannot hold the request open past
+    the deadline by trickling bytes within the read timeout.
+    """
+    deadline = time.monotonic() + deadline_seconds
+    with get_scrap_session().get(url, timeout=(min(5, deadline_seconds), deadline_seconds), stream=True) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Request failed with status code {response.status_code}")
+        chunks = []
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Request exceeded the {deadline_seconds}s deadline")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+def extract_article(content: bytes):
+    """Extract the (title, body text) of an article page."""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Extract title
+    title_tag = soup.find('title')
+    title = title_tag.get_text(strip=True) if title_tag else "No title found"
+    # Sanitize title to prevent injection
+    title = title.replace('\x00', '').replace('\r', '').replace('\n', ' ')[:500]
+
+    # Try to find main content in article or similar tags
+    article = soup.find('article')
+    if article:
+        content = article.get_text(separator='\n', strip=True)
+    else:
+        # Fallback: use main or body content heuristically
+        paragraphs = soup.find_all('p')
+        content = '\n'.join(p.get_text(strip=True) for p in paragraphs if len(p.get_text(strip=True)) > 50)
+    return title, content
+
+def scrap_url(url: str, deadline_seconds: float):
+    """Fetch and parse one URL; runs on the scraping thread pool."""
+    return extract_article(fetch_page(url, deadline_seconds))
+
+def scrap_urls(urls: List[str], on_result: Optional[Callable[[dict], None]] = None):
+    """
+    Fetch every URL concurrently and keep whatever succeeded.
+
+    Args:
+        urls: URLs to scrap
+        on_result: Optional callback invoked from the worker threads with
+            {"url", "title"} or {"url", "error"} as each URL finishes
+
+    Returns:
+        (titles, texts, errors): titles and texts in the order of urls for the
+        URLs that succeeded, and {"url", "error"} dicts for those that failed
+    """
+    deadline_seconds = float(os.getenv("SCRAP_REQUEST_DEADLINE", 20))
+    max_workers = max(1, min(len(urls), int(os.getenv("SCRAP_MAX_CONCURRENCY", 8))))
+
+    results = {}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(scrap_url, url, deadline_seconds): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+                event = {"url": url, "title": results[url][0]}
+            except Exception as e:
+                logger.warning(f"Could not scrap {url}: {e}")
+                event = {"url": url, "error": str(e)}
+                errors.append(event)
+            if on_result:
+                on_result(event)
+
+    fetched = [url for url in urls if url in results]
+    errors.sort(key=lambda error: urls.index(error["url"]))
+    return [results[url][0] for url in fetched], [results[url][1] for url in fetched], errors
+
 def scrap_article(state:ScraperAgentState):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/85.0.4183.121 Safari/537.36'
-    }
-
-    urls = state["url"]    
-    for url in urls:
-        try:        
-            response = requests.get(url, headers=headers, timeout=60)
-
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-
-                # Extract title
-                title_tag = soup.find('title')
-                title = title_tag.get_text(strip=True) if title_tag else "No title found"
-                # Sanitize title to prevent injection
-                title = title.replace('\x00', '').replace('\r', '').replace('\n', ' ')[:500]
-
-                # Try to find main content in article or similar tags
-                article = soup.find('article')
-                if article:
-                    content = article.get_text(separator='\n', strip=True)
-                else:
-                    # Fallback: use main or body content heuristically
-                    paragraphs = soup.find_all('p')
-                    content = '\n'.join(p.get_text(strip=True) for p in paragraphs if len(p.get_text(strip=True)) > 50)
-
-                state["text"].append(content)                
-
-                state["title"] = title             
-               
-            else:
-                return {"error": f"Request failed with status code {response.status_code}"}
-            
-        except Exception as e:
-            return {"error": str(e)}
+    """
+    Scrap all URLs of the request concurrently.
+
+    Texts and titles keep the order of state["url"]; URLs that fail or miss
+    the SCRAP_REQUEST_DEADLINE are reported in state["errors"] without
+    affecting the others.
+    """
+    titles, texts, errors = scrap_urls([str(url) for url in state["url"]])
+    state["titles"] = titles
+    state["text"] = texts
+    state["title"] = titles[0] if titles else ""
+    state["errors"] = errors
     return state
-        
-def summarize_article(state:ScraperAgentState)->ScraperAgentState:    
-    # Instantiate LLM model
-    model = os.getenv("REASONING_MODEL")
-    llm = ChatBedrockConverse(model=model,temperature=0)   
-    
-    template = """   
-    A continuación se te proporciona un artículo y su título. Tu tarea es analizarlo críticamente y 
-    devolver la información en formato Markdown.
-    Identifica y lista los puntos más relevantes del artículo en formato de viñetas (-), destacando hechos,
-    afirmaciones clave o datos relevantes.
 
-    Redacta un resumen conciso que explique el contenido general del artículo.
+# Reduce levels before condensed notes are truncated to fit
+MAX_REDUCE_DEPTH = 4
 
-    Elabora una opinión crítica sobre el artículo. Esto puede incluir:
+CONDENSE_TEMPLATE = """
+A continuación se te proporciona un fragmento, o un conjunto de notas parciales, del artículo "{title}".
+Condénsalo en notas breves en formato de viñetas (-) que conserven los hechos, afirmaciones clave,
+datos, cifras, citas y argumentos relevantes. No agregues opiniones ni información que no esté en el texto
+y no repitas puntos.
 
-        - Fortalezas y debilidades en la argumentación.
+Texto:
+{text}
+"""
 
-        - Sesgos o limitaciones en la información presentada.
+SUMMARY_TEMPLATE = """   
+A continuación se te proporciona un artículo y su título. Tu tarea es analizarlo críticamente y 
+devolver la información en formato Markdown.
+Identifica y lista los puntos más relevantes del artículo en formato de viñetas (-), destacando hechos,
+afirmaciones clave o datos relevantes.
 
-        - Coherencia y claridad del texto.
+Redacta un resumen conciso que explique el contenido general del artículo.
 
-        - Implicaciones del contenido (sociales, políticas, científicas, etc.).
+Elabora una opinión crítica sobre el artículo. Esto puede incluir:
 
-    Usa el siguiente formato Markdown para estructurar tu respuesta:
+    - Fortalezas y debilidades en la argumentación.
 
-    ## Puntos Relevantes
-    - [Punto importante 1]
-    - [Punto importante 2]
-    - ...
+    - Sesgos o limitaciones en la información presentada.
 
-    ## Opinión Crítica
-    [Evaluación crítica del artículo con observaciones claras, argumentadas y bien redactadas]
+    - Coherencia y claridad del texto.
 
-    Título del Artículo: {title}
-    Artículo:{text}
-    """
+    - Implicaciones del contenido (sociales, políticas, científicas, etc.).
 
-    prompt_template = PromptTemplate(
-        template=template,
-        variables={"title":state["title"],"text":state["text"]}        
-    )
+Usa el siguiente formato Markdown para estructurar tu respuesta:
 
-    chain = prompt_template | llm 
+## Puntos Relevantes
+- [Punto importante 1]
+- [Punto importante 2]
+- ...
 
-    result = chain.invoke({"title":state["title"],"text":state["text"]})
+## Opinión Crítica
+[Evaluación crítica del artículo con observaciones claras, argumentadas y bien redactadas]
 
-    state["summary"] = result.content
+Título del Artículo: {title}
+Artículo:{text}
+"""
 
-    return state
+COMPARATIVE_TEMPLATE = """
+A continuación se presentan {num_documents} documentos de diferentes fuentes. Tu tarea es:
 
-def select_summary_type(state:ScraperAgentState):
-    if len(state["text"])>1 and len(state["text"])<=2:
-        return "comparative"
-    else:
-        return "summarize"
+Leer todos los textos con atención.
 
-def comparative_articles(state:ScraperAgentState)->ScraperAgentState:
+Compararlos y contrastarlos, identificando similitudes, diferencias, enfoques complementarios o contrapuestos.
 
-    # Instantiate LLM model
-    model = os.getenv("REASONING_MODEL")
-    llm = ChatBedrockConverse(model=model,temperature=0)   
+Elaborar un resumen conjunto que:
 
-    template = """
-    A continuación se presentan dos documentos de diferentes fuentes. Tu tarea es:
+    Condense las ideas principales de todos los documentos.
 
-    Leer ambos textos con atención.
+    Señale claramente de cuál documento proviene cada parte del resumen (usa las etiquetas {labels}).
 
-    Compararlos y contrastarlos, identificando similitudes, diferencias, enfoques complementarios o contrapuestos.
+    Destaque cualquier punto en el que los documentos estén de acuerdo o en desacuerdo.
 
-    Elaborar un resumen conjunto que:
+{documents}
 
-        Condense las ideas principales de ambos documentos.
+Formato de salida esperado:
 
-        Señale claramente de cuál documento proviene cada parte del resumen (usa etiquetas como [Fuente A] o [Fuente B]).
+Resumen Comparativo:
+[Resumen claro y estructurado, incluyendo referencias entre corchetes como {labels}]
 
-        Destaque cualquier punto en el que ambos documentos estén de acuerdo o en desacuerdo.
+Similitudes:
 
-    Documento A:
-    {text_1}
+    [Punto en común] ([Fuente A] y [Fuente B])
 
-    Documento B:
-    {text_2}
+Diferencias o Contrastes:
 
-    Formato de salida esperado:
+    [Punto de diferencia] ([Fuente A] vs. [Fuente B])
+"""
 
-    Resumen Comparativo:
-    [Resumen claro y estructurado, incluyendo referencias entre corchetes como [Fuente A] o [Fuente B]]
+def source_label(index: int) -> str:
+    """Label of the index-th document: A, B, ..., Z, then 27, 28, ..."""
+    return chr(ord("A") + index) if index < 26 else str(index + 1)
 
-    Similitudes:
+def condense_documents(titles: List[str], texts: List[str], target_tokens: int) -> List[str]:
+    """
+    Map-reduce each document down to about target_tokens estimated tokens.
 
-        [Punto en común] ([Fuente A] y [Fuente B])
+    Documents already within the target are returned unchanged. Longer ones
+    are split into SCRAP_CHUNK_TOKENS chunks (map), and the resulting notes
+    are merged SCRAP_REDUCE_FAN_IN at a time (reduce) until they fit. Every
+    level runs as one concurrent batch across all documents, so latency grows
+    with the depth of the reduce tree rather than with the amount of text.
 
-    Diferencias o Contrastes:
+    Args:
+        titles: Document titles, used as context for each chunk
+        texts: Document texts
+        target_tokens: Token budget per condensed document
 
-        [Punto de diferencia] ([Fuente A] vs. [Fuente B])
+    Returns:
+        Condensed texts, in the same order as texts
     """
-
-    prompt_template = PromptTemplate(
-        template=template,
-        variables={"text_1":state["text"][0],"text_2":state["text"][1]}        
+    chunk_tokens = int(os.getenv("SCRAP_CHUNK_TOKENS", 4000))
+    fan_in = max(2, int(os.getenv("SCRAP_REDUCE_FAN_IN", 4)))
+    max_concurrency = int(os.getenv("SCRAP_MAP_CONCURRENCY", 8))
+
+    chain = None  # Built on the first level that needs the LLM; short scrapes never do
+
+    notes = [[text] for text in texts]
+    for depth in range(MAX_REDUCE_DEPTH):
+        jobs = []
+        for i, doc_notes in enumerate(notes):
+            if estimate_tokens("\n\n".join(doc_notes)) <= target_tokens:
+                continue
+            if len(doc_notes) == 1:
+                # Map: condense each chunk of the text
+                groups = [[chunk] for chunk in chunk_text(doc_notes[0], chunk_tokens)]
+            else:
+                # Reduce: merge neighbouring notes
+                groups = [doc_notes[j:j + fan_in] for j in range(0, len(doc_notes), fan_in)]
+            jobs.extend((i, group) for group in groups)
+        if not jobs:
+            break
+        if chain is None:
+            prompt_template = PromptTemplate(template=CONDENSE_TEMPLATE, input_variables=["title", "text"])
+            chain = prompt_template | get_llm("scrap_condense") | StrOutputParser()
+
+        logger.info(f"Condensing level {depth + 1}: {len(jobs)} LLM calls")
+        outputs = chain.batch(
+            [{"title": titles[i], "text": "\n\n".join(group)} for i, group in jobs],
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True
+        )
+        groups_per_doc = {}
+        for i, _ in jobs:
+            groups_per_doc[i] = groups_per_doc.get(i, 0) + 1
+        condensed = {}
+        for (i, group), output in zip(jobs, outputs):
+            if isinstance(output, Exception):
+                # Keep the group's own text, cut to its share of the budget, instead of losing the document
+                logger.warning(f"Condensing a part of '{titles[i]}' failed, keeping it truncated: {output}")
+                output = "\n\n".join(group)[:target_tokens * CHARS_PER_TOKEN // groups_per_doc[i]]
+            condensed.setdefault(i, []).append(output)
+        for i, doc_notes in condensed.items():
+            notes[i] = doc_notes
+
+    # Whatever still does not fit after the deepest level is truncated
+    return ["\n\n".join(doc_notes)[:target_tokens * CHARS_PER_TOKEN] for doc_notes in notes]
+
+def condensed_state_documents(state: ScraperAgentState):
+    """Return the (titles, condensed texts) of the scraped documents."""
+    texts = state["text"]
+    titles = state.get("titles") or [state["title"]] * len(texts)
+    context_tokens = int(os.getenv("SCRAP_CONTEXT_TOKENS", 12000))
+    return titles, condense_documents(titles, texts, max(500, context_tokens // len(texts)))
+
+def build_summary_prompt(state: ScraperAgentState) -> str:
+    """Condense a single scraped document and render the critique prompt."""
+    titles, texts = condensed_state_documents(state)
+    return SUMMARY_TEMPLATE.format(title=titles[0], text=texts[0])
+
+def build_comparative_prompt(state: ScraperAgentState) -> str:
+    """Condense every scraped document and render the N-way comparison prompt."""
+    titles, texts = condensed_state_documents(state)
+    labels = [source_label(i) for i in range(len(texts))]
+    documents = "\n\n".join(
+        f"Documento {label} [Fuente {label}] - {title}:\n{text}"
+        for label, title, text in zip(labels, titles, texts)
+    )
+    return COMPARATIVE_TEMPLATE.format(
+        num_documents=len(texts),
+        labels=", ".join(f"[Fuente {label}]" for label in labels),
+        documents=documents
     )
 
-    chain = prompt_template | llm 
+def summarize_article(state:ScraperAgentState)->ScraperAgentState:    
+    # Instantiate LLM model
+    llm = get_llm("scrap_summary")
+
+    result = llm.invoke(build_summary_prompt(state))
+
+    state["summary"] = result.content
+
+    return state
+
+def select_summary_type(state:ScraperAgentState):
+    if not state["text"]:
+        return END  # Nothing could be fetched
+    if len(state["text"])>1:
+        return "comparative"
+    else:
+        return "summarize"
+
+def comparative_articles(state:ScraperAgentState)->ScraperAgentState:
+
+    # Instantiate LLM model
+    llm = get_llm("scrap_summary")
 
-    result = chain.invoke({"text_1":state["text"][0],"text_2":state["text"][1]})
+    result = llm.invoke(build_comparative_prompt(state))
 
     state["summary"] = result.content
 
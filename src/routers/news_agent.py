@@ -1,8 +1,14 @@
+import asyncio
+import json
 import logging
+import os
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from src.schemas.schemas import AgentRequest, AgentResponse
 from src.agents.research import ResearchAgent
+from src.services.research_context import SharedResearchContext
 from src.routers.auth_route import get_current_user, oauth2_scheme
 from src.models.models import User
 
@@ -20,7 +26,8 @@ def create_initial_state(
     source: Optional[List[str]] = None,
     country: Optional[List[str]] = None,
     language: Optional[List[str]] = None,
-    mode: str = "simple"
+    mode: str = "simple",
+    shared_context: Optional[SharedResearchContext] = None
 ) -> Dict[str, Any]:
     """
     Generates an initial state for the news agent.
@@ -31,7 +38,8 @@ def create_initial_state(
         source: Optional list of news sources to filter by
         country: Optional list of countries to filter news by
         language: Optional list of languages to filter news by
-        mode: Agent operation mode ('simple' or 'advanced')
+        mode: Agent operation mode ('fast', 'simple' or 'advanced')
+        shared_context: Optional context shared by the queries of a batch
         
     Returns:
         Dictionary containing the initial state for the news agent
@@ -52,14 +60,37 @@ def create_initial_state(
         "articles_metadata": [],
         "scraped_urls": [],
         "max_feed_entries":max_feed_entries,        
+        "known_articles": [],
         "potential_articles": [],
         "tldr_articles": [],
         "formatted_results": "No articles with text found.", 
         "report": "",
-        "mode": mode      
+        "mode": mode,
+        "shared_context": shared_context
     }
     return state
 
+def build_agent_response(final_state: Dict[str, Any], query: str) -> Any:
+    """Build the AgentResponse payload from the final graph state."""
+    if not final_state.get("tldr_articles"):            
+        logger.warning(f"No articles found for query: {query}")
+        return AgentResponse(
+            header="No articles found",
+            summaries=[],
+            report="No state of the art"
+        )
+
+    # Make sure we return the correct format expected by AgentResponse
+    if isinstance(final_state["formatted_results"], dict) and all(key in final_state["formatted_results"] for key in ["header", "summaries", "report"]):
+        return final_state["formatted_results"]
+    else:
+        # If formatted_results is not already in the correct format, create a proper AgentResponse
+        return AgentResponse(
+            header=f"Results for: {query}",
+            summaries=[article.to_summary() for article in final_state["tldr_articles"]],
+            report=final_state.get("report", "")
+        )
+
 @router.post("/agent", response_model=AgentResponse, summary="Process news search request")
 async def agent_call(request: AgentRequest, current_user: User = Depends(get_current_user)):
     """
@@ -94,27 +125,8 @@ async def agent_call(request: AgentRequest, current_user: User = Depends(get_cur
         )
         
         final_state = await agent.graph.ainvoke(state)
-
-        if not final_state.get("tldr_articles"):            
-            logger.warning(f"No articles found for query: {request.query}")
-            return AgentResponse(
-                header="No articles found",
-                summaries=[],
-                report="No state of the art"
-            )
-        
         logger.info(f"Successfully processed news request for query: {request.query}")
-        
-        # Make sure we return the correct format expected by AgentResponse
-        if isinstance(final_state["formatted_results"], dict) and all(key in final_state["formatted_results"] for key in ["header", "summaries", "report"]):
-            return final_state["formatted_results"]
-        else:
-            # If formatted_results is not already in the correct format, create a proper AgentResponse
-            return AgentResponse(
-                header=f"Results for: {request.query}",
-                summaries=final_state.get("tldr_articles", []),
-                report=final_state.get("report", "")
-            )
+        return build_agent_response(final_state, request.query)
     except HTTPException as he:
         # Re-raise HTTP exceptions without modification
         logger.error(f"HTTP error in news request: {str(he)}")
@@ -152,28 +164,63 @@ async def agent_call_test(request: AgentRequest):
         )
         
         final_state = await agent.graph.ainvoke(state)
-
-        if not final_state.get("tldr_articles"):            
-            logger.warning(f"No articles found for query: {request.query}")
-            return AgentResponse(
-                header="No articles found",
-                summaries=[],
-                report="No state of the art"
-            )
-        
         logger.info(f"Successfully processed test news request for query: {request.query}")
-        
-        # Make sure we return the correct format expected by AgentResponse
-        if isinstance(final_state["formatted_results"], dict) and all(key in final_state["formatted_results"] for key in ["header", "summaries", "report"]):
-            return final_state["formatted_results"]
-        else:
-            # If formatted_results is not already in the correct format, create a proper AgentResponse
-            return AgentResponse(
-                header=f"Results for: {request.query}",
-                summaries=final_state.get("tldr_articles", []),
-                report=final_state.get("report", "")
-            )
+        return build_agent_response(final_state, request.query)
     except Exception as e:
         logger.error(f"Error processing test news request: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+@router.post("/batch", summary="Process several news search requests in one call")
+async def agent_batch_call(requests: List[AgentRequest], current_user: User = Depends(get_current_user)) -> StreamingResponse:
+    """
+    Run many news queries concurrently and stream each result as it completes.
+
+    All queries share one execution context, so overlapping feeds, decoded
+    links, scraped pages and per-article LLM results are computed only once.
+
+    Args:
+        requests: List of news search requests
+        current_user: The authenticated user (injected by dependency)
+
+    Returns:
+        StreamingResponse: NDJSON stream with one line per query, tagged with
+        the query's index in the request list
+    """
+    max_queries = int(os.getenv("NEWS_BATCH_MAX_QUERIES", 20))
+    if not requests:
+        raise HTTPException(status_code=400, detail="No queries were provided")
+    if len(requests) > max_queries:
+        raise HTTPException(status_code=400, detail=f"A batch accepts at most {max_queries} queries")
+
+    logger.info(f"Processing batch of {len(requests)} news queries by user: {current_user.username}")
+    agent = ResearchAgent()
+    shared_context = SharedResearchContext()
+    semaphore = asyncio.Semaphore(int(os.getenv("NEWS_BATCH_CONCURRENCY", 10)))
+
+    async def run_query(index: int, request: AgentRequest) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                state = create_initial_state(
+                    request.query,
+                    request.articles,
+                    request.source,
+                    request.country,
+                    request.language,
+                    request.mode,
+                    shared_context=shared_context
+                )
+                final_state = await agent.graph.ainvoke(state)
+                result = AgentResponse.model_validate(build_agent_response(final_state, request.query))
+                return {"index": index, "query": request.query, "result": result}
+            except Exception as e:
+                logger.error(f"Error processing batch query {index}: {str(e)}", exc_info=True)
+                return {"index": index, "query": request.query, "error": f"Error processing request: {str(e)}"}
+
+    async def stream_results():
+        tasks = [run_query(index, request) for index, request in enumerate(requests)]
+        for future in asyncio.as_completed(tasks):
+            result = await future
+            yield json.dumps(jsonable_encoder(result), ensure_ascii=False) + "\n"
+        logger.info(f"Batch complete: {shared_context.hits} shared results reused, {shared_context.misses} computed")
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
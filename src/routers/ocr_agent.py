@@ -1,30 +1,23 @@
-from asyncio import as_completed 
+from asyncio import Queue, create_task, gather
+import os
 import json
-from datetime import date
-from functools import lru_cache
-from typing import List, Dict, Type, Any
+from functools import partial
+from typing import Callable, List, Dict, Any, Optional
 
 from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException
 from fastapi.responses import StreamingResponse
-from pydantic import Field, create_model, BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.agents.ocr import OcrAgent
+from src.nodes.ocr_nodes import ocr_step, build_pydantic_schema
 from src.schemas.schemas import OcrAgentState
+from src.services.extraction_schemas import CompiledSchema, parse_schema_json, schema_registry
+from src.services.schemas_crud import get_schema_by_id
+from src.services.upload_spool import SpooledUpload, spool_upload
 from src.logger import logger
-from src.routers.auth_route import get_current_user
+from src.routers.auth_route import get_current_user, get_db
 from src.models.models import User
 
-# Constants
-SUPPORTED_FIELD_TYPES: Dict[str, Type] = {
-    "str": str,
-    "int": int,
-    "float": float,
-    "bool": bool,
-    "list": List[Any],
-    "dict": dict,
-    "date": date
-}
-
 # File type validation
 SUPPORTED_CONTENT_TYPES = {
     "image/jpeg",
@@ -32,80 +25,97 @@ SUPPORTED_CONTENT_TYPES = {
     "application/pdf"
 }
 
-# Cache for dynamic models
-@lru_cache(maxsize=32)
-def get_cached_dynamic_model(schema_dict: frozenset) -> type[BaseModel]:
-    """Get or create a cached dynamic Pydantic model."""
-    return build_dynamic_model(dict(schema_dict))
-
-def get_python_type(type_string: str) -> Type:
-    """Convert string type representation to Python type."""
-    return SUPPORTED_FIELD_TYPES.get(type_string.lower(), str)
+# Receives (filename, page report) for each OCRed page when progress events are on
+PageCallback = Callable[[str, dict], None]
 
-def create_initial_state(file: bytes, schema: type[BaseModel]) -> OcrAgentState:
+def create_initial_state(file: SpooledUpload, schema: CompiledSchema, on_page: Optional[PageCallback] = None) -> OcrAgentState:
     """Create initial state for OCR processing."""
     return OcrAgentState(
         file=file,
         extracted_text=None,
+        ocr_pages=None,
         schema=schema,
-        structured=None
+        structured=None,
+        extraction_conflicts=None,
+        ocr_key_values=None,
+        on_page=partial(on_page, file.filename) if on_page else None
     )
 
+def conflicts_field(state: OcrAgentState) -> Dict[str, Any]:
+    """Response field listing values that disagreed across extraction chunks, if any."""
+    conflicts = state.get("extraction_conflicts")
+    return {"conflicts": conflicts} if conflicts else {}
+
 async def process_single_file(
-    file_data: Dict[str, Any], 
-    DynamicSchema: type[BaseModel], 
-    agent: OcrAgent
+    upload: SpooledUpload, 
+    schema: CompiledSchema, 
+    agent: OcrAgent,
+    on_page: Optional[PageCallback] = None
 ) -> Dict[str, Any]:
     """Process a single file with error handling and logging."""
     try:
-        logger.debug(f"Processing file: {file_data['filename']}")
+        logger.debug(f"Processing file: {upload.filename}")
         
-        if file_data["content_type"] not in SUPPORTED_CONTENT_TYPES:
+        if upload.content_type not in SUPPORTED_CONTENT_TYPES:
             return {
-                "file": file_data["filename"],
-                "error": f"Unsupported file type: {file_data['content_type']}"
+                "file": upload.filename,
+                "error": f"Unsupported file type: {upload.content_type}"
             }
 
-        initial_state = create_initial_state(file_data["bytes"], DynamicSchema)
-        logger.info(f"Running OCR agent on {file_data['filename']}")        
+        initial_state = create_initial_state(upload, schema, on_page)
+        logger.info(f"Running OCR agent on {upload.filename}")        
         final_state = await agent.graph.ainvoke(initial_state)
         return {
-            "file": file_data["filename"],
-            "structured": final_state["structured"]
+            "file": upload.filename,
+            "structured": final_state["structured"],
+            "pages": final_state["ocr_pages"],
+            **conflicts_field(final_state)
         }
         
     except Exception as e:
-        logger.exception(f"Error processing {file_data['filename']}")
+        logger.exception(f"Error processing {upload.filename}")
         return {
-            "file": file_data["filename"],
+            "file": upload.filename,
             "error": f"Processing failed: {str(e)}"
         }
+    finally:
+        upload.close()
 
 async def process_batch_files(
-    files_data: List[Dict[str, Any]], 
-    DynamicSchema: type[BaseModel], 
-    agent: OcrAgent
+    uploads: List[SpooledUpload], 
+    schema: CompiledSchema, 
+    agent: OcrAgent,
+    on_page: Optional[PageCallback] = None
 ) -> Dict[str, Any]:
-    """Process multiple files as pages of a single document."""
+    """
+    Process multiple files as pages of a single document.
+
+    All files are OCRed concurrently (the shared OCR executor bounds how many
+    run at once), then their text is joined in upload order, each file
+    preceded by a "[File n: name]" marker, for a single extraction call.
+    """
     try:
-        logger.debug(f"Processing batch of {len(files_data)} files")
+        logger.debug(f"Processing batch of {len(uploads)} files")
         
-        # Combine all file bytes for batch processing
+        supported = [upload for upload in uploads if upload.content_type in SUPPORTED_CONTENT_TYPES]
+        filenames = [upload.filename for upload in supported]
+
+        # gather returns results in upload order, whatever order OCR finishes in
+        ocr_states = await gather(*(
+            ocr_step(create_initial_state(upload, schema, on_page)) for upload in supported
+        ))
+
+        # Combine the text of all files for batch processing
         combined_text = []
-        filenames = []
-        
-        for file_data in files_data:
-            if file_data["content_type"] not in SUPPORTED_CONTENT_TYPES:
-                continue
-                
-            filenames.append(file_data["filename"])
-            
-            # Extract text from each file
-            initial_state = create_initial_state(file_data["bytes"], DynamicSchema)
-            ocr_state = await agent.graph.nodes["ocr"](initial_state)
+        pages = []
+        key_values = []
+        for index, (upload, ocr_state) in enumerate(zip(supported, ocr_states), start=1):
+            combined_text.append(f"[File {index}: {upload.filename}]")
             combined_text.extend(ocr_state["extracted_text"])
+            pages.extend({"file": upload.filename, **page} for page in ocr_state["ocr_pages"])
+            key_values.extend({"file": upload.filename, **pair} for pair in ocr_state["ocr_key_values"])
         
-        if not combined_text:
+        if not any(ocr_state["extracted_text"] for ocr_state in ocr_states):
             return {
                 "files": filenames,
                 "error": "No text extracted from any files"
@@ -115,45 +125,44 @@ async def process_batch_files(
         batch_state = {
             "file": None,
             "extracted_text": combined_text,
-            "schema": DynamicSchema,
-            "structured": None
+            "ocr_pages": pages,
+            "schema": schema,
+            "structured": None,
+            "extraction_conflicts": None,
+            "ocr_key_values": key_values,
+            "on_page": None
         }
         
         # Build schema from combined text
-        final_state = await agent.graph.nodes["build_schema"](batch_state)
+        final_state = await build_pydantic_schema(batch_state)
         
         return {
             "files": filenames,
-            "structured": final_state["structured"]
+            "structured": final_state["structured"],
+            "pages": pages,
+            **conflicts_field(final_state)
         }
         
     except Exception as e:
         logger.exception("Error processing batch files")
         return {
-            "files": [f["filename"] for f in files_data],
+            "files": [upload.filename for upload in uploads],
             "error": f"Batch processing failed: {str(e)}"
         }
-
-def build_dynamic_model(schema_dict: Dict) -> type[BaseModel]:
-    """Build a dynamic Pydantic model from a schema dictionary."""
-    logger.debug("Building dynamic model")
-    fields = {}
-    
-    for field_name, (type_str, required, description) in schema_dict.items():
-        py_type = get_python_type(type_str)
-        default = ... if required else None
-        field_def = Field(default, description=description)
-        fields[field_name] = (py_type, field_def)
-        
-    return create_model("DynamicSchema", **fields)
+    finally:
+        for upload in uploads:
+            upload.close()
 
 router = APIRouter()
 
 @router.post("/extract")
 async def extract_text(
     files: List[UploadFile] = File(...),
-    schema: str = Form(...),
+    schema: Optional[str] = Form(None),
+    schema_id: Optional[int] = Form(None),
     batch_mode: bool = Form(False),
+    progress: bool = Form(False),
+    db: AsyncSession = Depends(get_db),
     current_user:User=Depends(get_current_user)
 ) -> StreamingResponse:
     """
@@ -162,31 +171,39 @@ async def extract_text(
     Args:
         files: List of uploaded files for OCR processing
         schema: JSON string defining the expected output schema
+        schema_id: ID of one of the user's stored schemas, instead of schema
         batch_mode: If True, combine all files as pages of one document
+        progress: If True, also stream a {"event": "page", "file", "page",
+            "page_count", "source", "chars", "cached"} line as soon as each
+            page is OCRed, ahead of its file's result
         
     Returns:
         StreamingResponse: NDJSON stream of processing results
     """
-    _=current_user
     if not files:
         raise HTTPException(status_code=400, detail="No files were provided")
 
+    esquema = None
+    if schema_id is not None:
+        esquema = await get_schema_by_id(db, schema_id, user_id=current_user.id)
+        if not esquema:
+            raise HTTPException(status_code=404, detail="Schema not found")
+        schema = esquema.schema_data
+    elif schema is None:
+        raise HTTPException(status_code=400, detail="Either schema or schema_id is required")
+
     # Parse and validate schema
     try:
-        schema_dict = json.loads(schema)
-        if not isinstance(schema_dict, dict):
-            raise ValueError("Schema must be a JSON object")
-    except (json.JSONDecodeError, ValueError) as e:
+        parse_schema_json(schema)
+    except ValueError as e:
         return StreamingResponse(
             iter([json.dumps({"error": f"Invalid schema: {str(e)}"}) + "\n"]),
             media_type="application/x-ndjson"
         )
 
-    # Create dynamic model from schema (cached)
+    # Model, parser and prompt are compiled once per schema version
     try:
-        schema_key = frozenset((k, tuple(v) if isinstance(v, list) else v) 
-                             for k, v in schema_dict.items())
-        DynamicSchema = get_cached_dynamic_model(schema_key)
+        compiled_schema = schema_registry.compile_stored(esquema) if esquema else schema_registry.compile_inline(schema)
     except Exception as e:
         logger.exception("Failed to create dynamic model from schema")
         return StreamingResponse(
@@ -194,21 +211,15 @@ async def extract_text(
             media_type="application/x-ndjson"
         )
 
-    # Read all files into memory (consider streaming for large files)
-    file_data = []
+    # Copy uploads to spool files owned by this request (FastAPI closes the
+    # UploadFiles when this function returns, before results are streamed)
+    max_file_bytes = int(os.getenv("OCR_MAX_FILE_MB", 50)) * 1024 * 1024
+    uploads = []
     error_responses = []
     
     for file in files:
         try:
-            content = await file.read()
-            if not content:
-                raise ValueError("Empty file")
-                
-            file_data.append({
-                "filename": file.filename or "unnamed_file",
-                "content_type": file.content_type or "application/octet-stream",
-                "bytes": content
-            })
+            uploads.append(await spool_upload(file, max_file_bytes))
         except Exception as e:
             error_msg = f"Error reading file {file.filename}: {str(e)}"
             logger.error(error_msg)
@@ -228,8 +239,24 @@ async def extract_text(
             logger.error(f"JSON serialization error: {e}")
             return json.dumps({"error": "Serialization failed"})
 
+    # Page events and file results share one queue, so each is streamed as soon as it happens
+    events: Queue = Queue()
+
+    def on_page(filename: str, report: dict):
+        events.put_nowait(("page", {"event": "page", "file": filename, **report}))
+
+    async def publish(job, failure: str):
+        """Await a processing job and queue its result line"""
+        try:
+            result = await job
+        except Exception as e:
+            logger.exception(failure)
+            result = {"error": f"{failure}: {str(e)}"}
+        events.put_nowait(("result", result))
+
     # Stream results as they complete
     async def stream_results():
+        tasks = []
         try:
             # First yield any file reading errors
             for error in error_responses:
@@ -238,45 +265,40 @@ async def extract_text(
                     yield json_line + "\n"
                 
             # Then process the files that were read successfully
-            if file_data:
+            if uploads:
+                page_events = on_page if progress else None
                 if batch_mode:
                     # Process all files as one document
-                    try:
-                        result = await process_batch_files(file_data, DynamicSchema, agent)
-                        json_line = safe_json_dumps(result)
-                        if json_line:
-                            yield json_line + "\n"
-                    except Exception as e:
-                        logger.exception("Error in batch processing")
-                        error_result = {"error": f"Batch processing failed: {str(e)}"}
-                        json_line = safe_json_dumps(error_result)
-                        if json_line:
-                            yield json_line + "\n"
+                    tasks = [create_task(publish(
+                        process_batch_files(uploads, compiled_schema, agent, page_events), "Batch processing failed"
+                    ))]
                 else:
                     # Process files individually
                     tasks = [
-                        process_single_file(file, DynamicSchema, agent)
-                        for file in file_data
+                        create_task(publish(process_single_file(upload, compiled_schema, agent, page_events), "Unexpected error"))
+                        for upload in uploads
                     ]
-                    
-                    for future in as_completed(tasks):
-                        try:
-                            result = await future
-                            json_line = safe_json_dumps(result)
-                            if json_line:
-                                yield json_line + "\n"
-                        except Exception as e:
-                            logger.exception("Unexpected error in result streaming")
-                            error_result = {"error": f"Unexpected error: {str(e)}"}
-                            json_line = safe_json_dumps(error_result)
-                            if json_line:
-                                yield json_line + "\n"
+
+                remaining = len(tasks)
+                while remaining:
+                    kind, payload = await events.get()
+                    if kind == "result":
+                        remaining -= 1
+                    json_line = safe_json_dumps(payload)
+                    if json_line:
+                        yield json_line + "\n"
         except Exception as e:
             logger.exception("Critical error in stream_results")
             final_error = {"error": "Stream processing failed"}
             json_line = safe_json_dumps(final_error)
             if json_line:
                 yield json_line + "\n"
+        finally:
+            # Covers files never reached, e.g. when the client disconnects
+            for task in tasks:
+                task.cancel()
+            for upload in uploads:
+                upload.close()
 
     return StreamingResponse(
         stream_results(),
@@ -1,8 +1,14 @@
-from fastapi import APIRouter,Depends
+import json
+import asyncio
+from fastapi import APIRouter,Depends,HTTPException
+from fastapi.responses import StreamingResponse
 from src.schemas.schemas import ScrapAgentRequest, ScrapAgentResponse
 from src.agents.scrap import ScrapAgent
+from src.nodes.scrap_news_node import scrap_urls, select_summary_type, build_summary_prompt, build_comparative_prompt
+from src.services.model_router import get_llm
 from src.routers.auth_route import get_current_user
 from src.models.models import User
+from src.logger import logger
 
 router= APIRouter()
 
@@ -13,7 +19,9 @@ def create_initial_state(urls:list):
     state={
        "url":urls,
        "title":"",
+       "titles":[],
        "text":[],
+       "errors":[],
        "summary":"",
     }
 
@@ -26,4 +34,89 @@ async def agent_scrap_call(request:ScrapAgentRequest,current_user:User=Depends(g
     agent = ScrapAgent()
     final_state = await agent.graph.ainvoke(state)
 
-    return {"summary":final_state["summary"]}
\ No newline at end of file
+    if not final_state["text"]:
+        raise HTTPException(status_code=502, detail={"message": "None of the URLs could be scraped", "errors": final_state["errors"]})
+
+    return {"summary":final_state["summary"],"errors":final_state["errors"]}
+
+def sse_event(data) -> str:
+    """Format one Server-Sent Events message."""
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"data: {payload}\n\n"
+
+@router.post("/scrap/stream", summary="Scrap and summarize URLs, streaming progress and tokens")
+async def agent_scrap_stream(request:ScrapAgentRequest,current_user:User=Depends(get_current_user)) -> StreamingResponse:
+    """
+    SSE variant of /scrap.
+
+    Emits one event per fetched (or failed) URL, then the Markdown summary as
+    it is generated, token by token. Events are JSON objects with a "type" of
+    "fetched", "fetch_error", "condensing", "token", "error" or "done"; the
+    stream ends with "data: [DONE]".
+
+    Args:
+        request: URLs to scrap
+        current_user: The authenticated user (injected by dependency)
+
+    Returns:
+        StreamingResponse: text/event-stream
+    """
+    urls = [str(url) for url in request.urls]
+    logger.info(f"Streaming scrap of {len(urls)} URLs for user: {current_user.username}")
+
+    async def stream_events():
+        loop = asyncio.get_running_loop()
+        progress = asyncio.Queue()
+
+        def on_result(event):
+            # Called from the scraping threads
+            loop.call_soon_threadsafe(progress.put_nowait, event)
+
+        def scrap():
+            try:
+                return scrap_urls(urls, on_result)
+            finally:
+                # Ends the progress loop even if scrap_urls fails before reporting every URL
+                loop.call_soon_threadsafe(progress.put_nowait, None)
+
+        scraping = asyncio.ensure_future(asyncio.to_thread(scrap))
+        while (event := await progress.get()) is not None:
+            event_type = "fetch_error" if "error" in event else "fetched"
+            yield sse_event({"type": event_type, **event})
+        try:
+            titles, texts, errors = await scraping
+        except Exception as e:
+            logger.error(f"Error scraping URLs: {str(e)}", exc_info=True)
+            yield sse_event({"type": "error", "message": f"Error scraping URLs: {str(e)}"})
+            yield sse_event("[DONE]")
+            return
+
+        state = create_initial_state(urls)
+        state.update(titles=titles, text=texts, errors=errors, title=titles[0] if titles else "")
+        summary_type = select_summary_type(state)
+        if summary_type not in ("summarize", "comparative"):
+            yield sse_event({"type": "error", "message": "None of the URLs could be scraped"})
+            yield sse_event("[DONE]")
+            return
+
+        try:
+            yield sse_event({"type": "condensing", "documents": len(texts)})
+            build_prompt = build_summary_prompt if summary_type == "summarize" else build_comparative_prompt
+            prompt = await asyncio.to_thread(build_prompt, state)
+
+            llm = get_llm("scrap_summary")
+            async for chunk in llm.astream(prompt):
+                content = chunk.text()
+                if content:
+                    yield sse_event({"type": "token", "content": content})
+            yield sse_event({"type": "done", "errors": errors})
+        except Exception as e:
+            logger.error(f"Error streaming scrap summary: {str(e)}", exc_info=True)
+            yield sse_event({"type": "error", "message": f"Error generating summary: {str(e)}"})
+        yield sse_event("[DONE]")
+
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
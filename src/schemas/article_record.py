@@ -0,0 +1,63 @@
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+# Same netloc as urllib.parse.urlsplit, without building a SplitResult per article
+NETLOC_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*://([^/?#]*)")
+
+def source_domain(url: str) -> str:
+    """Return the domain of an article URL without the 'www.' prefix."""
+    match = NETLOC_PATTERN.match(url)
+    netloc = match.group(1).lower() if match else ""
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+@dataclass(slots=True)
+class ArticleRecord:
+    """
+    One article as it moves through the research graph.
+
+    Built once from a feed entry, page or knowledge base row and then updated
+    in place by the summarize and analysis nodes. Dates are parsed once
+    (naive UTC) and the source domain is interned, since many articles come
+    from the same few outlets.
+    """
+    title: str
+    url: str  # Feed link until the page is scraped, then the article URL
+    description: str = ""
+    published: Optional[datetime] = None
+    text: str = ""
+    summary: Optional[str] = None  # "* bullet" lines
+    topics: List[str] = field(default_factory=list)
+    bias: Optional[str] = None
+    bias_explanation: Optional[str] = None
+    from_knowledge_base: bool = False
+    source: str = field(init=False)
+
+    def __post_init__(self):
+        self.source = sys.intern(source_domain(self.url))
+
+    def with_page(self, url: str, text: str) -> "ArticleRecord":
+        """Return a copy pointing at the scraped article URL and its text."""
+        return ArticleRecord(
+            self.title, url, self.description, self.published, text, self.summary,
+            list(self.topics), self.bias, self.bias_explanation, self.from_knowledge_base
+        )
+
+    @property
+    def bullets(self) -> List[str]:
+        lines = (self.summary or "").strip().split("\n")
+        return [line.strip("* ").strip() for line in lines if line.startswith("*")]
+
+    def to_summary(self) -> dict:
+        """Serialize to the fields of the ArticleSummary response model."""
+        return {
+            "title": self.title,
+            "url": self.url,
+            "bullets": self.bullets,
+            "date": self.published,
+            "topics": self.topics,
+            "bias": self.bias,
+            "bias_explanation": self.bias_explanation,
+        }
@@ -1,7 +1,11 @@
-from typing import TypedDict,Annotated,List,Literal,Optional
+from typing import TypedDict,Annotated,List,Literal,Optional,Any,Callable
 from pydantic import BaseModel,Field,HttpUrl
 from datetime import datetime
 
+from src.schemas.article_record import ArticleRecord
+from src.services.extraction_schemas import CompiledSchema
+from src.services.upload_spool import SpooledUpload
+
 class AgentState(TypedDict):
     news_query: Annotated[str, "Input query to extract news search parameters from."]
     languages: Annotated[List[str],"News languages"]
@@ -14,19 +18,23 @@ class AgentState(TypedDict):
     num_searches_remaining: Annotated[int, "Number of articles to search for."]
     newsapi_params: Annotated[dict, "Structured argument for the News API."]
     past_searches: Annotated[List[dict], "List of search params already used."]
-    articles_metadata: Annotated[list[dict], "Article metadata response from the News API"]
+    articles_metadata: Annotated[List[ArticleRecord], "Article metadata response from the News API"]
     scraped_urls: Annotated[List[str], "List of urls already scraped."]    
-    potential_articles: Annotated[List[dict[str, str, str]], "Article with full text to consider summarizing."]
-    tldr_articles: Annotated[List[dict[str, str, str]], "Selected article TL;DRs."]
+    known_articles: Annotated[List[ArticleRecord], "Already-summarized articles found in the knowledge base."]
+    potential_articles: Annotated[List[ArticleRecord], "Article with full text to consider summarizing."]
+    tldr_articles: Annotated[List[ArticleRecord], "Selected article TL;DRs."]
     formatted_results: Annotated[str, "Formatted results to display."]
     report: Annotated[str,"Final State of the art report"]
-    mode :Annotated[str,"Agent Mode:simple or advanced"]
+    mode :Annotated[str,"Agent Mode: fast, simple or advanced"]
+    shared_context: Annotated[Optional[Any], "SharedResearchContext reused by queries of the same batch."]
   
 
 class ScraperAgentState(TypedDict):
     url: Annotated[List,"Url of the article, doc or news to scrap"]
-    title: Annotated[str,"Title of the url article"]
+    title: Annotated[str,"Title of the first scraped article"]
+    titles: Annotated[List[str],"Titles of the scraped articles, aligned with text"]
     text: Annotated[List,"List of Body Texts of the articles"]
+    errors: Annotated[List[dict],"URLs that could not be scraped and why"]
     summary: Annotated[str,"Summary of Article"]
 
 class AgentRequest(BaseModel):
@@ -35,7 +43,7 @@ class AgentRequest(BaseModel):
     articles:int = Field(description="Number of articles to summarize",gt=0,le=10)
 
     # Agent Mode
-    mode:str=Field(description="News agent mode")
+    mode:Literal["fast", "simple", "advanced"]=Field(description="News agent mode: 'fast' (feed headlines only), 'simple' or 'advanced'")
 
     # Optional fields
     source: Optional[List[str]] = Field(None, description="Specific news source domain (e.g. 'bbc.com')")
@@ -46,10 +54,10 @@ class ArticleSummary(BaseModel):
     title: str
     url: HttpUrl
     bullets: List[str]
-    date: datetime
-    topics: List[str]
-    bias: Literal["center", "left", "right", "humor"]
-    bias_explanation: str
+    date: Optional[datetime] = None  # Feed entries without a publication date
+    topics: List[str] = []
+    bias: Optional[Literal["center", "left", "right", "humor"]] = None  # Not analyzed in fast mode
+    bias_explanation: Optional[str] = None
     
 class ArticleAnalysis(BaseModel):
     topics: List[str] = Field(description="Main topics or entities in the news article.")
@@ -61,6 +69,19 @@ class ArticleBulletSummary(BaseModel):
     url:HttpUrl = Field(description="Url of the New")
     bullet_summary: str = Field(description= "* tl;dr bulleted summary, use bullet points for each sentences in a new line")
 
+class IndexedBulletSummary(ArticleBulletSummary):
+    index: int = Field(description="Index of the article in the provided list")
+
+class PackedBulletSummaries(BaseModel):
+    summaries: List[IndexedBulletSummary] = Field(description="One summary per provided article")
+
+class HeadlineBullets(BaseModel):
+    index: int = Field(description="Index of the feed item in the provided list")
+    bullets: List[str] = Field(description="One to three short bullets based only on the item's title and description")
+
+class HeadlineBriefing(BaseModel):
+    items: List[HeadlineBullets] = Field(description="Selected feed items, most relevant first")
+
 class AgentResponse(BaseModel):
     header: str
     summaries: List[ArticleSummary]
@@ -69,15 +90,24 @@ class AgentResponse(BaseModel):
 class ScrapAgentRequest(BaseModel):
     urls:List[HttpUrl]
 
+class ScrapError(BaseModel):
+    url: str
+    error: str
+
 class ScrapAgentResponse(BaseModel):
     summary:str = Field(description="Summary of the article")
+    errors: List[ScrapError] = Field(default=[], description="URLs that could not be scraped")
 
 # OCR SCHEMAS
 class OCRResponse(BaseModel):
     structured : dict = Field(description="Structured text extracted from the file")
 
 class OcrAgentState(TypedDict):
-    file: Optional[bytes]
+    file: Optional[SpooledUpload]  # Released by the OCR step once its text is extracted
     extracted_text: Optional[str]
-    schema: dict
-    structured: Optional[dict]
\ No newline at end of file
+    ocr_pages: Optional[List[dict]]  # Per-page source ("native" or "textract") and char count
+    schema: CompiledSchema  # Model, parser and prompt for the requested fields
+    structured: Optional[dict]
+    extraction_conflicts: Optional[dict]  # Field -> differing values found across chunks
+    ocr_key_values: Optional[List[dict]]  # Textract FORMS/TABLES pairs (OCR_TEXTRACT_FEATURES)
+    on_page: Optional[Callable[[dict], None]]  # Gets each page's OCR report as soon as it is done
\ No newline at end of file
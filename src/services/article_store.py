@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from sqlalchemy import select, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Article, ARTICLE_SEARCH_CONFIG, search_vector
+from src.schemas.article_record import source_domain
+
+# Tracking parameters dropped from canonical URLs
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "ocid", "cmpid")
+
+# Longest text kept per article (tsvector documents are capped at 1 MB)
+MAX_STORED_TEXT_CHARS = 100_000
+
+def canonicalize_url(url: str) -> str:
+    """Normalize an article URL so the same article always maps to one row."""
+    parts = urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    ])
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", netloc, path, query, ""))
+
+# Search recent, already-summarized articles relevant to a query
+async def search_recent_articles(
+    db: AsyncSession,
+    query: str,
+    max_age_hours: int,
+    limit: int,
+    sources: Optional[List[str]] = None
+) -> List[Article]:
+    vector = search_vector(Article.title, Article.summary, Article.text)
+    ts_query = func.websearch_to_tsquery(literal_column(f"'{ARTICLE_SEARCH_CONFIG}'::regconfig"), query)
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+
+    stmt = (
+        select(Article)
+        .where(vector.op("@@")(ts_query))
+        .where(Article.summary.is_not(None))
+        .where(Article.published_at >= cutoff)
+        .order_by(func.ts_rank(vector, ts_query).desc(), Article.published_at.desc())
+        .limit(limit)
+    )
+    if sources:
+        stmt = stmt.where(Article.source.in_([source_domain(f"https://{s}") for s in sources]))
+
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+# Insert processed articles, or refresh them if the URL is already stored
+async def upsert_articles(db: AsyncSession, articles: List[dict]) -> int:
+    if not articles:
+        return 0
+    rows = []
+    for article in articles:
+        url = canonicalize_url(article["url"])
+        rows.append({
+            "url": url,
+            "title": article["title"],
+            "published_at": article.get("published_at"),
+            "source": source_domain(url),
+            "language": article.get("language"),
+            "text": (article.get("text") or "")[:MAX_STORED_TEXT_CHARS],
+            "summary": article.get("summary"),
+            "topics": article.get("topics"),
+            "bias": article.get("bias"),
+            "bias_explanation": article.get("bias_explanation"),
+        })
+    # Last write wins if the same canonical URL appears twice in one batch
+    rows = list({row["url"]: row for row in rows}.values())
+
+    stmt = insert(Article).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Article.url],
+        set_={
+            column: stmt.excluded[column]
+            for column in ("title", "published_at", "text", "summary", "topics", "bias", "bias_explanation")
+        } | {"updated_at": func.now()}
+    )
+    try:
+        await db.execute(stmt)
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        raise Exception(f"Failed to store articles: {str(e)}") from e
+    return len(rows)
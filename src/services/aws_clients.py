@@ -0,0 +1,81 @@
+import os
+import time
+from threading import Lock
+
+import boto3
+from botocore.config import Config
+
+from src.logger import logger
+from src.metrics import metrics
+from src.services.textract_local import local_textract_from_env
+
+# Clients shared by every request of the process; boto3 clients are thread-safe
+_textract_client = None
+_s3_client = None
+_clients_lock = Lock()
+
+def textract_client_config() -> Config:
+    """
+    botocore config for the shared Textract client.
+
+    The connection pool fits every concurrent OCR caller: the per-page pool
+    (OCR_TEXTRACT_CONCURRENCY) plus single-image jobs on the OCR pool
+    (OCR_EXECUTOR_WORKERS).
+    """
+    pool_size = int(os.getenv("OCR_TEXTRACT_CONCURRENCY", 8)) + int(os.getenv("OCR_EXECUTOR_WORKERS", 4))
+    return Config(
+        max_pool_connections=pool_size,
+        connect_timeout=float(os.getenv("OCR_TEXTRACT_CONNECT_TIMEOUT", 5)),
+        read_timeout=float(os.getenv("OCR_TEXTRACT_READ_TIMEOUT", 60)),
+        retries={"max_attempts": int(os.getenv("OCR_TEXTRACT_MAX_ATTEMPTS", 5)), "mode": "adaptive"},
+    )
+
+def get_textract_client():
+    """
+    Return the process-wide Textract client, creating it on first use.
+
+    With OCR_TEXTRACT_LOCAL=true this is the in-process stand-in from
+    textract_local instead, for load tests without AWS.
+    """
+    global _textract_client
+    with _clients_lock:
+        if _textract_client is None:
+            start = time.perf_counter()
+            _textract_client = local_textract_from_env()
+            if _textract_client is None:
+                session = boto3.Session(profile_name="default")
+                _textract_client = session.client("textract", config=textract_client_config())
+            setup_seconds = time.perf_counter() - start
+            metrics.record("textract_client_setup_seconds", setup_seconds)
+            logger.info(f"Created Textract client in {setup_seconds * 1000:.0f} ms")
+        return _textract_client
+
+def get_s3_client():
+    """
+    Return the process-wide S3 client, used to stage documents for asynchronous Textract jobs.
+
+    With OCR_TEXTRACT_LOCAL=true this is the local Textract stand-in's
+    in-memory bucket, which its jobs read from.
+    """
+    global _s3_client
+    if os.getenv("OCR_TEXTRACT_LOCAL", "false").lower() == "true":
+        return get_textract_client().s3
+    with _clients_lock:
+        if _s3_client is None:
+            start = time.perf_counter()
+            session = boto3.Session(profile_name="default")
+            _s3_client = session.client("s3", config=Config(
+                max_pool_connections=int(os.getenv("OCR_EXECUTOR_WORKERS", 4)),
+                retries={"max_attempts": int(os.getenv("OCR_TEXTRACT_MAX_ATTEMPTS", 5)), "mode": "adaptive"},
+            ))
+            setup_seconds = time.perf_counter() - start
+            metrics.record("s3_client_setup_seconds", setup_seconds)
+            logger.info(f"Created S3 client in {setup_seconds * 1000:.0f} ms")
+        return _s3_client
+
+def reset_clients() -> None:
+    """Drop the shared clients so the next call builds new ones (config or credential changes)."""
+    global _textract_client, _s3_client
+    with _clients_lock:
+        _textract_client = None
+        _s3_client = None
@@ -30,6 +30,11 @@ class ConfigLoader:
         templates_file = self.config_dir / "sql_templates.json"
         return self._load_json_file(templates_file)
     
+    def load_model_routing(self) -> Dict[str, Any]:
+        """Carga el ruteo de modelos por tarea desde el archivo JSON"""
+        routing_file = self.config_dir / "model_routing.json"
+        return self._load_json_file(routing_file)
+    
     def _load_json_file(self, file_path: Path) -> Dict[str, Any]:
         """Carga un archivo JSON y retorna su contenido"""
         try:
@@ -49,6 +54,7 @@ class ConfigLoader:
             self.load_business_rules()
             self.load_table_relationships()
             self.load_sql_templates()
+            self.load_model_routing()
             return True
         except Exception as e:
             print(f"Error al recargar configuración: {e}")
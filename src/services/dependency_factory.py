@@ -1,5 +1,3 @@
-import os
-from langchain_aws import ChatBedrockConverse
 from google.cloud import bigquery
 from google.oauth2 import service_account
 
@@ -10,6 +8,7 @@ from .finance_orchestrator import FinanceQueryOrchestrator
 from .intent_service import IntentAnalysisService
 from .business_rules_service import BusinessRulesService
 from .bquery_db import BigQueryConfig
+from .model_router import get_llm
 
 
 class DependencyFactory:
@@ -22,16 +21,16 @@ class DependencyFactory:
         # Crear cliente BigQuery
         bq_client = DependencyFactory._create_bigquery_client()
         
-        # Crear cliente LLM
-        llm_client = ChatBedrockConverse(
-            model_id=os.getenv("REASONING_MODEL")
-        )
+        # Crear clientes LLM por tarea (modelo ligero para clasificación)
+        query_llm_client = get_llm("generate_response")
+        sql_llm_client = get_llm("sql_generation")
+        intent_llm_client = get_llm("intent_analysis")
         
         # Crear servicios
-        query_service = BigQueryService(bq_client, llm_client)
+        query_service = BigQueryService(bq_client, query_llm_client, sql_llm_client)
         schema_service = SchemaFactory.create_schema_service("multi_table")
         streaming_service = StreamingService(chunk_size=20)
-        intent_service = IntentAnalysisService(llm_client)
+        intent_service = IntentAnalysisService(intent_llm_client)
         business_rules_service = BusinessRulesService()
         
         # Crear orquestador
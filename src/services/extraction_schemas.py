@@ -0,0 +1,154 @@
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
+from functools import cached_property
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import PromptTemplate
+from pydantic import BaseModel, Field, create_model
+
+from src.logger import logger
+
+SUPPORTED_FIELD_TYPES: Dict[str, Type] = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+    "list": List[Any],
+    "dict": dict,
+    "date": date
+}
+
+EXTRACTION_TEMPLATE = "Extract the following information from the text: {text}\n{format_instructions}\nIMPORTANT: Return only valid JSON with double-quoted property names."
+
+CHUNK_EXTRACTION_TEMPLATE = (
+    "The text below is part {part} of {parts} of a longer document. Extract the following information "
+    "from this part only, using null for anything it does not contain: {text}\n{format_instructions}\n"
+    "IMPORTANT: Return only valid JSON with double-quoted property names."
+)
+
+def get_python_type(type_string: str) -> Type:
+    """Convert string type representation to Python type."""
+    return SUPPORTED_FIELD_TYPES.get(type_string.lower(), str)
+
+def build_dynamic_model(schema_dict: Dict) -> type[BaseModel]:
+    """Build a dynamic Pydantic model from a schema dictionary."""
+    logger.debug("Building dynamic model")
+    fields = {}
+
+    for field_name, (type_str, required, description) in schema_dict.items():
+        py_type = get_python_type(type_str)
+        default = ... if required else None
+        field_def = Field(default, description=description)
+        fields[field_name] = (py_type, field_def)
+
+    return create_model("DynamicSchema", **fields)
+
+def partial_model(model: type[BaseModel]) -> type[BaseModel]:
+    """Copy of a model with every field optional, for extracting from part of a document."""
+    fields = {
+        name: (Optional[field.annotation], Field(None, description=field.description))
+        for name, field in model.model_fields.items()
+    }
+    return create_model(f"Partial{model.__name__}", **fields)
+
+def parse_schema_json(schema_json: str) -> dict:
+    """
+    Parse a schema definition ({"field": [type, required, description]}).
+
+    Raises:
+        ValueError: If the text is not a JSON object
+    """
+    schema_dict = json.loads(schema_json)
+    if not isinstance(schema_dict, dict):
+        raise ValueError("Schema must be a JSON object")
+    return schema_dict
+
+def schema_version(schema_json: str) -> str:
+    """Content version of a schema definition"""
+    return hashlib.sha256(schema_json.encode("utf-8")).hexdigest()[:16]
+
+@dataclass(eq=False)
+class CompiledSchema:
+    """A schema ready for extraction: its model, output parser and prompt."""
+    model: type[BaseModel]
+    parser: JsonOutputParser
+    prompt: PromptTemplate
+    _subsets: Dict[Tuple[str, ...], "CompiledSchema"] = field(default_factory=dict, init=False, repr=False)
+
+    @classmethod
+    def from_model(cls, model: type[BaseModel], template: str = EXTRACTION_TEMPLATE) -> "CompiledSchema":
+        parser = JsonOutputParser(pydantic_object=model)
+        prompt = PromptTemplate.from_template(template, partial_variables={"format_instructions": parser.get_format_instructions()})
+        return cls(model, parser, prompt)
+
+    @classmethod
+    def from_dict(cls, schema_dict: dict) -> "CompiledSchema":
+        return cls.from_model(build_dynamic_model(schema_dict))
+
+    @cached_property
+    def partial(self) -> "CompiledSchema":
+        """All-optional variant with the chunk prompt, used for long documents"""
+        return CompiledSchema.from_model(partial_model(self.model), CHUNK_EXTRACTION_TEMPLATE)
+
+    def subset(self, field_names: List[str]) -> "CompiledSchema":
+        """Schema of only the given fields, for asking the LLM about what the form did not answer"""
+        key = tuple(name for name in self.model.model_fields if name in field_names)
+        if key not in self._subsets:
+            fields = {name: (self.model.model_fields[name].annotation, self.model.model_fields[name]) for name in key}
+            self._subsets[key] = CompiledSchema.from_model(create_model(f"{self.model.__name__}Subset", **fields))
+        return self._subsets[key]
+
+class SchemaRegistry:
+    """
+    LRU cache of compiled extraction schemas.
+
+    Stored schemas (Esquema rows) are keyed by ID and content version, so an
+    edited schema is recompiled even in a process that missed the
+    invalidation; inline schemas sent with a request are keyed by content.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, CompiledSchema]" = OrderedDict()
+        self._lock = Lock()
+
+    def _get_or_compile(self, key: tuple, schema_json: str) -> CompiledSchema:
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                return compiled
+        compiled = CompiledSchema.from_dict(parse_schema_json(schema_json))
+        with self._lock:
+            self._entries[key] = compiled
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def compile_inline(self, schema_json: str) -> CompiledSchema:
+        """
+        Compile a schema sent with a request.
+
+        Raises:
+            ValueError: If the schema is not valid JSON or not an object
+            TypeError: If a field definition is not [type, required, description]
+        """
+        canonical = json.dumps(parse_schema_json(schema_json), sort_keys=True)
+        return self._get_or_compile(("inline", schema_version(canonical)), canonical)
+
+    def compile_stored(self, esquema) -> CompiledSchema:
+        """Compile a stored Esquema row, reusing the cached version when unchanged."""
+        return self._get_or_compile((esquema.id, schema_version(esquema.schema_data)), esquema.schema_data)
+
+    def invalidate(self, schema_id: int) -> None:
+        """Drop every cached version of a stored schema."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == schema_id]:
+                del self._entries[key]
+
+schema_registry = SchemaRegistry()
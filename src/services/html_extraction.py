@@ -0,0 +1,7 @@
+# Lightweight module imported by parsing workers: keep its imports minimal
+from bs4 import BeautifulSoup
+
+def extract_text_from_html(content: bytes) -> str:
+    """Parse raw HTML bytes and return the visible page text."""
+    soup = BeautifulSoup(content, 'lxml')  # Uses lxml parser
+    return soup.get_text(strip=True)
@@ -0,0 +1,104 @@
+import os
+import logging
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from langchain_aws import ChatBedrockConverse
+
+from .config_loader import ConfigLoader
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+class ModelRouter:
+    """
+    Maps LLM task names to Bedrock model IDs.
+
+    Tasks are assigned to tiers in src/config/model_routing.json ("light" for
+    classification/selection, "heavy" for long-form generation). Each tier
+    reads its model ID from an environment variable, and any task can be
+    pinned with MODEL_<TASK_NAME> (e.g. MODEL_SELECT_TOP_URLS). Tiers without
+    a configured model fall back to REASONING_MODEL. Latency-bound tasks can
+    opt out of fallback models with "use_fallbacks": false.
+    """
+
+    def __init__(self, config_loader: Optional[ConfigLoader] = None):
+        self.config_loader = config_loader or ConfigLoader()
+        self.routing = self.config_loader.load_model_routing()
+
+    def reload(self) -> None:
+        """Reload the routing table from disk."""
+        self.routing = self.config_loader.load_model_routing()
+
+    def get_model_id(self, task: str) -> Optional[str]:
+        """Resolve the primary model ID for a task."""
+        override = os.getenv(f"MODEL_{task.upper()}")
+        if override:
+            return override
+        task_config = self._task_config(task)
+        if task_config.get("model"):
+            return task_config["model"]
+        return self._tier_model_id(task_config.get("tier", self.routing.get("default_tier", "heavy")))
+
+    def get_fallback_model_ids(self, task: str) -> List[str]:
+        """Resolve the ordered, de-duplicated fallback model IDs for a task."""
+        task_config = self._task_config(task)
+        if not task_config.get("use_fallbacks", True):
+            return []
+        tier = task_config.get("tier", self.routing.get("default_tier", "heavy"))
+        # Explicit fallbacks, then the task's own tier (if pinned), then the fallback tiers
+        candidates = list(task_config.get("fallbacks", [])) + [self._tier_model_id(tier)]
+        for fallback_tier in self.routing.get("tiers", {}).get(tier, {}).get("fallback_tiers", []):
+            candidates.append(self._tier_model_id(fallback_tier))
+
+        primary = self.get_model_id(task)
+        fallbacks = []
+        for model_id in candidates:
+            if model_id and model_id != primary and model_id not in fallbacks:
+                fallbacks.append(model_id)
+        return fallbacks
+
+    def get_llm(self, task: str, temperature: float = 0, **kwargs) -> Any:
+        """
+        Build the chat model for a task, with fallbacks to the next tiers.
+
+        Args:
+            task: Task name from model_routing.json
+            temperature: Sampling temperature
+            **kwargs: Extra ChatBedrockConverse arguments
+
+        Returns:
+            ChatBedrockConverse, or a runnable with fallbacks if any are configured
+        """
+        llm = ChatBedrockConverse(model=self.get_model_id(task), temperature=temperature, **kwargs)
+        fallbacks = [
+            ChatBedrockConverse(model=model_id, temperature=temperature, **kwargs)
+            for model_id in self.get_fallback_model_ids(task)
+        ]
+        return llm.with_fallbacks(fallbacks) if fallbacks else llm
+
+    def get_pricing(self, model_id: str) -> Optional[Dict[str, float]]:
+        """USD per 1k input/output tokens for a model, if known."""
+        return self.routing.get("pricing_per_1k_tokens", {}).get(model_id)
+
+    def _task_config(self, task: str) -> Dict[str, Any]:
+        task_config = self.routing.get("tasks", {}).get(task)
+        if task_config is None:
+            logger.warning(f"No model routing for task '{task}', using the default tier")
+            return {}
+        return task_config
+
+    def _tier_model_id(self, tier: str) -> Optional[str]:
+        tier_config = self.routing.get("tiers", {}).get(tier, {})
+        model_id = os.getenv(tier_config.get("env", "")) if tier_config.get("env") else None
+        return model_id or tier_config.get("default") or os.getenv("REASONING_MODEL")
+
+# Process-wide router
+model_router = ModelRouter()
+
+def get_model_id(task: str) -> Optional[str]:
+    return model_router.get_model_id(task)
+
+def get_llm(task: str, temperature: float = 0, **kwargs) -> Any:
+    return model_router.get_llm(task, temperature=temperature, **kwargs)
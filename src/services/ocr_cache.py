@@ -0,0 +1,128 @@
+import os
+import json
+import hashlib
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from src.logger import logger
+
+# Bump when OCR output for the same bytes changes (e.g. rasterization settings)
+CACHE_VERSION = "v3"
+
+def document_hash(data: bytes) -> str:
+    """SHA-256 of an uploaded file"""
+    return hashlib.sha256(data).hexdigest()
+
+def _features_suffix(features) -> str:
+    """Key suffix for OCR run with AnalyzeDocument feature types, whose results also carry key-values"""
+    return "-" + "-".join(features).lower() if features else ""
+
+def document_key(doc_hash: str, features=None) -> str:
+    return f"{CACHE_VERSION}-doc-{doc_hash}{_features_suffix(features)}"
+
+def page_key(doc_hash: str, page_num: int, features=None) -> str:
+    return f"{CACHE_VERSION}-page-{doc_hash}-{page_num}{_features_suffix(features)}"
+
+class OcrCache:
+    """
+    On-disk LRU cache of OCR results, one JSON file per key.
+
+    The index of entries is rebuilt from the directory on first use and kept
+    in memory; least recently used entries are deleted once the cache holds
+    more than max_entries files or max_bytes bytes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_entries: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._index: Optional[OrderedDict] = None  # key -> size, oldest first
+        self._total_bytes = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self) -> OrderedDict:
+        if self._index is None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-len(".json")], stat.st_size))
+            self._index = OrderedDict((key, size) for _, key, size in sorted(entries))
+            self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached value, or None on a miss"""
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                return None
+            index.move_to_end(key)
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(self._path(key))  # Keep LRU order across restarts
+            return value
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable OCR cache entry {key}: {e}")
+            self.delete(key)
+            return None
+
+    def put(self, key: str, value: dict) -> None:
+        """Store a value and evict least recently used entries over the limits"""
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            index = self._load_index()
+            try:
+                # Write to a temp file first so readers never see a partial entry
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError as e:
+                # A full or read-only disk must not fail the OCR request
+                logger.warning(f"Could not write OCR cache entry {key}: {e}")
+                return
+            self._total_bytes += len(data) - index.pop(key, 0)
+            index[key] = len(data)
+            while len(index) > self.max_entries or self._total_bytes > self.max_bytes:
+                old_key, size = index.popitem(last=False)
+                self._total_bytes -= size
+                try:
+                    os.remove(self._path(old_key))
+                except FileNotFoundError:
+                    pass
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            index = self._load_index()
+            self._total_bytes -= index.pop(key, 0)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+_cache = None
+_cache_lock = Lock()
+
+def get_ocr_cache() -> Optional[OcrCache]:
+    """Return the process-wide OCR cache, or None if OCR_CACHE_ENABLED is false."""
+    global _cache
+    if os.getenv("OCR_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OcrCache(
+                directory=os.getenv("OCR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ocr_cache")),
+                max_bytes=int(os.getenv("OCR_CACHE_MAX_MB", 512)) * 1024 * 1024,
+                max_entries=int(os.getenv("OCR_CACHE_MAX_ENTRIES", 10000))
+            )
+        return _cache
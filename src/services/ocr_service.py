@@ -1,66 +1,656 @@
+import os
+import asyncio
+import statistics
 import traceback
 import boto3
 import io
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Callable, Optional, Tuple
 from fastapi import HTTPException
+from PIL import Image, ImageOps
+from src.logger import logger
+from src.services.process_pool import available_cpus, discard_process_pool, get_process_pool
+from src.services.aws_clients import get_textract_client
+from src.services.ocr_cache import get_ocr_cache, document_hash, document_key, page_key
+from src.services.textract_async import get_async_textract_backend
+from src.services.textract_forms import key_values_from_blocks, textract_features
 try:
     import fitz  # PyMuPDF
 except ImportError:
     fitz = None
 
-def textract_service(image_bytes: bytes) -> dict:
-    session = boto3.Session(profile_name="default")
-    textract_agent = session.client("textract")
+# Textract synchronous API limits for inline document bytes
+TEXTRACT_MAX_BYTES = 5 * 1024 * 1024
+TEXTRACT_MAX_SIDE_PX = 10000
+# Smallest text height Textract reliably detects
+TEXTRACT_MIN_TEXT_PX = 15
+MAX_RASTER_ATTEMPTS = 4
+# Deskew search: candidate angles (degrees) and the preview size they are scored on
+DESKEW_STEP_DEGREES = 0.5
+DESKEW_PREVIEW_PX = 600
+EXIF_ORIENTATION = 0x0112
+# How often the page loop checks for preprocessing cancelled by a pool shutdown
+CANCELLED_PREPROCESS_POLL_SECONDS = 1.0
+
+# Process-wide pool for per-page Textract calls; its size caps Textract concurrency
+_page_executor = None
+_page_executor_lock = Lock()
+
+def get_textract_page_executor() -> ThreadPoolExecutor:
+    """Return the shared Textract page pool (OCR_TEXTRACT_CONCURRENCY workers)."""
+    global _page_executor
+    with _page_executor_lock:
+        if _page_executor is None:
+            workers = int(os.getenv("OCR_TEXTRACT_CONCURRENCY", 8))
+            _page_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="textract")
+        return _page_executor
+
+# Dedicated pool for whole-document OCR jobs, so blocking SDK calls never run on the event loop
+_ocr_executor = None
+
+def get_ocr_executor() -> ThreadPoolExecutor:
+    """Return the shared OCR job pool (OCR_EXECUTOR_WORKERS workers)."""
+    global _ocr_executor
+    with _page_executor_lock:
+        if _ocr_executor is None:
+            workers = int(os.getenv("OCR_EXECUTOR_WORKERS", 4))
+            _ocr_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+        return _ocr_executor
+
+def get_preprocess_pool():
+    """
+    Return the shared image preprocessing process pool, or None to
+    preprocess on the calling thread (OCR_PREPROCESS_WORKERS=0).
+
+    Rasterizing and cleaning up page images is CPU-bound, so it runs in
+    worker processes (one per available core by default) instead of
+    competing for the GIL with the event loop and the Textract threads.
+    """
+    workers = int(os.getenv("OCR_PREPROCESS_WORKERS", available_cpus()))
+    if workers <= 0:
+        return None
+    return get_process_pool("ocr_preprocessing", workers)
+
+def _submit_preprocessing(fn, data: bytes) -> Tuple[Future, Optional[ProcessPoolExecutor]]:
+    """Run fn(data) in the preprocessing pool, or right here if there is none; returns the future and the pool that runs it"""
+    pool = get_preprocess_pool()
+    if pool is not None:
+        try:
+            return pool.submit(fn, data), pool
+        except RuntimeError as e:
+            # The pool broke or another request shut it down: preprocess here
+            logger.warning(f"Preprocessing in-thread, pool unavailable: {e}")
+            discard_process_pool("ocr_preprocessing", pool)
+    future = Future()
+    try:
+        future.set_result(fn(data))
+    except Exception as e:
+        future.set_exception(e)
+    return future, None
+
+def _preprocessing_result(future: Future, pool: Optional[ProcessPoolExecutor], fn, data: bytes) -> bytes:
+    """Result of a preprocessing future, redone on this thread if a worker process died or it was cancelled"""
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        # A worker died: recreate the pool next time (unless another request already did) and preprocess here
+        discard_process_pool("ocr_preprocessing", pool)
+        return fn(data)
+    except CancelledError:
+        # Another request discarded the shared pool, cancelling its queued work
+        return fn(data)
+
+def _preprocess(fn, data: bytes) -> bytes:
+    future, pool = _submit_preprocessing(fn, data)
+    return _preprocessing_result(future, pool, fn, data)
+
+def _call_in_loop(loop, fn):
+    """Wrap fn so calls from worker threads run on the event loop (dropped once the loop is closed)"""
+    def call(*args):
+        try:
+            loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            pass
+    return call
+
+async def ocr_document_async(image_bytes: bytes, doc_hash: str = None, on_page: Callable[[dict], None] = None) -> dict:
+    """
+    Run ocr_document on the OCR pool without blocking the event loop.
+
+    on_page, if given, is called on the event loop (see ocr_document).
+
+    Raises:
+        HTTPException: 504 if OCR takes longer than OCR_TIMEOUT_SECONDS. The
+            worker thread finishes its current Textract call in the background.
+    """
+    timeout = float(os.getenv("OCR_TIMEOUT_SECONDS", 120))
+    loop = asyncio.get_running_loop()
+    args = (image_bytes, doc_hash, _call_in_loop(loop, on_page)) if on_page else (image_bytes, doc_hash)
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(get_ocr_executor(), ocr_document, *args),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"OCR timed out after {timeout:.0f}s") from e
+
+def textract_service(image_bytes: bytes) -> list:
+    """Extract the text lines of an image or PDF."""
+    return ocr_document(image_bytes)["lines"]
+
+def ocr_document(image_bytes: bytes, doc_hash: str = None, on_page: Callable[[dict], None] = None) -> dict:
+    """
+    Extract text from an image or PDF, using the PDF text layer where possible.
+
+    Results are cached by the SHA-256 of the file (and per page for PDFs), so
+    re-uploading a known document skips Textract entirely.
+
+    With OCR_TEXTRACT_FEATURES set (e.g. "FORMS,TABLES"), Textract pages go
+    through AnalyzeDocument and their key-value pairs are returned as well.
+    Images and rasterized pages are cleaned up first (see preprocess_image),
+    in the preprocessing process pool.
+
+    Args:
+        image_bytes: File contents; PDFs may also be a memoryview, e.g. of a memory-mapped file
+        doc_hash: SHA-256 of image_bytes, if the caller already computed it
+        on_page: Called with each page's report plus "page_count" as soon as
+            that page's text is available; pages of multi-page PDFs are
+            reported in completion order, from the OCR threads
+
+    Returns:
+        {"lines": [...], "pages": [{"page", "source", "chars", "cached"}],
+        "key_values": [{"key", "value", "confidence", "page"}]} where source
+        is "native" for pages read from the PDF text layer and "textract"
+        otherwise
+    """
+    cache = get_ocr_cache()
+    features = textract_features()
+    reported = set()
+
+    def report_page(report: dict, page_count: int):
+        reported.add(report["page"])
+        if on_page:
+            on_page({**report, "page_count": page_count})
+
+    def report_remaining(result: dict) -> dict:
+        for report in result["pages"]:
+            if report["page"] not in reported:
+                report_page(report, len(result["pages"]))
+        return result
+
+    if cache is not None:
+        doc_hash = doc_hash or document_hash(image_bytes)
+        cached = cache.get(document_key(doc_hash, features))
+        if cached is not None:
+            logger.info(f"OCR cache hit for document {doc_hash[:12]}")
+            return report_remaining({
+                "lines": cached["lines"],
+                "pages": [{**page, "cached": True} for page in cached["pages"]],
+                "key_values": cached.get("key_values", [])
+            })
+
+    textract_agent = get_textract_client()
 
     try:
         # Check if document is multi-page PDF
         if _is_multipage_pdf(image_bytes):
-            return _process_multipage_document(textract_agent, image_bytes)
+            result = _process_multipage_document(textract_agent, image_bytes, doc_hash if cache is not None else None, report_page)
         else:
-            return _process_single_page(textract_agent, image_bytes)
+            page = _ocr_page(textract_agent, _preprocess(preprocess_image, bytes(image_bytes)))
+            result = {
+                "lines": page["lines"],
+                "pages": [_page_report(1, "textract", page["lines"])],
+                "key_values": [{**pair, "page": 1} for pair in page["key_values"]]
+            }
 
     except boto3.exceptions.Boto3Error as e:
         raise HTTPException(
             status_code=500, detail=f"AWS Textract error: {str(e)}"
         ) from e
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e)) from e
     except Exception as e:
         print(traceback.format_exc())
         raise HTTPException(
             status_code=500, detail=f"Unexpected error: {str(e)}"
         ) from e
 
+    if cache is not None:
+        cache.put(document_key(doc_hash, features), result)
+    # Pages the multi-page loop did not report (single images, async jobs, fallbacks)
+    return report_remaining(result)
+
 def _is_multipage_pdf(file_bytes: bytes) -> bool:
     """Check if the file is a multi-page PDF"""
-    return file_bytes.startswith(b'%PDF')
+    return bytes(file_bytes[:4]) == b'%PDF'
+
+def _lines_from_blocks(blocks: list) -> list:
+    """Text of the LINE and WORD blocks of a Textract response"""
+    return [item["Text"] for item in blocks if item["BlockType"] == "LINE" or item["BlockType"] == "WORD"]
 
 def _process_single_page(textract_client, image_bytes: bytes) -> list:
     """Process single page document"""
-    extracted_text = []
-    response = textract_client.detect_document_text(Document={"Bytes": image_bytes})
-    for item in response["Blocks"]:
-        if item["BlockType"] == "LINE" or item["BlockType"] == "WORD":
-            extracted_text.append(item["Text"])
-    return extracted_text
-
-def _process_multipage_document(textract_client, pdf_bytes: bytes) -> list:
-    """Process multi-page PDF using PyMuPDF"""
+    return _ocr_page(textract_client, image_bytes)["lines"]
+
+def _ocr_page(textract_client, image_bytes: bytes) -> dict:
+    """
+    OCR one page image: {"lines": [...], "key_values": [...]}.
+
+    Uses AnalyzeDocument with the OCR_TEXTRACT_FEATURES feature types when
+    any are set, else DetectDocumentText (and no key-values).
+    """
+    features = textract_features()
+    if not features:
+        response = textract_client.detect_document_text(Document={"Bytes": image_bytes})
+        return {"lines": _lines_from_blocks(response["Blocks"]), "key_values": []}
+    response = textract_client.analyze_document(Document={"Bytes": image_bytes}, FeatureTypes=features)
+    return {"lines": _lines_from_blocks(response["Blocks"]), "key_values": key_values_from_blocks(response["Blocks"])}
+
+def _page_report(page_num: int, source: str, lines: list, cached: bool = False) -> dict:
+    return {"page": page_num, "source": source, "chars": sum(len(line) for line in lines), "cached": cached}
+
+def _native_text_lines(page) -> list:
+    """
+    Return the page's text-layer lines if they look usable, else None.
+
+    Born-digital pages have plenty of text with few unmappable glyphs; scans
+    have no text layer, and broken font encodings show up as replacement or
+    control characters.
+    """
+    text = page.get_text()
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < int(os.getenv("OCR_NATIVE_MIN_CHARS", 30)):
+        return None
+    garbage = sum(1 for c in chars if c == "\ufffd" or not c.isprintable())
+    if garbage / len(chars) > float(os.getenv("OCR_NATIVE_MAX_GARBAGE_RATIO", 0.05)):
+        return None
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+def _has_color(samples: bytes, pixel_count: int) -> bool:
+    """Whether RGB samples have a noticeable share of colored pixels"""
+    colored = sum(
+        1 for r, g, b in zip(samples[0::3], samples[1::3], samples[2::3])
+        if max(r, g, b) - min(r, g, b) > 40
+    )
+    return colored > 0.01 * pixel_count
+
+def _is_color_page(page) -> bool:
+    """Whether a low-resolution preview of the page has a noticeable share of colored pixels"""
+    pix = page.get_pixmap(dpi=24, colorspace=fitz.csRGB, alpha=False)
+    return _has_color(pix.samples, pix.width * pix.height)
+
+def _is_color_image(img) -> bool:
+    """_is_color_page for a PIL image"""
+    if img.mode in ("1", "L", "LA", "I", "I;16", "F"):
+        return False
+    preview = img.resize((128, 128), Image.NEAREST).convert("RGB")
+    return _has_color(preview.tobytes(), 128 * 128)
+
+def _page_dpi(page) -> float:
+    """
+    Pick the render resolution for a page.
+
+    Scans follow the resolution of their embedded images, so fine print is
+    not lost and low-resolution scans are not blown up. Pages with a (broken)
+    text layer get just enough resolution for their smallest font to reach
+    Textract's minimum text height. The result is clamped to
+    OCR_RASTER_MIN_DPI..OCR_RASTER_MAX_DPI and to Textract's maximum image side.
+    """
+    needs = []
+    for image in page.get_image_info():
+        width_inches = (image["bbox"][2] - image["bbox"][0]) / 72
+        if width_inches > 0:
+            needs.append(image["width"] / width_inches)
+    sizes = [
+        span["size"]
+        # Image blocks are skipped so their pixel data is not extracted
+        for block in page.get_text("dict", flags=fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES)["blocks"]
+        for line in block.get("lines", [])
+        for span in line["spans"]
+        if span["text"].strip() and span["size"] > 0
+    ]
+    if sizes:
+        needs.append(TEXTRACT_MIN_TEXT_PX * 72 / min(sizes))
+
+    dpi = max(needs) if needs else float(os.getenv("OCR_RASTER_DPI", 150))
+    dpi = min(max(dpi, float(os.getenv("OCR_RASTER_MIN_DPI", 100))), float(os.getenv("OCR_RASTER_MAX_DPI", 300)))
+    longest_inches = max(page.rect.width, page.rect.height) / 72
+    return min(dpi, TEXTRACT_MAX_SIDE_PX / longest_inches)
+
+def _encode_image(img) -> bytes:
+    """Encode as PNG or JPEG, whichever is smaller (PNG only for 1-bit images)"""
+    png = io.BytesIO()
+    img.save(png, format="PNG")
+    if img.mode == "1":
+        return png.getvalue()
+    jpeg = io.BytesIO()
+    img.save(jpeg, format="JPEG", quality=int(os.getenv("OCR_RASTER_JPEG_QUALITY", 85)))
+    return min(png.getvalue(), jpeg.getvalue(), key=len)
+
+def _deskew_angle(gray) -> float:
+    """
+    Rotation (degrees, counterclockwise) that straightens the text lines.
+
+    Projection-profile search: on a small preview, text rows are sharpest,
+    i.e. the row sums vary most, when lines are horizontal. Candidate angles
+    go up to OCR_DESKEW_MAX_ANGLE either way, in DESKEW_STEP_DEGREES steps;
+    0 is kept unless another angle scores clearly better.
+    """
+    max_angle = float(os.getenv("OCR_DESKEW_MAX_ANGLE", 5))
+    ink = ImageOps.invert(gray.reduce(max(1, max(gray.size) // DESKEW_PREVIEW_PX)))
+    # Score only the middle, which stays inside the page at any candidate angle
+    margin_x, margin_y = ink.width // 8, ink.height // 8
+    box = (margin_x, margin_y, ink.width - margin_x, ink.height - margin_y)
+
+    def score(angle):
+        rows = ink.rotate(angle, resample=Image.NEAREST).crop(box).resize((1, box[3] - box[1]), Image.BOX)
+        return statistics.pvariance(rows.tobytes())
+
+    def best_of(angles, best):
+        for angle in angles:
+            if angle and abs(angle) <= max_angle and (candidate := score(angle)) > best[1]:
+                best = (angle, candidate)
+        return best
+
+    # Coarse pass at twice the step, then the neighbours of the best angle
+    coarse = 2 * DESKEW_STEP_DEGREES
+    steps = int(max_angle / coarse)
+    best = best_of([i * coarse for i in range(-steps, steps + 1)], (0.0, score(0.0) * 1.1))
+    best = best_of([best[0] - DESKEW_STEP_DEGREES, best[0] + DESKEW_STEP_DEGREES], best)
+    return best[0]
+
+def _binarize(gray):
+    """Black and white image at Otsu's threshold"""
+    histogram = gray.histogram()[:256]
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    background = weighted_background = 0
+    threshold, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        foreground = total - background
+        if background == 0 or foreground == 0:
+            continue
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            threshold, best_variance = level, variance
+    return gray.point([0 if i <= threshold else 255 for i in range(256)], "1")
+
+def _clean_image(img, deskew: bool = True):
+    """
+    Straighten and (with OCR_PREPROCESS_BINARIZE=true) binarize a scan.
+
+    Deskewing is on unless OCR_PREPROCESS_DESKEW=false; binarization only
+    applies to grayscale images, so colored stamps and marks survive.
+
+    Returns:
+        (image, changed)
+    """
+    changed = False
+    if deskew and os.getenv("OCR_PREPROCESS_DESKEW", "true").lower() == "true":
+        angle = _deskew_angle(img.convert("L"))
+        if angle:
+            fill = 255 if img.mode == "L" else (255,) * len(img.getbands())
+            img = img.rotate(angle, resample=Image.BILINEAR, fillcolor=fill)
+            changed = True
+    if img.mode == "L" and os.getenv("OCR_PREPROCESS_BINARIZE", "false").lower() == "true":
+        img = _binarize(img)
+        changed = True
+    return img, changed
+
+def _fit_encoded(img, max_bytes: int, label: str) -> bytes:
+    """Encode an image, scaling it down until it fits in max_bytes"""
+    for _ in range(MAX_RASTER_ATTEMPTS):
+        data = _encode_image(img)
+        if len(data) <= max_bytes:
+            return data
+        # Encoded size grows roughly with pixel count
+        scale = 0.9 * (max_bytes / len(data)) ** 0.5
+        img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS)
+    raise ValueError(f"{label} does not fit in {max_bytes} bytes")
+
+def preprocess_image(image_bytes: bytes) -> bytes:
+    """
+    Prepare an uploaded photo or scan for Textract.
+
+    Applies the EXIF orientation, downscales images whose longest side is
+    over OCR_IMAGE_MAX_SIDE_PX, converts images without color to grayscale
+    and cleans them up with _clean_image. Images that need none of this are
+    returned unchanged, as are files Pillow can not decode. Runs in the
+    preprocessing pool, so it only takes and returns bytes.
+    """
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        max_side = min(int(os.getenv("OCR_IMAGE_MAX_SIDE_PX", 3000)), TEXTRACT_MAX_SIDE_PX)
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+        original_size = img.size
+        # Lets JPEG decoding skip straight to a reduced size
+        img.draft(img.mode, (max_side, max_side))
+        changed = img.size != original_size or orientation != 1
+        img = ImageOps.exif_transpose(img)
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.BICUBIC)
+            changed = True
+        if img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+            changed = True
+        if img.mode == "RGB" and not _is_color_image(img):
+            img = img.convert("L")
+            changed = True
+        img, cleaned = _clean_image(img)
+        if not (changed or cleaned):
+            return image_bytes
+        return _fit_encoded(img, int(os.getenv("OCR_TEXTRACT_MAX_BYTES", TEXTRACT_MAX_BYTES)), "Image")
+    except Exception as e:
+        logger.warning(f"Image preprocessing failed, sending the original: {e}")
+        return image_bytes
+
+def _rasterize_page(doc, page_num: int) -> bytes:
+    """
+    Render one PDF page to image bytes Textract accepts.
+
+    Pages are rendered in grayscale unless they carry color, at the
+    resolution chosen by _page_dpi. Pages with images (scans) are cleaned
+    up with _clean_image. If the encoded page is over
+    OCR_TEXTRACT_MAX_BYTES, it is re-rendered at a lower resolution.
+    """
+    page = doc.load_page(page_num)
+    max_bytes = int(os.getenv("OCR_TEXTRACT_MAX_BYTES", TEXTRACT_MAX_BYTES))
+    colorspace = fitz.csRGB if _is_color_page(page) else fitz.csGRAY
+    dpi = _page_dpi(page)
+    is_scan = bool(page.get_image_info())
+    for _ in range(MAX_RASTER_ATTEMPTS):
+        pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), colorspace=colorspace, alpha=False)
+        img = Image.frombytes("L" if pix.n == 1 else "RGB", (pix.width, pix.height), pix.samples)
+        img, _ = _clean_image(img, deskew=is_scan)
+        data = _encode_image(img)
+        if len(data) <= max_bytes:
+            logger.debug(f"Page {page_num + 1}: {pix.width}x{pix.height} {colorspace.name} at {dpi:.0f} dpi, {len(data)} bytes")
+            return data
+        # Encoded size grows roughly with pixel count, i.e. with dpi squared
+        dpi *= 0.9 * (max_bytes / len(data)) ** 0.5
+    raise ValueError(f"Page {page_num + 1} does not fit in {max_bytes} bytes")
+
+def _extract_page(doc, page_num: int) -> bytes:
+    """One page of a document as a standalone PDF, small enough to hand to a worker process"""
+    single = fitz.open()
+    try:
+        single.insert_pdf(doc, from_page=page_num, to_page=page_num)
+        return single.tobytes()
+    finally:
+        single.close()
+
+def rasterize_pdf_page(page_pdf: bytes) -> bytes:
+    """_rasterize_page for a one-page PDF from _extract_page; runs in the preprocessing pool"""
+    with fitz.open(stream=page_pdf, filetype="pdf") as doc:
+        return _rasterize_page(doc, 0)
+
+def _process_multipage_document(textract_client, pdf_bytes: bytes, doc_hash: str = None, on_page=None) -> dict:
+    """
+    Process multi-page PDF using PyMuPDF.
+
+    Pages whose text layer passes _native_text_lines skip Textract. The rest
+    are rasterized only when a slot frees up, so at most
+    OCR_MAX_PAGES_IN_FLIGHT pages per document are rendered or waiting on
+    Textract at once. Rendering runs in the preprocessing pool, which gets
+    each page as a one-page PDF. Results are reassembled in page order.
+    With doc_hash, Textract pages are read from and written to the OCR cache.
+    on_page(report, page_count) is called as each page's text is settled.
+
+    Large documents (see _use_async_job) go to an asynchronous Textract job
+    instead, falling back to per-page calls if the job fails. That job only
+    detects text, so it returns no key-values.
+    """
     if not fitz:
         # Fallback to single page processing
-        return _process_single_page(textract_client, pdf_bytes)
+        return _process_whole_document(textract_client, pdf_bytes)
     
     try:
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        all_extracted_text = []
-        
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap()
-            img_bytes = pix.tobytes("png")
-            
-            page_text = _process_single_page(textract_client, img_bytes)
-            all_extracted_text.extend([f"[Page {page_num + 1}]"] + page_text)
-        
-        doc.close()
-        return all_extracted_text
+        page_count = len(doc)
+        backend = get_async_textract_backend() if _use_async_job(pdf_bytes, page_count) else None
+        max_in_flight = max(1, int(os.getenv("OCR_MAX_PAGES_IN_FLIGHT", 4)))
+        executor = get_textract_page_executor()
+        cache = get_ocr_cache() if doc_hash else None
+        features = textract_features()
+        preprocess_pool = get_preprocess_pool()
+
+        pages_text = [None] * page_count
+        pages_key_values = [[] for _ in range(page_count)]
+
+        def report(page_num: int, source: str, lines: list, cached: bool = False):
+            if on_page:
+                on_page(_page_report(page_num + 1, source, lines, cached), page_count)
+
+        sources = ["native"] * page_count
+        cached_pages = set()
+        in_flight = {}  # future -> (page_num, one-page PDF and its pool while rasterizing, None, None once sent to Textract)
+        next_page = 0
+        try:
+            if backend is not None:
+                try:
+                    return _process_with_async_job(backend, doc, pdf_bytes, doc_hash, features)
+                except TimeoutError:
+                    # The job used up the request's time (see get_async_textract_backend): nobody waits for a fallback
+                    raise
+                except Exception as e:
+                    logger.warning(f"Async Textract job failed, falling back to per-page OCR: {e}")
+            while next_page < page_count or in_flight:
+                while next_page < page_count and len(in_flight) < max_in_flight:
+                    native_lines = _native_text_lines(doc.load_page(next_page))
+                    cached = cache.get(page_key(doc_hash, next_page, features)) if cache and native_lines is None else None
+                    if native_lines is not None:
+                        pages_text[next_page] = native_lines
+                        report(next_page, "native", native_lines)
+                    elif cached is not None:
+                        pages_text[next_page] = cached["lines"]
+                        pages_key_values[next_page] = cached.get("key_values", [])
+                        sources[next_page] = "textract"
+                        cached_pages.add(next_page)
+                        report(next_page, "textract", cached["lines"], cached=True)
+                    elif preprocess_pool is None:
+                        img_bytes = _rasterize_page(doc, next_page)
+                        in_flight[executor.submit(_ocr_page, textract_client, img_bytes)] = (next_page, None, None)
+                        sources[next_page] = "textract"
+                    else:
+                        page_pdf = _extract_page(doc, next_page)
+                        future, pool = _submit_preprocessing(rasterize_pdf_page, page_pdf)
+                        in_flight[future] = (next_page, page_pdf, pool)
+                        sources[next_page] = "textract"
+                    next_page += 1
+                if not in_flight:
+                    continue
+                done, _ = wait(in_flight, timeout=CANCELLED_PREPROCESS_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                # Futures cancelled by a pool shutdown never wake wait(), so pick them up here
+                done |= {future for future in in_flight if future.cancelled()}
+                for future in done:
+                    page_num, page_pdf, pool = in_flight.pop(future)
+                    if page_pdf is not None:
+                        img_bytes = _preprocessing_result(future, pool, rasterize_pdf_page, page_pdf)
+                        in_flight[executor.submit(_ocr_page, textract_client, img_bytes)] = (page_num, None, None)
+                        continue
+                    page = future.result()
+                    pages_text[page_num] = page["lines"]
+                    pages_key_values[page_num] = page["key_values"]
+                    if cache:
+                        cache.put(page_key(doc_hash, page_num, features), page)
+                    report(page_num, "textract", page["lines"])
+        finally:
+            for future in in_flight:
+                future.cancel()
+            doc.close()
+
+        return _assemble_pages(pages_text, sources, cached_pages, pages_key_values)
         
+    except TimeoutError:
+        raise
     except Exception as e:
-        return _process_single_page(textract_client, pdf_bytes)
\ No newline at end of file
+        logger.warning(f"Multi-page OCR failed, sending the PDF as a single document: {e}")
+        return _process_whole_document(textract_client, pdf_bytes)
+
+def _assemble_pages(pages_text: list, sources: list, cached_pages: set, pages_key_values: list = None) -> dict:
+    """Join per-page lines with [Page n] markers and build the page reports"""
+    all_extracted_text = []
+    for page_num, page_text in enumerate(pages_text):
+        all_extracted_text.extend([f"[Page {page_num + 1}]"] + page_text)
+    page_count = len(pages_text)
+    native_pages = sources.count("native")
+    logger.info(f"OCR of {page_count} pages: {native_pages} native text, {page_count - native_pages} Textract")
+    return {
+        "lines": all_extracted_text,
+        "pages": [_page_report(i + 1, sources[i], pages_text[i], i in cached_pages) for i in range(page_count)],
+        "key_values": [
+            {**pair, "page": i + 1}
+            for i, page_key_values in enumerate(pages_key_values or [])
+            for pair in page_key_values
+        ]
+    }
+
+def _use_async_job(pdf_bytes: bytes, page_count: int) -> bool:
+    """Whether a PDF is big enough (OCR_ASYNC_MIN_PAGES or OCR_ASYNC_MIN_MB) for an asynchronous job"""
+    return (
+        page_count >= int(os.getenv("OCR_ASYNC_MIN_PAGES", 20))
+        or len(pdf_bytes) >= float(os.getenv("OCR_ASYNC_MIN_MB", 20)) * 1024 * 1024
+    )
+
+def _process_with_async_job(backend, doc, pdf_bytes: bytes, doc_hash: str = None, features=None) -> dict:
+    """
+    OCR a PDF with one asynchronous Textract job.
+
+    Pages with a usable text layer or a cached result keep them; the job is
+    only started if some page still needs Textract, and its results fill
+    those pages.
+    """
+    cache = get_ocr_cache() if doc_hash else None
+    page_count = len(doc)
+    pages_text = [_native_text_lines(doc.load_page(i)) for i in range(page_count)]
+    sources = ["native" if lines is not None else "textract" for lines in pages_text]
+    cached_pages = set()
+    for page_num in range(page_count):
+        cached = cache.get(page_key(doc_hash, page_num, features)) if cache and pages_text[page_num] is None else None
+        if cached is not None:
+            pages_text[page_num] = cached["lines"]
+            cached_pages.add(page_num)
+
+    missing = [i for i, lines in enumerate(pages_text) if lines is None]
+    if missing:
+        blocks_by_page = backend.detect_document_text(bytes(pdf_bytes))
+        for page_num in missing:
+            pages_text[page_num] = _lines_from_blocks(blocks_by_page.get(page_num + 1, []))
+            if cache:
+                cache.put(page_key(doc_hash, page_num, features), {"lines": pages_text[page_num], "key_values": []})
+    return _assemble_pages(pages_text, sources, cached_pages)
+
+def _process_whole_document(textract_client, pdf_bytes: bytes) -> dict:
+    """Send the whole PDF to Textract in one call (single-page PDFs only)"""
+    page = _ocr_page(textract_client, bytes(pdf_bytes))
+    return {
+        "lines": page["lines"],
+        "pages": [_page_report(1, "textract", page["lines"])],
+        "key_values": [{**pair, "page": 1} for pair in page["key_values"]]
+    }
@@ -0,0 +1,69 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Persistent pools shared by the whole app, keyed by name
+_pools: Dict[str, ProcessPoolExecutor] = {}
+_pools_lock = Lock()
+
+def available_cpus() -> int:
+    """Cores this process may run on (its CPU affinity, e.g. a container's limit), else the machine's count."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def get_process_pool(name: str, max_workers: int) -> ProcessPoolExecutor:
+    """
+    Get the named process pool, creating it on first use.
+
+    Workers are started with the "spawn" method so they never inherit the
+    threads, sockets or event loop of the API process.
+
+    Args:
+        name: Pool identifier (e.g. "html_parsing")
+        max_workers: Number of worker processes used when the pool is created
+
+    Returns:
+        The shared ProcessPoolExecutor for that name
+    """
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            logger.info(f"Starting process pool '{name}' with {max_workers} workers")
+            pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pools[name] = pool
+        return pool
+
+def discard_process_pool(name: str, pool: ProcessPoolExecutor = None) -> None:
+    """
+    Drop a broken pool so the next get_process_pool call starts a fresh one.
+
+    Args:
+        name: Pool identifier
+        pool: The pool found broken; when given, a newer pool that another
+            request already started under the same name is left running
+    """
+    with _pools_lock:
+        if pool is not None and _pools.get(name) is not pool:
+            return
+        pool = _pools.pop(name, None)
+    if pool is not None:
+        logger.warning(f"Discarding process pool '{name}'")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_process_pools(wait: bool = True) -> None:
+    """Shut down every pool created by get_process_pool (called on app shutdown)."""
+    with _pools_lock:
+        for name, pool in _pools.items():
+            logger.info(f"Shutting down process pool '{name}'")
+            pool.shutdown(wait=wait, cancel_futures=True)
+        _pools.clear()
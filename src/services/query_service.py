@@ -25,9 +25,11 @@ class QueryService(ABC):
 class BigQueryService(QueryService):
     """Implementación concreta para BigQuery - SRP"""
     
-    def __init__(self, bq_client: bigquery.Client, llm_client: ChatBedrockConverse):
+    def __init__(self, bq_client: bigquery.Client, llm_client: ChatBedrockConverse, sql_llm_client: ChatBedrockConverse = None):
         self.bq_client = bq_client
         self.llm_client = llm_client
+        # Modelo para generar SQL (tarea "sql_generation"); por defecto el mismo que redacta la respuesta
+        self.sql_llm_client = sql_llm_client or llm_client
     
     async def generate_sql(self, query: str, schemas: Dict[str, List[Dict]], relationships: Dict = None, business_context: str = None) -> str:
         from datetime import datetime
@@ -48,7 +50,7 @@ class BigQueryService(QueryService):
         print(self._format_relationships_for_prompt(relationships or {}))
         print(f"[SQL GENERATION] Calling LLM...")
         
-        response = await self.llm_client.ainvoke(prompt)
+        response = await self.sql_llm_client.ainvoke(prompt)
         
         print(f"[SQL GENERATION] LLM response received")
         print(f"[SQL GENERATION] Raw SQL: {response.content[:200]}...")
@@ -0,0 +1,61 @@
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+class SharedResearchContext:
+    """
+    Memoizes work shared by news queries running concurrently in one batch.
+
+    Feed fetches, decoded links, scraped pages and per-article LLM results are
+    computed once per key; concurrent callers asking for a key that is still
+    being computed wait for the first computation instead of repeating it.
+    Results are shared objects, so callers must copy them before mutating.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._results: Dict[Tuple[str, Hashable], Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def memoize(self, namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached result for (namespace, key), computing it on first use.
+
+        Failed computations are not cached: waiting callers get the exception
+        and the next caller retries.
+        """
+        with self._lock:
+            future = self._results.get((namespace, key))
+            owner = future is None
+            if owner:
+                future = Future()
+                self._results[(namespace, key)] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if owner:
+            try:
+                future.set_result(compute())
+            except Exception as e:
+                with self._lock:
+                    self._results.pop((namespace, key), None)
+                future.set_exception(e)
+        return future.result()
+
+    def get(self, namespace: str, key: Hashable, default: Any = None) -> Any:
+        """Return a finished result for (namespace, key) without waiting or computing."""
+        with self._lock:
+            future = self._results.get((namespace, key))
+        if future is None or not future.done() or future.exception() is not None:
+            return default
+        with self._lock:
+            self.hits += 1
+        return future.result()
+
+def memoize(context: Optional[SharedResearchContext], namespace: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+    """Use the shared context when there is one, otherwise just compute."""
+    if context is None:
+        return compute()
+    return context.memoize(namespace, key, compute)
@@ -2,6 +2,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from src.models.models import Esquema
 from src.schemas.db_schemas import SchemaCreate, SchemaUpdate
+from src.services.extraction_schemas import schema_registry
 
 # Create a new schema for a given user
 async def create_schema(db: AsyncSession, user_id: int, schema_data: SchemaCreate):
@@ -53,6 +54,7 @@ async def update_schema(db: AsyncSession, schema_id: int, schema_data: SchemaUpd
 
     await db.commit()
     await db.refresh(schema)
+    schema_registry.invalidate(schema_id)
     return schema
 
 # Delete a schema
@@ -62,5 +64,6 @@ async def delete_schema(db: AsyncSession, schema_id: int):
     if schema:
         await db.delete(schema)
         await db.commit()
+        schema_registry.invalidate(schema_id)
         return True
     return False
\ No newline at end of file
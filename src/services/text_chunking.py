@@ -0,0 +1,55 @@
+from typing import Callable, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+# Rough characters-per-token ratio for Spanish/English prose
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for prompt budgeting (no tokenizer call)."""
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+def pack_by_token_budget(
+    items: Sequence[T],
+    cost: Callable[[T], int],
+    token_budget: int,
+    max_items: int
+) -> List[List[T]]:
+    """
+    Greedily group items, in order, into packs bounded by a token budget.
+
+    Args:
+        items: Items to pack
+        cost: Token cost of one item
+        token_budget: Maximum summed cost per pack
+        max_items: Maximum number of items per pack
+
+    Returns:
+        List of packs; an item costlier than the budget gets a pack of its own
+    """
+    packs: List[List[T]] = []
+    current: List[T] = []
+    current_tokens = 0
+    for item in items:
+        item_tokens = cost(item)
+        if current and (current_tokens + item_tokens > token_budget or len(current) >= max_items):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += item_tokens
+    if current:
+        packs.append(current)
+    return packs
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens estimated tokens.
+
+    Chunks break on line boundaries; lines longer than a chunk are cut.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for line in (text or "").split("\n"):
+        pieces.extend(line[i:i + max_chars] for i in range(0, len(line), max_chars))
+    packs = pack_by_token_budget(pieces, estimate_tokens, max_tokens, max_items=len(pieces) or 1)
+    return ["\n".join(pack) for pack in packs] or [""]
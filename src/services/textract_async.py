@@ -0,0 +1,114 @@
+import os
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from src.logger import logger
+from src.services.aws_clients import get_s3_client, get_textract_client
+
+class AsyncTextractBackend:
+    """
+    OCR whole documents with Textract's asynchronous text detection jobs.
+
+    The document is staged in S3, a StartDocumentTextDetection job is started
+    on it and GetDocumentTextDetection is polled with exponential backoff until
+    the job ends; the paginated results are then collected and the staged
+    object deleted. Clients are injected, so any boto3-compatible pair works
+    (e.g. LocalTextract and its in-memory S3, or moto, in tests).
+    """
+
+    def __init__(
+        self,
+        textract_client,
+        s3_client,
+        bucket: str,
+        prefix: str = "ocr-jobs/",
+        poll_seconds: float = 1.0,
+        max_poll_seconds: float = 15.0,
+        timeout_seconds: float = 300.0
+    ):
+        self.textract = textract_client
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self.timeout_seconds = timeout_seconds
+
+    def detect_document_text(self, document: bytes) -> Dict[int, List[dict]]:
+        """
+        Run a text detection job on a PDF.
+
+        Returns:
+            Textract blocks grouped by 1-based page number
+
+        Raises:
+            RuntimeError: If the job fails
+            TimeoutError: If the job does not finish within timeout_seconds
+        """
+        key = f"{self.prefix}{uuid.uuid4().hex}.pdf"
+        self.s3.put_object(Bucket=self.bucket, Key=key, Body=document)
+        try:
+            response = self.textract.start_document_text_detection(
+                DocumentLocation={"S3Object": {"Bucket": self.bucket, "Name": key}}
+            )
+            job_id = response["JobId"]
+            logger.info(f"Started Textract job {job_id} for s3://{self.bucket}/{key}")
+            return self._collect_results(job_id, self._wait_for_job(job_id))
+        finally:
+            self.s3.delete_object(Bucket=self.bucket, Key=key)
+
+    def _wait_for_job(self, job_id: str) -> dict:
+        """Poll until the job leaves IN_PROGRESS; returns the first page of results"""
+        deadline = time.monotonic() + self.timeout_seconds
+        delay = self.poll_seconds
+        while True:
+            response = self.textract.get_document_text_detection(JobId=job_id)
+            status = response["JobStatus"]
+            if status == "SUCCEEDED":
+                return response
+            if status == "PARTIAL_SUCCESS":
+                logger.warning(f"Textract job {job_id} partially succeeded: {response.get('StatusMessage')}")
+                return response
+            if status == "FAILED":
+                raise RuntimeError(f"Textract job {job_id} failed: {response.get('StatusMessage')}")
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"Textract job {job_id} still running after {self.timeout_seconds:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_poll_seconds)
+
+    def _collect_results(self, job_id: str, response: dict) -> Dict[int, List[dict]]:
+        blocks_by_page = defaultdict(list)
+        while True:
+            for block in response.get("Blocks", []):
+                blocks_by_page[block.get("Page", 1)].append(block)
+            next_token = response.get("NextToken")
+            if not next_token:
+                return dict(blocks_by_page)
+            response = self.textract.get_document_text_detection(JobId=job_id, NextToken=next_token)
+
+def get_async_textract_backend() -> Optional[AsyncTextractBackend]:
+    """
+    Return an asynchronous Textract backend on the shared clients, or None
+    when no staging bucket is configured (OCR_ASYNC_S3_BUCKET).
+
+    Jobs give up after OCR_ASYNC_JOB_TIMEOUT_SECONDS, capped at the request
+    timeout (OCR_TIMEOUT_SECONDS): past it the caller has already answered
+    504 and nobody would read the results.
+    """
+    bucket = os.getenv("OCR_ASYNC_S3_BUCKET")
+    if not bucket:
+        return None
+    return AsyncTextractBackend(
+        get_textract_client(),
+        get_s3_client(),
+        bucket,
+        prefix=os.getenv("OCR_ASYNC_S3_PREFIX", "ocr-jobs/"),
+        poll_seconds=float(os.getenv("OCR_ASYNC_POLL_SECONDS", 1)),
+        max_poll_seconds=float(os.getenv("OCR_ASYNC_MAX_POLL_SECONDS", 15)),
+        timeout_seconds=min(
+            float(os.getenv("OCR_ASYNC_JOB_TIMEOUT_SECONDS", 300)),
+            float(os.getenv("OCR_TIMEOUT_SECONDS", 120))
+        )
+    )
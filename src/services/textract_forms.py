@@ -0,0 +1,166 @@
+import os
+import re
+import unicodedata
+from typing import Any, Dict, List, Tuple, Union, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from src.logger import logger
+
+# Connectors that separate synonyms in a field description, e.g. "Folio o número de factura"
+_SYNONYM_SEPARATORS = re.compile(r"[,;/|()\[\]]|\s(?:or|o|u|y|and)\s")
+# Descriptions are often sentences; only short pieces are plausible form labels
+MAX_ALIAS_WORDS = 4
+
+def textract_features() -> List[str]:
+    """AnalyzeDocument feature types from OCR_TEXTRACT_FEATURES (e.g. "FORMS,TABLES"); empty means plain text detection"""
+    features = os.getenv("OCR_TEXTRACT_FEATURES", "")
+    return sorted({feature.strip().upper() for feature in features.split(",") if feature.strip()})
+
+def normalize_key(text: str) -> str:
+    """Lowercase, unaccented, punctuation-free form of a label or field name"""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text or "")
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+def field_aliases(name: str, description: str = None) -> List[str]:
+    """Normalized labels a form may use for a field: its name and the short phrases of its description"""
+    aliases = [normalize_key(name)]
+    for piece in _SYNONYM_SEPARATORS.split(description or ""):
+        alias = normalize_key(piece)
+        if alias and len(alias.split()) <= MAX_ALIAS_WORDS and alias not in aliases:
+            aliases.append(alias)
+    return aliases
+
+def _children(block: dict, blocks_by_id: dict, relationship: str = "CHILD") -> List[dict]:
+    return [
+        blocks_by_id[block_id]
+        for rel in block.get("Relationships", [])
+        if rel["Type"] == relationship
+        for block_id in rel["Ids"]
+        if block_id in blocks_by_id
+    ]
+
+def _text(block: dict, blocks_by_id: dict) -> str:
+    words = []
+    for child in _children(block, blocks_by_id):
+        if child["BlockType"] == "WORD":
+            words.append(child["Text"])
+        elif child["BlockType"] == "SELECTION_ELEMENT":
+            words.append("true" if child.get("SelectionStatus") == "SELECTED" else "false")
+    return " ".join(words)
+
+def _table_key_values(table: dict, blocks_by_id: dict) -> List[dict]:
+    """
+    Key-values of a table: label/value rows for two-column tables, else
+    header cells keyed to their column (a list when there are several rows).
+    """
+    cells = {}
+    confidences = {}
+    for cell in _children(table, blocks_by_id):
+        if cell["BlockType"] == "CELL":
+            position = (cell["RowIndex"], cell["ColumnIndex"])
+            cells[position] = _text(cell, blocks_by_id)
+            confidences[position] = cell.get("Confidence", 0)
+    if not cells:
+        return []
+    rows = max(row for row, _ in cells)
+    columns = max(column for _, column in cells)
+    pairs = []
+    if columns == 2:
+        for row in range(1, rows + 1):
+            key, value = cells.get((row, 1), ""), cells.get((row, 2), "")
+            if key and value:
+                pairs.append({"key": key, "value": value, "confidence": min(confidences[(row, 1)], confidences[(row, 2)])})
+    elif rows >= 2:
+        for column in range(1, columns + 1):
+            key = cells.get((1, column), "")
+            values = [cells.get((row, column), "") for row in range(2, rows + 1)]
+            if key and any(values):
+                confidence = min(confidences.get((row, column), 0) for row in range(1, rows + 1))
+                pairs.append({"key": key, "value": values[0] if len(values) == 1 else values, "confidence": confidence})
+    return pairs
+
+def key_values_from_blocks(blocks: List[dict]) -> List[dict]:
+    """
+    Key-value pairs of an AnalyzeDocument response, from FORMS key-value sets
+    and TABLES cells.
+
+    Returns:
+        [{"key", "value", "confidence"}] with confidence the lower of the key's and the value's (0-100)
+    """
+    blocks_by_id = {block["Id"]: block for block in blocks if "Id" in block}
+    pairs = []
+    for block in blocks:
+        if block["BlockType"] == "KEY_VALUE_SET" and "KEY" in block.get("EntityTypes", []):
+            key = _text(block, blocks_by_id)
+            for value_block in _children(block, blocks_by_id, "VALUE"):
+                value = _text(value_block, blocks_by_id)
+                if key and value:
+                    confidence = min(block.get("Confidence", 0), value_block.get("Confidence", 0))
+                    pairs.append({"key": key, "value": value, "confidence": confidence})
+        elif block["BlockType"] == "TABLE":
+            pairs.extend(_table_key_values(block, blocks_by_id))
+    return pairs
+
+def _coerce(annotation, value):
+    """Validate a form value against a field type, cleaning up numbers and wrapping list values"""
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    if get_origin(annotation) is list or annotation is list:
+        value = value if isinstance(value, list) else [value]
+    elif isinstance(value, list):
+        return None
+    elif annotation in (int, float):
+        value = re.sub(r"[^\d.\-]", "", value.replace(",", ""))
+    try:
+        return TypeAdapter(annotation).validate_python(value)
+    except ValidationError:
+        return None
+
+def _match_score(key: str, aliases: List[str]) -> int:
+    """2 for an exact label match, 1 when an alias appears as whole words in the label, else 0"""
+    if key in aliases:
+        return 2
+    padded = f" {key} "
+    return 1 if any(f" {alias} " in padded for alias in aliases) else 0
+
+def match_form_fields(model: type[BaseModel], key_values: List[dict], min_confidence: float = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Match Textract key-values to the fields of an extraction model.
+
+    Each field takes the best matching pair (exact label over partial match,
+    then highest confidence) whose value is valid for the field's type.
+
+    Args:
+        model: Extraction model
+        key_values: Pairs from key_values_from_blocks
+        min_confidence: Confidence needed to trust a value, OCR_FORM_MIN_CONFIDENCE by default
+
+    Returns:
+        (confident, uncertain): values of exact label matches at or above
+        min_confidence, and values of fields whose best match is partial or
+        fell below it
+    """
+    if min_confidence is None:
+        min_confidence = float(os.getenv("OCR_FORM_MIN_CONFIDENCE", 90))
+    normalized = [(normalize_key(pair["key"]), pair) for pair in key_values]
+    confident, uncertain = {}, {}
+    for name, field in model.model_fields.items():
+        aliases = field_aliases(name, field.description)
+        candidates = sorted(
+            ((_match_score(key, aliases), pair["confidence"], pair) for key, pair in normalized),
+            key=lambda candidate: candidate[:2], reverse=True
+        )
+        for score, confidence, pair in candidates:
+            if score == 0:
+                break
+            value = _coerce(field.annotation, pair["value"])
+            if value is None:
+                continue
+            # Only an exact label is trusted on its own; a label that merely contains
+            # an alias ("Fecha de vencimiento" for "fecha") is left for the LLM to confirm
+            (confident if score == 2 and confidence >= min_confidence else uncertain)[name] = value
+            break
+    logger.debug(f"Form fields: {len(confident)} confident, {len(uncertain)} uncertain of {len(model.model_fields)}")
+    return confident, uncertain
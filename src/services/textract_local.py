@@ -0,0 +1,308 @@
+import hashlib
+import io
+import os
+import random
+import time
+import uuid
+from collections import deque
+from threading import Lock
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from src.logger import logger
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Blocks per GetDocumentTextDetection response, as in Textract
+JOB_RESULTS_PER_PAGE = 1000
+
+WORDS = [
+    "factura", "folio", "fecha", "cliente", "concepto", "cantidad", "importe", "subtotal",
+    "iva", "total", "pago", "estación", "producto", "litros", "precio", "rfc", "domicilio",
+]
+
+class LocalS3:
+    """In-memory stand-in for the S3 client calls used to stage documents for Textract jobs."""
+
+    def __init__(self):
+        self.objects: Dict[tuple, bytes] = {}
+        self._lock = Lock()
+
+    def put_object(self, Bucket: str, Key: str, Body) -> dict:
+        body = Body.read() if hasattr(Body, "read") else bytes(Body)
+        with self._lock:
+            self.objects[(Bucket, Key)] = body
+        return {"ETag": f'"{hashlib.md5(body).hexdigest()}"'}
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        with self._lock:
+            body = self.objects.get((Bucket, Key))
+        if body is None:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "The specified key does not exist."}}, "GetObject")
+        return {"Body": io.BytesIO(body), "ContentLength": len(body)}
+
+    def delete_object(self, Bucket: str, Key: str) -> dict:
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "") -> dict:
+        with self._lock:
+            keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        return {"KeyCount": len(keys), "Contents": [{"Key": key, "Size": len(self.objects[(Bucket, key)])} for key in keys]}
+
+class LocalTextract:
+    """
+    In-process stand-in for the Textract client, for load tests without AWS.
+
+    detect_document_text answers with PAGE, LINE and WORD blocks shaped like
+    Textract's (ids, geometry, confidence, relationships); analyze_document
+    with FORMS adds a KEY_VALUE_SET pair for each "Label: value" line. Text comes from a
+    registered fixture, the PDF text layer, or deterministic filler sized to
+    the image. Each call sleeps for a latency drawn from latency_ms ±
+    jitter_ms plus ms_per_mb of payload, and calls beyond max_concurrency or
+    the tps rate are throttled: retried with backoff like botocore's
+    retries, then raised as ThrottlingException.
+
+    start_document_text_detection reads the document from the s3 stand-in
+    and starts a job that stays IN_PROGRESS for as long as its pages would
+    take one after another; get_document_text_detection then pages through
+    its blocks, each tagged with its page number.
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 800,
+        jitter_ms: float = 200,
+        ms_per_mb: float = 150,
+        tps: float = 0,
+        max_concurrency: int = 0,
+        max_attempts: int = 5,
+        seed: int = 0,
+        s3: LocalS3 = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ms_per_mb = ms_per_mb
+        self.tps = tps
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self._random = random.Random(seed)
+        self._fixtures: Dict[str, List[str]] = {}
+        self._lock = Lock()
+        self._calls = deque()  # Start times within the last second, for the tps limit
+        self._active = 0
+        self.stats = {"calls": 0, "throttled": 0, "failed": 0, "max_active": 0}
+        self.s3 = s3 or LocalS3()
+        self._jobs: Dict[str, dict] = {}
+
+    def register_fixture(self, document: bytes, lines: List[str]) -> None:
+        """Answer requests for these exact bytes with the given lines"""
+        self._fixtures[hashlib.sha256(document).hexdigest()] = list(lines)
+
+    def detect_document_text(self, Document: dict) -> dict:
+        document = bytes(Document["Bytes"])
+        blocks = self._call(len(document), "DetectDocumentText", lambda: self._blocks(self._lines(document)))
+        return {"DocumentMetadata": {"Pages": 1}, "Blocks": blocks, "DetectDocumentTextModelVersion": "local"}
+
+    def analyze_document(self, Document: dict, FeatureTypes: List[str]) -> dict:
+        document = bytes(Document["Bytes"])
+        blocks = self._call(len(document), "AnalyzeDocument", lambda: self._blocks(self._lines(document), forms="FORMS" in FeatureTypes))
+        return {"DocumentMetadata": {"Pages": 1}, "Blocks": blocks, "AnalyzeDocumentModelVersion": "local"}
+
+    def start_document_text_detection(self, DocumentLocation: dict) -> dict:
+        location = DocumentLocation["S3Object"]
+        try:
+            document = self.s3.get_object(Bucket=location["Bucket"], Key=location["Name"])["Body"].read()
+        except ClientError:
+            raise ClientError(
+                {"Error": {"Code": "InvalidS3ObjectException", "Message": "Unable to get object metadata from S3."}},
+                "StartDocumentTextDetection"
+            )
+
+        def start():
+            pages = self._page_lines(document)
+            page_bytes = len(document) // len(pages)
+            job_id = uuid.uuid4().hex
+            ready_at = time.monotonic() + sum(self._latency_seconds(page_bytes) for _ in pages)
+            with self._lock:
+                self._jobs[job_id] = {"pages": pages, "ready_at": ready_at, "blocks": None}
+            return job_id
+
+        return {"JobId": self._call(0, "StartDocumentTextDetection", start)}
+
+    def get_document_text_detection(self, JobId: str, MaxResults: int = None, NextToken: str = None) -> dict:
+        MaxResults = MaxResults or JOB_RESULTS_PER_PAGE
+        with self._lock:
+            job = self._jobs.get(JobId)
+        if job is None:
+            raise ClientError({"Error": {"Code": "InvalidJobIdException", "Message": "Request has invalid Job Id."}}, "GetDocumentTextDetection")
+
+        def results():
+            if time.monotonic() < job["ready_at"]:
+                return {"JobStatus": "IN_PROGRESS"}
+            if job["blocks"] is None:
+                job["blocks"] = [
+                    dict(block, Page=page)
+                    for page, lines in enumerate(job["pages"], start=1)
+                    for block in self._blocks(lines)
+                ]
+            start = int(NextToken or 0)
+            response = {
+                "JobStatus": "SUCCEEDED",
+                "DocumentMetadata": {"Pages": len(job["pages"])},
+                "Blocks": job["blocks"][start:start + MaxResults],
+                "DetectDocumentTextModelVersion": "local",
+            }
+            if start + MaxResults < len(job["blocks"]):
+                response["NextToken"] = str(start + MaxResults)
+            return response
+
+        return self._call(0, "GetDocumentTextDetection", results)
+
+    def _call(self, size: int, operation: str, work):
+        """Simulate one API call of a size-byte payload: throttling, retries and latency around work()"""
+        for attempt in range(1, self.max_attempts + 1):
+            if self._acquire():
+                try:
+                    time.sleep(self._latency_seconds(size))
+                    return work()
+                finally:
+                    self._release()
+            with self._lock:
+                self.stats["throttled"] += 1
+            time.sleep(min(0.05 * 2 ** attempt, 2) * self._random.random())
+        with self._lock:
+            self.stats["failed"] += 1
+        raise ClientError(
+            {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+            operation
+        )
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= 1:
+                self._calls.popleft()
+            if self.tps and len(self._calls) >= self.tps:
+                return False
+            if self.max_concurrency and self._active >= self.max_concurrency:
+                return False
+            self._calls.append(now)
+            self._active += 1
+            self.stats["calls"] += 1
+            self.stats["max_active"] = max(self.stats["max_active"], self._active)
+            return True
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+
+    def _latency_seconds(self, size: int) -> float:
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter + self.ms_per_mb * size / (1024 * 1024)) / 1000
+
+    def _page_lines(self, document: bytes) -> List[List[str]]:
+        """Lines of each page: one page per PDF page, else a single page"""
+        if not (fitz and document.startswith(b"%PDF")) or hashlib.sha256(document).hexdigest() in self._fixtures:
+            return [self._lines(document)]
+        pages = []
+        with fitz.open(stream=document, filetype="pdf") as doc:
+            for page in doc:
+                pages.append([line.strip() for line in page.get_text().splitlines() if line.strip()])
+        # Pages without a text layer get filler, as scanned pages would
+        digest = hashlib.sha256(document).hexdigest()
+        return [lines or _filler_lines(f"{digest}:{i}", 20) for i, lines in enumerate(pages)] or [[]]
+
+    def _lines(self, document: bytes) -> List[str]:
+        digest = hashlib.sha256(document).hexdigest()
+        if digest in self._fixtures:
+            return self._fixtures[digest]
+        line_count = 20
+        if fitz and document.startswith(b"%PDF"):
+            with fitz.open(stream=document, filetype="pdf") as doc:
+                text = "\n".join(page.get_text() for page in doc)
+            lines = [line.strip() for line in text.splitlines() if line.strip()]
+            if lines:
+                return lines
+        elif fitz:
+            try:
+                pix = fitz.Pixmap(document)
+                # Roughly one text line per 40 px of height, as on a scanned letter page
+                line_count = max(1, min(120, pix.height // 40))
+            except Exception:
+                pass
+        return _filler_lines(digest, line_count)
+
+    def _blocks(self, lines: List[str], forms: bool = False) -> List[dict]:
+        """PAGE, LINE and WORD blocks laid out top to bottom, plus KEY_VALUE_SET blocks with forms"""
+        page = {"BlockType": "PAGE", "Id": str(uuid.uuid4()), "Geometry": _geometry(0, 0, 1, 1), "Relationships": [{"Type": "CHILD", "Ids": []}]}
+        blocks = [page]
+        height = 1 / max(len(lines), 1)
+        for i, text in enumerate(lines):
+            words = text.split()
+            line = {
+                "BlockType": "LINE", "Id": str(uuid.uuid4()), "Text": text,
+                "Confidence": round(self._random.uniform(90, 99.9), 3),
+                "Geometry": _geometry(0.05, i * height, 0.9, height * 0.8),
+                "Relationships": [{"Type": "CHILD", "Ids": []}],
+            }
+            page["Relationships"][0]["Ids"].append(line["Id"])
+            blocks.append(line)
+            width = 0.9 / max(len(words), 1)
+            word_ids = []
+            for j, word in enumerate(words):
+                block = {
+                    "BlockType": "WORD", "Id": str(uuid.uuid4()), "Text": word, "TextType": "PRINTED",
+                    "Confidence": line["Confidence"],
+                    "Geometry": _geometry(0.05 + j * width, i * height, width * 0.9, height * 0.8),
+                }
+                word_ids.append(block["Id"])
+                blocks.append(block)
+            line["Relationships"][0]["Ids"].extend(word_ids)
+            label_end = next((j + 1 for j, word in enumerate(words) if word.endswith(":")), None)
+            if forms and label_end and label_end < len(words):
+                value = {
+                    "BlockType": "KEY_VALUE_SET", "Id": str(uuid.uuid4()), "EntityTypes": ["VALUE"],
+                    "Confidence": line["Confidence"], "Relationships": [{"Type": "CHILD", "Ids": word_ids[label_end:]}],
+                }
+                key = {
+                    "BlockType": "KEY_VALUE_SET", "Id": str(uuid.uuid4()), "EntityTypes": ["KEY"],
+                    "Confidence": line["Confidence"],
+                    "Relationships": [{"Type": "VALUE", "Ids": [value["Id"]]}, {"Type": "CHILD", "Ids": word_ids[:label_end]}],
+                }
+                blocks.extend([key, value])
+        return blocks
+
+def _filler_lines(seed: str, line_count: int) -> List[str]:
+    """Deterministic invoice-like lines for documents without known text"""
+    filler = random.Random(seed)
+    return [" ".join(filler.choice(WORDS) for _ in range(filler.randint(3, 9))) for _ in range(line_count)]
+
+def _geometry(left: float, top: float, width: float, height: float) -> dict:
+    return {
+        "BoundingBox": {"Left": left, "Top": top, "Width": width, "Height": height},
+        "Polygon": [
+            {"X": left, "Y": top}, {"X": left + width, "Y": top},
+            {"X": left + width, "Y": top + height}, {"X": left, "Y": top + height},
+        ],
+    }
+
+def local_textract_from_env() -> Optional[LocalTextract]:
+    """Build the stand-in when OCR_TEXTRACT_LOCAL is true, configured by OCR_TEXTRACT_LOCAL_* variables."""
+    if os.getenv("OCR_TEXTRACT_LOCAL", "false").lower() != "true":
+        return None
+    client = LocalTextract(
+        latency_ms=float(os.getenv("OCR_TEXTRACT_LOCAL_LATENCY_MS", 800)),
+        jitter_ms=float(os.getenv("OCR_TEXTRACT_LOCAL_JITTER_MS", 200)),
+        ms_per_mb=float(os.getenv("OCR_TEXTRACT_LOCAL_MS_PER_MB", 150)),
+        tps=float(os.getenv("OCR_TEXTRACT_LOCAL_TPS", 0)),
+        max_concurrency=int(os.getenv("OCR_TEXTRACT_LOCAL_MAX_CONCURRENCY", 0)),
+    )
+    logger.warning("Using the local Textract stand-in; OCR results are synthetic")
+    return client
@@ -0,0 +1,91 @@
+import hashlib
+import mmap
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import IO
+
+from fastapi import UploadFile
+
+CHUNK_SIZE = 1024 * 1024
+
+@dataclass
+class SpooledUpload:
+    """
+    An uploaded file copied to a temporary file, with its size and SHA-256.
+
+    FastAPI closes UploadFile objects as soon as the endpoint returns, before
+    a StreamingResponse has produced anything, so uploads that are processed
+    while streaming need a copy the request owns.
+    """
+    filename: str
+    content_type: str
+    file: IO[bytes]
+    size: int
+    sha256: str
+    is_pdf: bool
+
+    @contextmanager
+    def buffer(self):
+        """
+        Yield the file contents: a memory-mapped view for PDFs, so pages are
+        read from the page cache on demand, and bytes for images, which
+        Textract takes whole.
+        """
+        if not self.is_pdf:
+            self.file.seek(0)
+            yield self.file.read()
+            return
+        mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            try:
+                view.release()
+                mapped.close()
+            except BufferError:
+                # Still held by an OCR worker that outlived its timeout; the
+                # mapping is freed once that worker lets go of it
+                pass
+
+    def close(self) -> None:
+        self.file.close()
+
+async def spool_upload(upload: UploadFile, max_bytes: int) -> SpooledUpload:
+    """
+    Copy an upload to a temporary file in chunks, hashing it on the way.
+
+    Args:
+        upload: The uploaded file
+        max_bytes: Largest accepted file size; copying stops as soon as it is exceeded
+
+    Raises:
+        ValueError: If the file is empty or larger than max_bytes
+    """
+    spool = tempfile.TemporaryFile(prefix="ocr_upload_")
+    digest = hashlib.sha256()
+    size = 0
+    header = b""
+    try:
+        while chunk := await upload.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"File exceeds the {max_bytes // (1024 * 1024)} MB limit")
+            header = header or chunk[:4]
+            digest.update(chunk)
+            spool.write(chunk)
+        if size == 0:
+            raise ValueError("Empty file")
+        spool.flush()
+    except BaseException:
+        spool.close()
+        raise
+    return SpooledUpload(
+        filename=upload.filename or "unnamed_file",
+        content_type=upload.content_type or "application/octet-stream",
+        file=spool,
+        size=size,
+        sha256=digest.hexdigest(),
+        is_pdf=header.startswith(b"%PDF")
+    )
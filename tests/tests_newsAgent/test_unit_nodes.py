@@ -1,13 +1,20 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from types import SimpleNamespace
 
 import pytest
+from pydantic import ValidationError
 import re
 
 from unittest.mock import patch,Mock,MagicMock
 
-from src.nodes.research_nodes import generate_rss_feed_url,retrieve_articles_metadata,retrieve_articles_text,select_top_urls
-from src.schemas.schemas import AgentState
+from langchain_core.language_models import FakeListChatModel
+
+from src.nodes.research_nodes import iter_scraped_articles,generate_rss_feed_url,retrieve_articles_metadata,retrieve_articles_text,select_top_urls,retrieve_known_articles,known_articles_decision,summarize_headlines,summarize_articles_parallel,format_results
+from src.services.article_store import canonicalize_url
+from src.services.research_context import SharedResearchContext
+from src.schemas.article_record import ArticleRecord
+from src.schemas.schemas import AgentState,AgentResponse,AgentRequest
 
 @pytest.fixture
 def create_initial_state():
@@ -69,7 +76,7 @@ def clean_description(raw_html):
     cleantext = re.sub(cleanr, '', raw_html)
     return cleantext
 
-@patch("src.nodes.research_nodes.feedparser.parse")
+@patch("src.nodes.research_nodes.feedparser_parse")
 def test_retrieve_articles_metadata(mock_parse, rss_state):
     # Set max_feed_entries in the test state
     rss_state["max_feed_entries"] = 10
@@ -98,22 +105,22 @@ def test_retrieve_articles_metadata(mock_parse, rss_state):
     # Validate the result
     assert len(updated_state["articles_metadata"]) == 1
     article = updated_state["articles_metadata"][0]
-    assert article["title"] == "Test Title"
-    assert article["link"] == "https://example.com/article1"
-    assert article["description"] == "This is a test description."
-    assert article["pubDate"].startswith("2024-06-05T15:00")
+    assert article.title == "Test Title"
+    assert article.url == "https://example.com/article1"
+    assert article.description == "This is a test description."
+    assert article.published.isoformat().startswith("2024-06-05T15:00")
 
 
 # Testing text extract from urls
 @pytest.fixture
 def scraper_state(create_initial_state):    
     create_initial_state["articles_metadata"] = [
-            {
-                "title": "Test Article",
-                "link": "https://news.google.com/test-article",
-                "pubDate": "2025-06-05T15:00:00",
-                "description": "Sample description"
-            }
+            ArticleRecord(
+                title="Test Article",
+                url="https://news.google.com/test-article",
+                published=datetime(2025, 6, 5, 15, 0, 0),
+                description="Sample description"
+            )
         ]
     
     return create_initial_state
@@ -135,10 +142,11 @@ def test_retrieve_articles_text(mock_decoder,mock_get,scraper_state):
     assert len(updated_state["potential_articles"]) == 1
     article = updated_state["potential_articles"][0]
 
-    assert article["title"] == "Test Article"
-    assert article["url"] == "https://example.com/article"
-    assert "This is the article content" in article["text"]
-    assert article["date"] == "2025-06-05T15:00:00"
+    assert article.title == "Test Article"
+    assert article.url == "https://example.com/article"
+    assert article.source == "example.com"
+    assert "This is the article content" in article.text
+    assert article.published == datetime(2025, 6, 5, 15, 0, 0)
     assert "https://example.com/article" in updated_state["scraped_urls"]
 
 
@@ -146,26 +154,26 @@ def test_retrieve_articles_text(mock_decoder,mock_get,scraper_state):
 @pytest.fixture
 def top_urls_state(create_initial_state):
     create_initial_state["potential_articles"] = [
-        {
-            "title": "A",
-            "url": "https://example.com/article-a",
-            "description": "Description A",
-            "text": "Full text A",
-            "date": "2025-06-05"
-        },
-        {
-            "title": "B",
-            "url": "https://example.com/article-b",
-            "description": "Description B",
-            "text": "Full text B",
-            "date": "2025-06-04"
-        }
+        ArticleRecord(
+            title="A",
+            url="https://example.com/article-a",
+            description="Description A",
+            text="Full text A",
+            published=datetime(2025, 6, 5)
+        ),
+        ArticleRecord(
+            title="B",
+            url="https://example.com/article-b",
+            description="Description B",
+            text="Full text B",
+            published=datetime(2025, 6, 4)
+        )
     ]
     create_initial_state["news_query"] = "Example query"
     create_initial_state["num_articles_tldr"] = 1
     return create_initial_state
 
-@patch("src.nodes.research_nodes.ChatBedrockConverse")
+@patch("src.services.model_router.ChatBedrockConverse")
 @patch("src.nodes.research_nodes.os.getenv", return_value="test-model")
 def test_select_top_urls(mock_getenv, mock_llm_class, top_urls_state):
     # Mock LLM output
@@ -177,4 +185,215 @@ def test_select_top_urls(mock_getenv, mock_llm_class, top_urls_state):
 
     # Assert only the matching article is selected
     assert len(updated_state["tldr_articles"]) == 1
-    assert updated_state["tldr_articles"][0]["url"] == "https://example.com/article-b"
\ No newline at end of file
+    assert updated_state["tldr_articles"][0].url == "https://example.com/article-b"
+
+@patch("src.nodes.research_nodes.requests.get")
+@patch("src.nodes.research_nodes.gnewsdecoder")
+def test_retrieve_articles_text_thread_only(mock_decoder, mock_get, scraper_state, monkeypatch):
+    monkeypatch.setenv("HTML_PARSER_WORKERS", "0")
+    mock_decoder.return_value = {"decoded_url": "https://example.com/article"}
+
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.content = b"<html><body><p>Parsed on the download thread</p></body></html>"
+    mock_get.return_value = mock_response
+
+    updated_state = retrieve_articles_text(scraper_state)
+
+    assert len(updated_state["potential_articles"]) == 1
+    assert "Parsed on the download thread" in updated_state["potential_articles"][0].text
+
+
+def shut_down_pool():
+    """Parse pool that was shut down, as when another request discards the shared pool"""
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.shutdown()
+    return pool
+
+class CancellingPool:
+    """Parse pool whose futures are cancelled, as when another request discards the shared pool"""
+    def submit(self, fn, *args):
+        future = Future()
+        future.cancel()
+        return future
+
+@pytest.mark.parametrize("make_pool", [shut_down_pool, CancellingPool], ids=["shut_down", "cancelled"])
+@patch("src.nodes.research_nodes.requests.get")
+@patch("src.nodes.research_nodes.gnewsdecoder")
+def test_iter_scraped_articles_parses_inline_when_the_pool_is_gone(mock_decoder, mock_get, make_pool, scraper_state):
+    mock_decoder.return_value = {"decoded_url": "https://example.com/article"}
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.content = b"<html><body><p>Parsed without the pool</p></body></html>"
+    mock_get.return_value = mock_response
+
+    results = list(iter_scraped_articles(scraper_state["articles_metadata"], 2, parse_pool=make_pool()))
+
+    assert len(results) == 1
+    article, url = results[0]
+    assert url == "https://example.com/article"
+    assert "Parsed without the pool" in article.text
+
+# Test knowledge base lookup
+def test_canonicalize_url():
+    url = "https://WWW.Example.com/news/article-a/?utm_source=rss&id=7#comments"
+    assert canonicalize_url(url) == "https://example.com/news/article-a?id=7"
+
+@pytest.mark.asyncio
+@patch("src.nodes.research_nodes.AsyncSessionLocal")
+@patch("src.nodes.research_nodes.search_recent_articles")
+async def test_retrieve_known_articles(mock_search, mock_session, create_initial_state):
+    mock_search.return_value = [
+        SimpleNamespace(
+            title=f"Known {i}",
+            url=f"https://example.com/known-{i}",
+            published_at=datetime(2025, 6, 5, 15, 0, 0),
+            text="Stored text",
+            summary="* Stored bullet",
+            topics=["topic"],
+            bias="center",
+            bias_explanation="Balanced"
+        )
+        for i in range(3)
+    ]
+    mock_session.return_value = MagicMock()
+    mock_session.return_value.__aenter__.return_value = Mock()
+
+    updated_state = await retrieve_known_articles(create_initial_state)
+
+    assert len(updated_state["known_articles"]) == 3
+    assert updated_state["tldr_articles"][0].summary == "* Stored bullet"
+    assert updated_state["tldr_articles"][0].from_knowledge_base
+    assert known_articles_decision(updated_state) == "enough_articles"
+
+def test_select_top_urls_covers_shortfall_only(top_urls_state):
+    top_urls_state["num_articles_tldr"] = 2
+    top_urls_state["known_articles"] = [ArticleRecord(title="A", url="https://example.com/article-a", from_knowledge_base=True)]
+
+    with patch("src.services.model_router.ChatBedrockConverse") as mock_llm_class:
+        mock_llm_class.return_value.invoke.return_value.content = "https://example.com/article-b"
+        updated_state = select_top_urls(top_urls_state)
+
+    assert [a.url for a in updated_state["tldr_articles"]] == ["https://example.com/article-a", "https://example.com/article-b"]
+    prompt = mock_llm_class.return_value.invoke.call_args[0][0]
+    assert "article-a" not in prompt
+
+
+# Test work shared between batch queries
+def test_shared_context_computes_each_key_once():
+    context = SharedResearchContext()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"bullet_summary": "* shared"}
+
+    first = context.memoize("summaries", ("https://example.com/a", "es"), compute)
+    second = context.memoize("summaries", ("https://example.com/a", "es"), compute)
+
+    assert first is second
+    assert len(calls) == 1
+    assert (context.hits, context.misses) == (1, 1)
+
+def test_shared_context_does_not_cache_failures():
+    context = SharedResearchContext()
+
+    def failing():
+        raise RuntimeError("throttled")
+
+    with pytest.raises(RuntimeError):
+        context.memoize("pages", "https://example.com/a", failing)
+    assert context.memoize("pages", "https://example.com/a", lambda: b"html") == b"html"
+
+
+# Test fast (headline) mode
+@pytest.fixture
+def headlines_state(create_initial_state):
+    create_initial_state["mode"] = "fast"
+    create_initial_state["num_articles_tldr"] = 2
+    create_initial_state["articles_metadata"] = [
+        ArticleRecord(title=f"Headline {i}", url=f"https://news.google.com/{i}", published=datetime(2025, 6, 5, 15, 0, 0), description=f"Description {i}")
+        for i in range(3)
+    ]
+    return create_initial_state
+
+@patch("src.nodes.research_nodes.requests.get")
+@patch("src.nodes.research_nodes.gnewsdecoder")
+@patch("src.nodes.research_nodes.get_llm")
+def test_summarize_headlines_single_llm_call(mock_get_llm, mock_decoder, mock_get, headlines_state):
+    mock_get_llm.return_value = FakeListChatModel(responses=['{"items": [{"index": 2, "bullets": ["Bullet A", "Bullet B"]}, {"index": 0, "bullets": ["Bullet C"]}]}'])
+
+    updated_state = summarize_headlines(headlines_state)
+
+    assert mock_get_llm.call_count == 1
+    assert [a.title for a in updated_state["tldr_articles"]] == ["Headline 2", "Headline 0"]
+    assert updated_state["tldr_articles"][0].bullets == ["Bullet A", "Bullet B"]
+    mock_decoder.assert_not_called()
+    mock_get.assert_not_called()
+
+@patch("src.nodes.research_nodes.get_llm", side_effect=RuntimeError("timeout"))
+def test_summarize_headlines_falls_back_to_feed_order(mock_get_llm, headlines_state):
+    updated_state = summarize_headlines(headlines_state)
+
+    assert [a.title for a in updated_state["tldr_articles"]] == ["Headline 0", "Headline 1"]
+    assert updated_state["tldr_articles"][1].summary == "* Description 1"
+
+@pytest.fixture
+def short_articles_state(create_initial_state):
+    create_initial_state["tldr_articles"] = [
+        ArticleRecord(title=f"Title {i}", url=f"https://example.com/{i}", text=f"Short article text {i}")
+        for i in range(3)
+    ]
+    return create_initial_state
+
+@patch("src.nodes.research_nodes.get_llm")
+def test_summarize_articles_packs_short_articles(mock_get_llm, short_articles_state):
+    llm = FakeListChatModel(responses=[
+        '{"summaries": [' + ", ".join(
+            f'{{"index": {i}, "title": "x", "url": "https://x.com", "bullet_summary": "* Bullet {i}"}}' for i in range(3)
+        ) + ']}',
+        "unused"
+    ])
+    mock_get_llm.return_value = llm
+
+    updated_state = summarize_articles_parallel(short_articles_state)
+
+    assert llm.i == 1
+    assert [a.summary for a in updated_state["tldr_articles"]] == ["* Bullet 0", "* Bullet 1", "* Bullet 2"]
+
+@patch("src.nodes.research_nodes.get_llm")
+def test_summarize_articles_pack_falls_back_to_single_calls(mock_get_llm, short_articles_state):
+    llm = FakeListChatModel(responses=[
+        '{"summaries": [{"index": 1, "title": "x", "url": "https://x.com", "bullet_summary": "* Packed"}]}',
+        '{"title": "Title 0", "url": "https://example.com/0", "bullet_summary": "* Single 0"}',
+        '{"title": "Title 2", "url": "https://example.com/2", "bullet_summary": "* Single 2"}',
+        "unused"
+    ])
+    mock_get_llm.return_value = llm
+
+    updated_state = summarize_articles_parallel(short_articles_state)
+
+    assert llm.i == 3
+    assert [a.summary for a in updated_state["tldr_articles"]] == ["* Single 0", "* Packed", "* Single 2"]
+
+# Test article records
+def test_format_results_sorts_records_by_date(create_initial_state):
+    create_initial_state["report"] = ""
+    create_initial_state["tldr_articles"] = [
+        ArticleRecord(title="Old", url="https://www.example.com/old", published=datetime(2025, 6, 4), summary="* Old bullet"),
+        ArticleRecord(title="Undated", url="https://example.com/undated", summary="* Undated bullet"),
+        ArticleRecord(title="New", url="https://example.com/new", published=datetime(2025, 6, 5), summary="* New bullet\nnot a bullet"),
+    ]
+
+    updated_state = format_results(create_initial_state)
+
+    summaries = updated_state["formatted_results"]["summaries"]
+    assert [s["title"] for s in summaries] == ["New", "Old", "Undated"]
+    assert summaries[0]["bullets"] == ["New bullet"]
+    assert AgentResponse(**updated_state["formatted_results"]).summaries[1].date == datetime(2025, 6, 4)
+    assert create_initial_state["tldr_articles"][0].source == "example.com"
+
+def test_agent_request_rejects_unknown_modes():
+    assert AgentRequest(query="Noticias", articles=3, mode="fast").mode == "fast"
+    with pytest.raises(ValidationError):
+        AgentRequest(query="Noticias", articles=3, mode="Fast")
@@ -0,0 +1,111 @@
+import json
+import re
+from typing import List, Optional
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, Field
+
+from src.nodes import ocr_nodes
+from src.services.extraction_schemas import CompiledSchema
+
+class Invoice(BaseModel):
+    folio: str = Field(..., description="Invoice number")
+    total: Optional[float] = Field(None, description="Total amount")
+    items: List[str] = Field(default_factory=list, description="Line items")
+
+def fake_llm(calls: list):
+    """Answers each extraction prompt from the 'Folio', 'Total' and 'Item' lines it contains."""
+    def answer(prompt_value):
+        text = prompt_value.to_string()
+        calls.append(text)
+        folio = re.search(r"Folio (\w+)", text)
+        total = re.search(r"Total (\d+)", text)
+        return json.dumps({
+            "folio": folio.group(1) if folio else None,
+            "total": float(total.group(1)) if total else None,
+            "items": re.findall(r"Item (\w+)", text),
+        })
+    return RunnableLambda(answer)
+
+def ocr_state(lines):
+    return {"file": None, "extracted_text": lines, "ocr_pages": [], "schema": CompiledSchema.from_model(Invoice), "structured": None, "extraction_conflicts": None}
+
+def test_merge_extractions_rules():
+    merged, conflicts = ocr_nodes.merge_extractions(
+        [{"folio": None, "total": 10, "items": ["a"]}, {"folio": "F1", "total": 10, "items": ["b"]}, {"folio": "", "total": 12, "items": []}],
+        ["folio", "total", "items", "date"]
+    )
+    assert merged == {"folio": "F1", "total": 10, "items": ["a", "b"], "date": None}
+    assert conflicts == {"total": [10, 12]}
+
+@pytest.mark.asyncio
+async def test_long_documents_are_extracted_in_chunks(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_nodes, "get_llm", lambda task: fake_llm(calls))
+    monkeypatch.setenv("OCR_EXTRACTION_CHUNK_TOKENS", "40")
+    lines = ["Folio A17", "Item uno"] + ["relleno " * 15] * 3 + ["Item dos", "Total 100"] + ["relleno " * 15] * 3 + ["Total 120"]
+
+    state = await ocr_nodes.build_pydantic_schema(ocr_state(lines))
+
+    assert len(calls) > 2 and all("part" in call for call in calls)
+    assert state["structured"] == {"folio": "A17", "total": 100.0, "items": ["uno", "dos"]}
+    assert state["extraction_conflicts"] == {"total": [100.0, 120.0]}
+
+@pytest.mark.asyncio
+async def test_short_documents_use_a_single_call(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_nodes, "get_llm", lambda task: fake_llm(calls))
+
+    state = await ocr_nodes.build_pydantic_schema(ocr_state(["Folio A17", "Total 100"]))
+
+    assert len(calls) == 1
+    assert state["structured"]["folio"] == "A17"
+    assert state["extraction_conflicts"] is None
+
+@pytest.mark.asyncio
+async def test_form_key_values_skip_the_llm(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_nodes, "get_llm", lambda task: fake_llm(calls))
+    state = ocr_state(["Folio A17", "Total 100"])
+    state["ocr_key_values"] = [
+        {"key": "Folio:", "value": "B20", "confidence": 99},
+        {"key": "Total", "value": "$100.00", "confidence": 98},
+        {"key": "Items", "value": ["uno"], "confidence": 95},
+    ]
+
+    state = await ocr_nodes.build_pydantic_schema(state)
+
+    assert calls == []
+    assert state["structured"] == {"folio": "B20", "total": 100.0, "items": ["uno"]}
+
+@pytest.mark.asyncio
+async def test_llm_is_asked_only_for_fields_the_form_missed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_nodes, "get_llm", lambda task: fake_llm(calls))
+    state = ocr_state(["Folio A17", "Total 100", "Item uno"])
+    state["ocr_key_values"] = [
+        {"key": "Folio", "value": "A17", "confidence": 99},
+        {"key": "Total", "value": "90", "confidence": 40},
+    ]
+
+    state = await ocr_nodes.build_pydantic_schema(state)
+
+    assert len(calls) == 1
+    assert '"folio"' not in calls[0] and '"total"' in calls[0] and '"items"' in calls[0]
+    assert state["structured"] == {"folio": "A17", "total": 100.0, "items": ["uno"]}
+
+@pytest.mark.asyncio
+async def test_look_alike_form_labels_do_not_override_the_llm(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ocr_nodes, "get_llm", lambda task: fake_llm(calls))
+    state = ocr_state(["Folio A17", "Total 100"])
+    state["ocr_key_values"] = [
+        {"key": "Folio", "value": "A17", "confidence": 99},
+        {"key": "Subtotal IVA total", "value": "16", "confidence": 99},
+    ]
+
+    state = await ocr_nodes.build_pydantic_schema(state)
+
+    assert len(calls) == 1 and '"total"' in calls[0]
+    assert state["structured"]["total"] == 100.0
@@ -0,0 +1,83 @@
+import asyncio
+import io
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI, UploadFile
+
+from src.agents import ocr
+from src.nodes import ocr_nodes
+from src.routers import ocr_agent
+from src.routers.auth_route import get_current_user, get_db
+from src.services.upload_spool import spool_upload
+
+async def spooled_images(count: int):
+    return [
+        await spool_upload(UploadFile(io.BytesIO(f"image {i}".encode()), filename=f"page{i}.png", headers={"content-type": "image/png"}), max_bytes=1024)
+        for i in range(count)
+    ]
+
+@pytest.mark.asyncio
+async def test_batch_mode_ocrs_files_concurrently_in_upload_order(monkeypatch):
+    async def fake_ocr_document_async(data, doc_hash, on_page=None):
+        page = int(data.decode().split()[1])
+        # Earlier files finish last
+        await asyncio.sleep(0.05 * (4 - page))
+        return {"lines": [f"Texto {page}"], "pages": [{"page": 1, "source": "textract", "chars": 7}]}
+
+    async def fake_build_pydantic_schema(state):
+        state["structured"] = {"text": state["extracted_text"]}
+        return state
+
+    monkeypatch.setattr(ocr_nodes, "ocr_document_async", fake_ocr_document_async)
+    monkeypatch.setattr(ocr_agent, "build_pydantic_schema", fake_build_pydantic_schema)
+    uploads = await spooled_images(4)
+
+    start = time.perf_counter()
+    result = await ocr_agent.process_batch_files(uploads, None, None)
+    elapsed = time.perf_counter() - start
+
+    assert result["structured"]["text"] == [
+        line for i in range(4) for line in (f"[File {i + 1}: page{i}.png]", f"Texto {i}")
+    ]
+    assert [page["file"] for page in result["pages"]] == [f"page{i}.png" for i in range(4)]
+    # Bounded by the slowest file (0.2s), not the sum (0.5s)
+    assert elapsed < 0.4
+    assert all(upload.file.closed for upload in uploads)
+
+@pytest.mark.asyncio
+async def test_progress_streams_page_events_before_each_result(monkeypatch):
+    async def fake_ocr_document_async(data, doc_hash, on_page=None):
+        pages = int(data.decode().split()[1]) + 1
+        for page in range(1, pages + 1):
+            await asyncio.sleep(0.02)
+            on_page({"page": page, "page_count": pages, "source": "textract", "chars": 7, "cached": False})
+        return {"lines": ["Texto"] * pages, "pages": [{"page": page} for page in range(1, pages + 1)]}
+
+    async def fake_build_pydantic_schema(state):
+        await asyncio.sleep(0.1)
+        state["structured"] = {"pages": len(state["extracted_text"])}
+        return state
+
+    monkeypatch.setattr(ocr_nodes, "ocr_document_async", fake_ocr_document_async)
+    monkeypatch.setattr(ocr, "build_pydantic_schema", fake_build_pydantic_schema)
+    app = FastAPI()
+    app.include_router(ocr_agent.router, prefix="/ocragent")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    app.dependency_overrides[get_db] = lambda: None
+
+    files = [("files", (f"doc{i}.png", f"image {i}".encode(), "image/png")) for i in (1, 2)]
+    data = {"schema": json.dumps({"total": ["str", False, "Total"]}), "progress": "true"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/ocragent/extract", files=files, data=data)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    pages = [(line["file"], line["page"]) for line in lines if line.get("event") == "page"]
+    results = [line for line in lines if "event" not in line]
+    assert sorted(pages) == [("doc1.png", 1), ("doc1.png", 2), ("doc2.png", 1), ("doc2.png", 2), ("doc2.png", 3)]
+    assert {result["file"]: result["structured"] for result in results} == {"doc1.png": {"pages": 2}, "doc2.png": {"pages": 3}}
+    # Every page of both files is reported while extraction is still running
+    assert all("event" in line for line in lines[:5])
@@ -0,0 +1,278 @@
+import io
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz
+import pytest
+from fastapi import HTTPException
+from PIL import Image, ImageDraw, ImageFont
+
+from src.services import ocr_cache, ocr_service
+from src.services.ocr_cache import OcrCache
+
+def build_pdf(num_pages: int, native_pages=()) -> bytes:
+    """Build a PDF; pages listed in native_pages get a usable text layer."""
+    doc = fitz.open()
+    for i in range(num_pages):
+        page = doc.new_page()
+        if i in native_pages:
+            page.insert_text((72, 72), f"Factura {i + 1}: concepto, cantidad, importe y total a pagar")
+        else:
+            # Scanned-looking page: a drawing with no text layer
+            page.draw_rect(fitz.Rect(72, 72, 200 + 10 * i, 120), color=(0, 0, 0), fill=(0.5, 0.5, 0.5))
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+class FakeTextract:
+    """Answers detect_document_text with the page number of the rendered image."""
+
+    def __init__(self, pdf_bytes: bytes):
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        self.pages = {ocr_service._rasterize_page(doc, i): i for i in range(len(doc))}
+        doc.close()
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def detect_document_text(self, Document):
+        page = self.pages[Document["Bytes"]]
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        # Earlier pages answer last
+        time.sleep(0.02 * (len(self.pages) - page))
+        with self.lock:
+            self.active -= 1
+        return {"Blocks": [{"BlockType": "LINE", "Text": f"Texto {page + 1}"}]}
+
+def test_multipage_ocr_is_concurrent_and_ordered(monkeypatch):
+    monkeypatch.setenv("OCR_MAX_PAGES_IN_FLIGHT", "3")
+    pdf_bytes = build_pdf(6)
+    client = FakeTextract(pdf_bytes)
+
+    result = ocr_service._process_multipage_document(client, pdf_bytes)
+
+    assert result["lines"] == [line for i in range(1, 7) for line in (f"[Page {i}]", f"Texto {i}")]
+    assert 1 < client.max_active <= 3
+
+def test_native_text_pages_skip_textract():
+    pdf_bytes = build_pdf(3, native_pages=(0, 2))
+    client = FakeTextract(pdf_bytes)
+    calls = []
+    detect = client.detect_document_text
+    client.detect_document_text = lambda Document: calls.append(1) or detect(Document)
+
+    result = ocr_service._process_multipage_document(client, pdf_bytes)
+
+    assert len(calls) == 1
+    assert [page["source"] for page in result["pages"]] == ["native", "textract", "native"]
+    assert result["lines"][:2] == ["[Page 1]", "Factura 1: concepto, cantidad, importe y total a pagar"]
+    assert result["lines"][2:4] == ["[Page 2]", "Texto 2"]
+    assert result["pages"][1]["chars"] == len("Texto 2")
+
+@pytest.mark.asyncio
+async def test_ocr_document_async_times_out(monkeypatch):
+    monkeypatch.setenv("OCR_TIMEOUT_SECONDS", "0.05")
+    monkeypatch.setattr(ocr_service, "ocr_document", lambda image_bytes, doc_hash=None: time.sleep(0.3))
+
+    with pytest.raises(HTTPException) as error:
+        await ocr_service.ocr_document_async(b"\x89PNG")
+    assert error.value.status_code == 504
+
+def test_ocr_cache_evicts_least_recently_used(tmp_path):
+    cache = OcrCache(str(tmp_path), max_bytes=10_000, max_entries=2)
+    cache.put("a", {"lines": ["uno"]})
+    cache.put("b", {"lines": ["dos"]})
+    assert cache.get("a") == {"lines": ["uno"]}
+
+    cache.put("c", {"lines": ["tres"]})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"lines": ["uno"]}
+    # The index is rebuilt from disk by a new instance
+    assert OcrCache(str(tmp_path), max_bytes=10_000, max_entries=2).get("c") == {"lines": ["tres"]}
+
+def test_ocr_cache_respects_byte_limit(tmp_path):
+    cache = OcrCache(str(tmp_path), max_bytes=60, max_entries=100)
+    cache.put("a", {"lines": ["x" * 20]})
+    cache.put("b", {"lines": ["y" * 20]})
+
+    assert cache.get("a") is None
+    assert cache.get("b") == {"lines": ["y" * 20]}
+
+def test_ocr_document_reuses_cached_pages(monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_cache, "_cache", OcrCache(str(tmp_path), max_bytes=1_000_000, max_entries=100))
+    pdf_bytes = build_pdf(3, native_pages=(1,))
+    client = FakeTextract(pdf_bytes)
+    calls = []
+    detect = client.detect_document_text
+    client.detect_document_text = lambda Document: calls.append(1) or detect(Document)
+    monkeypatch.setattr(ocr_service, "get_textract_client", lambda: client)
+
+    first = ocr_service.ocr_document(pdf_bytes)
+    second = ocr_service.ocr_document(pdf_bytes)
+
+    assert len(calls) == 2
+    assert second["lines"] == first["lines"]
+    assert [page["cached"] for page in second["pages"]] == [True, True, True]
+
+    # Losing the document entry still reuses the per-page Textract results
+    ocr_cache._cache.delete(ocr_cache.document_key(ocr_cache.document_hash(pdf_bytes)))
+    third = ocr_service.ocr_document(pdf_bytes)
+    assert len(calls) == 2
+    assert third["lines"] == first["lines"]
+    assert [page["cached"] for page in third["pages"]] == [True, False, True]
+
+def test_ocr_document_reports_pages_as_they_settle(monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr_cache, "_cache", OcrCache(str(tmp_path), max_bytes=1_000_000, max_entries=100))
+    pdf_bytes = build_pdf(3, native_pages=(1,))
+    monkeypatch.setattr(ocr_service, "get_textract_client", lambda: FakeTextract(pdf_bytes))
+    reports, cached_reports = [], []
+
+    ocr_service.ocr_document(pdf_bytes, on_page=reports.append)
+    ocr_service.ocr_document(pdf_bytes, on_page=cached_reports.append)
+
+    # The native page is known before Textract answers
+    assert (reports[0]["page"], reports[0]["source"]) == (2, "native")
+    assert sorted((r["page"], r["source"]) for r in reports[1:]) == [(1, "textract"), (3, "textract")]
+    assert all(r["page_count"] == 3 and r["chars"] > 0 and not r["cached"] for r in reports)
+    assert [(r["page"], r["cached"]) for r in cached_reports] == [(1, True), (2, True), (3, True)]
+
+def test_rasterize_page_adapts_resolution_and_colorspace():
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Letra pequeña", fontsize=3)
+    page = doc.new_page()
+    page.draw_rect(fitz.Rect(72, 72, 400, 300), color=None, fill=(0.2, 0.3, 0.9))
+    page.insert_text((90, 200), "Sello", fontsize=40, color=(0.9, 0.1, 0.1))
+
+    small_print = fitz.Pixmap(ocr_service._rasterize_page(doc, 0))
+    stamp = fitz.Pixmap(ocr_service._rasterize_page(doc, 1))
+
+    # Grayscale at the maximum dpi for tiny print, color at the minimum for large text
+    assert small_print.n == 1 and abs(small_print.width - 595 * 300 / 72) <= 1
+    assert stamp.n == 3 and abs(stamp.width - 595 * 100 / 72) <= 1
+
+def test_rasterize_page_stays_under_byte_limit(monkeypatch):
+    monkeypatch.setenv("OCR_TEXTRACT_MAX_BYTES", "20000")
+    doc = fitz.open()
+    page = doc.new_page()
+    noise = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 600, 800), False)
+    noise.set_rect(noise.irect, (128,))
+    for x in range(0, 600, 3):
+        noise.set_rect(fitz.IRect(x, 0, x + 1, 800), ((x * 7) % 256,))
+    page.insert_image(page.rect, pixmap=noise)
+
+    assert len(ocr_service._rasterize_page(doc, 0)) <= 20000
+
+def test_large_pdfs_use_an_async_job(monkeypatch):
+    monkeypatch.setenv("OCR_ASYNC_MIN_PAGES", "3")
+    pdf_bytes = build_pdf(3, native_pages=(0,))
+    jobs = []
+
+    class FakeBackend:
+        def detect_document_text(self, document):
+            jobs.append(document)
+            return {2: [{"BlockType": "LINE", "Text": "Texto 2"}], 3: [{"BlockType": "LINE", "Text": "Texto 3"}]}
+
+    monkeypatch.setattr(ocr_service, "get_async_textract_backend", lambda: FakeBackend())
+
+    result = ocr_service._process_multipage_document(None, pdf_bytes)
+
+    assert jobs == [pdf_bytes]
+    assert [page["source"] for page in result["pages"]] == ["native", "textract", "textract"]
+    assert result["lines"][2:] == ["[Page 2]", "Texto 2", "[Page 3]", "Texto 3"]
+
+def test_timed_out_async_job_does_not_fall_back(monkeypatch):
+    monkeypatch.setenv("OCR_ASYNC_MIN_PAGES", "2")
+    pdf_bytes = build_pdf(2)
+
+    class SlowBackend:
+        def detect_document_text(self, document):
+            raise TimeoutError("Textract job job-1 still running after 120s")
+
+    monkeypatch.setattr(ocr_service, "get_async_textract_backend", lambda: SlowBackend())
+
+    # The request has run out of time: no per-page or whole-document Textract calls follow
+    with pytest.raises(TimeoutError):
+        ocr_service._process_multipage_document(None, pdf_bytes)
+
+def text_image(width=1200, height=1500, angle=0.0) -> Image.Image:
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=24)
+    for i in range(30):
+        draw.text((100, 100 + i * 40), f"Factura folio A17 concepto cantidad importe total {i}", fill=0, font=font)
+    return img.rotate(angle, fillcolor=255)
+
+def encoded(img, image_format="PNG", **params) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format=image_format, **params)
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("skew", [0, 2, -3.5])
+def test_deskew_angle_undoes_the_skew(skew):
+    assert ocr_service._deskew_angle(text_image(angle=skew)) == -skew
+
+def test_preprocess_image_rotates_downscales_and_binarizes(monkeypatch):
+    monkeypatch.setenv("OCR_IMAGE_MAX_SIDE_PX", "1000")
+    monkeypatch.setenv("OCR_PREPROCESS_BINARIZE", "true")
+    exif = Image.Exif()
+    exif[ocr_service.EXIF_ORIENTATION] = 6
+    # Landscape pixels of a photo taken upright
+    photo = encoded(text_image().rotate(90, expand=True).convert("RGB"), "JPEG", exif=exif)
+
+    result = Image.open(io.BytesIO(ocr_service.preprocess_image(photo)))
+
+    assert result.height == 1000 and result.width < 1000
+    assert result.mode == "1"
+
+def test_preprocess_image_leaves_clean_or_unreadable_images_alone():
+    clean = encoded(text_image())
+
+    assert ocr_service.preprocess_image(clean) is clean
+    assert ocr_service.preprocess_image(b"not an image") == b"not an image"
+
+def test_rasterization_falls_back_to_this_thread_when_the_pool_breaks(monkeypatch):
+    pdf_bytes = build_pdf(3)
+    client = FakeTextract(pdf_bytes)
+    discarded = []
+
+    class BrokenPool:
+        def submit(self, fn, data):
+            future = Future()
+            future.set_exception(BrokenProcessPool("worker died"))
+            return future
+
+    pool = BrokenPool()
+    monkeypatch.setattr(ocr_service, "get_preprocess_pool", lambda: pool)
+    monkeypatch.setattr(ocr_service, "discard_process_pool", lambda name, broken=None: discarded.append((name, broken)))
+
+    result = ocr_service._process_multipage_document(client, pdf_bytes)
+
+    assert result["lines"] == [line for i in range(1, 4) for line in (f"[Page {i}]", f"Texto {i}")]
+    # Only the pool that ran the failed work is discarded, never a newer one
+    assert discarded == [("ocr_preprocessing", pool)] * 3
+
+class ShutDownPool:
+    def submit(self, fn, data):
+        raise RuntimeError("cannot schedule new futures after shutdown")
+
+class CancellingPool:
+    def submit(self, fn, data):
+        future = Future()
+        future.cancel()
+        return future
+
+@pytest.mark.parametrize("pool", [ShutDownPool(), CancellingPool()], ids=["shut_down", "cancelled"])
+def test_rasterization_falls_back_to_this_thread_when_another_request_discards_the_pool(monkeypatch, pool):
+    pdf_bytes = build_pdf(3)
+    client = FakeTextract(pdf_bytes)
+    monkeypatch.setattr(ocr_service, "get_preprocess_pool", lambda: pool)
+    monkeypatch.setattr(ocr_service, "CANCELLED_PREPROCESS_POLL_SECONDS", 0.01)
+
+    result = ocr_service._process_multipage_document(client, pdf_bytes)
+
+    assert result["lines"] == [line for i in range(1, 4) for line in (f"[Page {i}]", f"Texto {i}")]
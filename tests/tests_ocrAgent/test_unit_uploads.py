@@ -0,0 +1,51 @@
+import hashlib
+import io
+from typing import List
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from src.middleware import RequestSizeLimitMiddleware
+from src.services.upload_spool import spool_upload
+from tests.tests_ocrAgent.test_unit_ocr_service import build_pdf
+
+@pytest.mark.asyncio
+async def test_spool_upload_hashes_and_maps_pdfs():
+    pdf_bytes = build_pdf(2)
+    upload = await spool_upload(UploadFile(io.BytesIO(pdf_bytes), filename="doc.pdf"), max_bytes=len(pdf_bytes))
+
+    assert upload.size == len(pdf_bytes) and upload.is_pdf
+    assert upload.sha256 == hashlib.sha256(pdf_bytes).hexdigest()
+    with upload.buffer() as data:
+        assert isinstance(data, memoryview) and data == pdf_bytes
+    upload.close()
+    assert upload.file.closed
+
+@pytest.mark.asyncio
+async def test_spool_upload_rejects_oversized_and_empty_files():
+    with pytest.raises(ValueError, match="limit"):
+        await spool_upload(UploadFile(io.BytesIO(b"x" * 2048), filename="big.png"), max_bytes=1024)
+    with pytest.raises(ValueError, match="Empty"):
+        await spool_upload(UploadFile(io.BytesIO(b""), filename="empty.png"), max_bytes=1024)
+
+def test_request_size_limit_middleware():
+    app = FastAPI()
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=1024, path_prefixes=("/ocragent/",))
+
+    @app.post("/ocragent/upload")
+    async def upload(files: List[UploadFile] = File(...)):
+        return {"files": len(files)}
+
+    client = TestClient(app)
+    assert client.post("/ocragent/upload", files=[("files", ("a.png", b"x" * 100))]).status_code == 200
+    assert client.post("/ocragent/upload", files=[("files", ("a.png", b"x" * 2048))]).status_code == 413
+
+    # Without a Content-Length the body is counted as it streams in
+    def chunks():
+        yield b"--b\r\nContent-Disposition: form-data; name=\"files\"; filename=\"a.png\"\r\n\r\n"
+        for _ in range(4):
+            yield b"x" * 512
+        yield b"\r\n--b--\r\n"
+    response = client.post("/ocragent/upload", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
@@ -0,0 +1,136 @@
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+from src.services.text_chunking import estimate_tokens
+from src.routers.scrap_agent import router as scrap_router
+from src.routers.auth_route import get_current_user
+from src.nodes.scrap_news_node import scrap_article, select_summary_type, fetch_page, condense_documents, build_comparative_prompt
+
+def make_response(status_code=200, content=b""):
+    response = MagicMock()
+    response.status_code = status_code
+    response.iter_content.return_value = [content]
+    response.__enter__.return_value = response
+    return response
+
+PAGES = {
+    "https://example.com/a": make_response(content=b"<html><title>Title A</title><article>Body A</article></html>"),
+    "https://example.com/b": make_response(status_code=404),
+    "https://example.com/c": make_response(content=b"<html><title>Title C</title><article>Body C</article></html>"),
+}
+
+@pytest.fixture
+def scraper_state():
+    return {"url": list(PAGES), "title": "", "titles": [], "text": [], "errors": [], "summary": ""}
+
+@patch("src.nodes.scrap_news_node.get_scrap_session")
+def test_scrap_article_keeps_partial_successes(mock_session, scraper_state):
+    mock_session.return_value.get.side_effect = lambda url, **kwargs: PAGES[url]
+
+    updated_state = scrap_article(scraper_state)
+
+    assert updated_state["titles"] == ["Title A", "Title C"]
+    assert updated_state["text"] == ["Body A", "Body C"]
+    assert updated_state["errors"] == [{"url": "https://example.com/b", "error": "Request failed with status code 404"}]
+    assert select_summary_type(updated_state) == "comparative"
+
+@patch("src.nodes.scrap_news_node.get_scrap_session")
+def test_fetch_page_enforces_deadline(mock_session):
+    def slow_chunks(chunk_size):
+        for _ in range(3):
+            time.sleep(0.05)
+            yield b"x"
+
+    response = make_response()
+    response.iter_content.side_effect = slow_chunks
+    mock_session.return_value.get.return_value = response
+
+    with pytest.raises(TimeoutError):
+        fetch_page("https://example.com/slow", deadline_seconds=0.01)
+
+# Test map-reduce summarization
+@patch("src.nodes.scrap_news_node.get_llm")
+def test_condense_documents_reduces_only_long_documents(mock_get_llm, monkeypatch):
+    monkeypatch.setenv("SCRAP_CHUNK_TOKENS", "100")
+    monkeypatch.setenv("SCRAP_REDUCE_FAN_IN", "2")
+    mock_get_llm.return_value = FakeListChatModel(responses=["- nota"])
+    long_text = "\n".join(f"Párrafo {i} " + "x" * 200 for i in range(20))
+
+    condensed = condense_documents(["Largo", "Corto"], [long_text, "Texto corto"], target_tokens=20)
+
+    assert condensed[1] == "Texto corto"
+    assert condensed[0].startswith("- nota")
+    assert estimate_tokens(condensed[0]) <= 20
+
+@patch("src.nodes.scrap_news_node.get_llm")
+def test_condense_documents_skips_the_llm_for_short_documents(mock_get_llm):
+    assert condense_documents(["Corto"], ["Texto corto"], target_tokens=20) == ["Texto corto"]
+    mock_get_llm.assert_not_called()
+
+@patch("src.nodes.scrap_news_node.get_llm")
+def test_condense_documents_keeps_raw_text_when_a_chunk_call_fails(mock_get_llm, monkeypatch):
+    monkeypatch.setenv("SCRAP_CHUNK_TOKENS", "600")
+    def throttled(prompt):
+        raise RuntimeError("ThrottlingException")
+    mock_get_llm.return_value = RunnableLambda(throttled)
+    long_text = "\n".join(f"Párrafo {i} " + "x" * 200 for i in range(20))
+
+    condensed = condense_documents(["Largo"], [long_text], target_tokens=200)
+
+    assert condensed[0].startswith("Párrafo 0")
+    assert "Párrafo 1" in condensed[0]
+    assert estimate_tokens(condensed[0]) <= 200
+
+@patch("src.nodes.scrap_news_node.get_llm")
+def test_comparative_prompt_labels_every_source(mock_get_llm):
+    state = {"url": [], "title": "T0", "titles": ["T0", "T1", "T2"], "text": ["uno", "dos", "tres"], "errors": [], "summary": ""}
+
+    prompt = build_comparative_prompt(state)
+
+    assert "3 documentos" in prompt
+    assert "Documento C [Fuente C] - T2:\ntres" in prompt
+    assert select_summary_type(state) == "comparative"
+    mock_get_llm.return_value.batch.assert_not_called()
+
+# Test SSE streaming endpoint
+@patch("src.nodes.scrap_news_node.get_llm")
+@patch("src.routers.scrap_agent.get_llm")
+@patch("src.nodes.scrap_news_node.get_scrap_session")
+def test_scrap_stream_emits_progress_then_tokens(mock_session, mock_get_llm, mock_condense_llm):
+    mock_session.return_value.get.side_effect = lambda url, **kwargs: PAGES[url]
+    mock_get_llm.return_value = FakeListChatModel(responses=["## Resumen"])
+    mock_condense_llm.return_value = FakeListChatModel(responses=["- nota"])
+    app = FastAPI()
+    app.include_router(scrap_router, prefix="/scrapagent")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(username="tester")
+
+    response = TestClient(app).post("/scrapagent/scrap/stream", json={"urls": ["https://example.com/a", "https://example.com/b"]})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    payloads = [line[len("data: "):] for line in response.text.split("\n\n") if line]
+    assert payloads[-1] == "[DONE]"
+    events = [json.loads(payload) for payload in payloads[:-1]]
+    assert {event["type"] for event in events[:2]} == {"fetched", "fetch_error"}
+    assert "".join(event["content"] for event in events if event["type"] == "token") == "## Resumen"
+    assert events[-1] == {"type": "done", "errors": [{"url": "https://example.com/b", "error": "Request failed with status code 404"}]}
+
+@patch("src.routers.scrap_agent.scrap_urls", side_effect=RuntimeError("session setup failed"))
+def test_scrap_stream_ends_when_scraping_fails(mock_scrap_urls):
+    app = FastAPI()
+    app.include_router(scrap_router, prefix="/scrapagent")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(username="tester")
+
+    response = TestClient(app).post("/scrapagent/scrap/stream", json={"urls": ["https://example.com/a"]})
+
+    payloads = [line[len("data: "):] for line in response.text.split("\n\n") if line]
+    assert json.loads(payloads[0]) == {"type": "error", "message": "Error scraping URLs: session setup failed"}
+    assert payloads[-1] == "[DONE]"
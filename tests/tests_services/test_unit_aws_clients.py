@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.metrics import metrics
+from src.services import aws_clients
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    aws_clients.reset_clients()
+    yield
+    aws_clients.reset_clients()
+
+@patch("src.services.aws_clients.boto3.Session")
+def test_textract_client_is_created_once(mock_session, monkeypatch):
+    monkeypatch.setenv("OCR_TEXTRACT_CONCURRENCY", "6")
+    monkeypatch.setenv("OCR_EXECUTOR_WORKERS", "2")
+    setups_before = metrics.snapshot().get("textract_client_setup_seconds", {}).get("count", 0)
+
+    first = aws_clients.get_textract_client()
+    second = aws_clients.get_textract_client()
+
+    assert first is second
+    assert mock_session.return_value.client.call_count == 1
+    config = mock_session.return_value.client.call_args.kwargs["config"]
+    assert config.max_pool_connections == 8
+    assert config.retries["mode"] == "adaptive"
+    assert metrics.snapshot()["textract_client_setup_seconds"]["count"] == setups_before + 1
+
+@patch("src.services.aws_clients.boto3.Session")
+def test_local_textract_replaces_the_aws_client(mock_session, monkeypatch):
+    monkeypatch.setenv("OCR_TEXTRACT_LOCAL", "true")
+    monkeypatch.setenv("OCR_TEXTRACT_LOCAL_LATENCY_MS", "0")
+
+    client = aws_clients.get_textract_client()
+
+    assert client.latency_ms == 0
+    assert not mock_session.called
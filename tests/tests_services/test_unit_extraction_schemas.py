@@ -0,0 +1,43 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.extraction_schemas import SchemaRegistry
+
+INVOICE = json.dumps({"folio": ["str", True, "Invoice number"], "total": ["float", False, "Total amount"]})
+
+def test_stored_schemas_compile_once_per_version():
+    registry = SchemaRegistry()
+    esquema = SimpleNamespace(id=7, schema_data=INVOICE)
+
+    first = registry.compile_stored(esquema)
+    assert registry.compile_stored(esquema) is first
+    assert set(first.model.model_fields) == {"folio", "total"}
+    assert "folio" in first.prompt.partial_variables["format_instructions"]
+
+    # An edited schema is a new version even without an explicit invalidation
+    esquema.schema_data = json.dumps({"folio": ["str", True, "Invoice number"]})
+    edited = registry.compile_stored(esquema)
+    assert edited is not first and set(edited.model.model_fields) == {"folio"}
+
+    registry.invalidate(7)
+    assert registry.compile_stored(esquema) is not edited
+
+def test_inline_schemas_are_keyed_by_content():
+    registry = SchemaRegistry(max_entries=1)
+    compiled = registry.compile_inline(INVOICE)
+
+    assert registry.compile_inline(json.dumps(json.loads(INVOICE), indent=2)) is compiled
+    assert set(compiled.partial.model.model_fields) == {"folio", "total"}
+    assert compiled.partial.model.model_fields["folio"].is_required() is False
+
+    registry.compile_inline(json.dumps({"rfc": ["str", False, "RFC"]}))
+    assert registry.compile_inline(INVOICE) is not compiled
+
+def test_invalid_schemas_raise():
+    registry = SchemaRegistry()
+    with pytest.raises(ValueError):
+        registry.compile_inline("[1, 2]")
+    with pytest.raises(ValueError):
+        registry.compile_inline(json.dumps({"folio": ["str"]}))
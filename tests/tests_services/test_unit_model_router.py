@@ -0,0 +1,43 @@
+import pytest
+
+from src.services.model_router import ModelRouter
+
+class StubConfigLoader:
+    def load_model_routing(self):
+        return {
+            "tiers": {
+                "light": {"env": "LIGHT_MODEL", "fallback_tiers": ["heavy"]},
+                "heavy": {"env": "REASONING_MODEL", "fallback_tiers": []}
+            },
+            "default_tier": "heavy",
+            "tasks": {
+                "select_top_urls": {"tier": "light"},
+                "state_of_art": {"tier": "heavy"}
+            }
+        }
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setenv("REASONING_MODEL", "big-model")
+    monkeypatch.setenv("LIGHT_MODEL", "small-model")
+    monkeypatch.delenv("MODEL_SELECT_TOP_URLS", raising=False)
+    return ModelRouter(StubConfigLoader())
+
+def test_light_task_uses_light_model_with_heavy_fallback(router):
+    assert router.get_model_id("select_top_urls") == "small-model"
+    assert router.get_fallback_model_ids("select_top_urls") == ["big-model"]
+
+def test_heavy_and_unknown_tasks_use_reasoning_model(router):
+    assert router.get_model_id("state_of_art") == "big-model"
+    assert router.get_fallback_model_ids("state_of_art") == []
+    assert router.get_model_id("not_configured") == "big-model"
+
+def test_light_tier_defaults_to_reasoning_model(router, monkeypatch):
+    monkeypatch.delenv("LIGHT_MODEL")
+    assert router.get_model_id("select_top_urls") == "big-model"
+    assert router.get_fallback_model_ids("select_top_urls") == []
+
+def test_task_override_from_environment(router, monkeypatch):
+    monkeypatch.setenv("MODEL_SELECT_TOP_URLS", "pinned-model")
+    assert router.get_model_id("select_top_urls") == "pinned-model"
+    assert router.get_fallback_model_ids("select_top_urls") == ["small-model", "big-model"]
@@ -0,0 +1,13 @@
+from src.services.process_pool import discard_process_pool, get_process_pool
+
+def test_discarding_a_stale_pool_keeps_the_newer_one():
+    stale = get_process_pool("test_pool", 1)
+    discard_process_pool("test_pool", stale)
+    fresh = get_process_pool("test_pool", 1)
+
+    # A second request that also saw the stale pool fail must not discard the fresh one
+    discard_process_pool("test_pool", stale)
+
+    assert fresh is not stale
+    assert get_process_pool("test_pool", 1) is fresh
+    discard_process_pool("test_pool")
@@ -0,0 +1,139 @@
+import fitz
+import pytest
+
+from src.services import aws_clients, ocr_service, textract_async, textract_local
+from src.services.textract_async import AsyncTextractBackend
+from src.services.textract_local import LocalTextract
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = Body
+
+    def delete_object(self, Bucket, Key):
+        del self.objects[(Bucket, Key)]
+
+class FakeTextractJobs:
+    """Reports IN_PROGRESS a few times, then returns results in two pages."""
+
+    def __init__(self, polls_in_progress=2, status="SUCCEEDED"):
+        self.polls_in_progress = polls_in_progress
+        self.status = status
+        self.started = []
+
+    def start_document_text_detection(self, DocumentLocation):
+        self.started.append(DocumentLocation["S3Object"])
+        return {"JobId": "job-1"}
+
+    def get_document_text_detection(self, JobId, NextToken=None):
+        if self.polls_in_progress:
+            self.polls_in_progress -= 1
+            return {"JobStatus": "IN_PROGRESS"}
+        if NextToken is None:
+            return {"JobStatus": self.status, "StatusMessage": "boom", "NextToken": "t1", "Blocks": [
+                {"BlockType": "LINE", "Text": "Uno", "Page": 1},
+                {"BlockType": "LINE", "Text": "Dos", "Page": 2},
+            ]}
+        return {"JobStatus": self.status, "Blocks": [{"BlockType": "LINE", "Text": "Tres", "Page": 2}]}
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(textract_async.time, "sleep", delays.append)
+    return delays
+
+def test_async_job_polls_with_backoff_and_paginates(sleeps):
+    s3, textract = FakeS3(), FakeTextractJobs(polls_in_progress=3)
+    backend = AsyncTextractBackend(textract, s3, "bucket", poll_seconds=0.5, max_poll_seconds=1.5)
+
+    blocks = backend.detect_document_text(b"%PDF")
+
+    assert {page: [block["Text"] for block in page_blocks] for page, page_blocks in blocks.items()} == {1: ["Uno"], 2: ["Dos", "Tres"]}
+    assert sleeps == [0.5, 1.0, 1.5]
+    assert textract.started[0]["Bucket"] == "bucket" and textract.started[0]["Name"].startswith("ocr-jobs/")
+    assert s3.objects == {}
+
+def test_failed_async_job_raises_and_cleans_up(sleeps):
+    s3 = FakeS3()
+    backend = AsyncTextractBackend(FakeTextractJobs(status="FAILED"), s3, "bucket")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        backend.detect_document_text(b"%PDF")
+    assert s3.objects == {}
+
+def test_async_job_times_out(sleeps):
+    backend = AsyncTextractBackend(FakeTextractJobs(polls_in_progress=100), FakeS3(), "bucket", poll_seconds=1, timeout_seconds=0)
+
+    with pytest.raises(TimeoutError):
+        backend.detect_document_text(b"%PDF")
+
+def test_async_job_against_moto(monkeypatch):
+    moto = pytest.importorskip("moto")
+    import boto3
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+    with moto.mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="ocr-staging")
+        backend = AsyncTextractBackend(boto3.client("textract", region_name="us-east-1"), s3, "ocr-staging", poll_seconds=0)
+
+        blocks = backend.detect_document_text(b"%PDF-1.4 test")
+
+        assert isinstance(blocks, dict)
+        assert s3.list_objects_v2(Bucket="ocr-staging").get("KeyCount", 0) == 0
+
+def test_job_timeout_is_capped_at_the_request_timeout(monkeypatch):
+    monkeypatch.setenv("OCR_TEXTRACT_LOCAL", "true")
+    monkeypatch.setenv("OCR_ASYNC_S3_BUCKET", "ocr-staging")
+    monkeypatch.setenv("OCR_ASYNC_JOB_TIMEOUT_SECONDS", "300")
+    monkeypatch.setenv("OCR_TIMEOUT_SECONDS", "120")
+    aws_clients.reset_clients()
+
+    assert textract_async.get_async_textract_backend().timeout_seconds == 120
+    aws_clients.reset_clients()
+
+def text_pdf(pages):
+    doc = fitz.open()
+    for lines in pages:
+        page = doc.new_page()
+        for i, line in enumerate(lines):
+            page.insert_text((72, 72 + 20 * i), line)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+def test_async_job_against_the_local_stand_in(monkeypatch):
+    monkeypatch.setattr(textract_local, "JOB_RESULTS_PER_PAGE", 5)
+    client = LocalTextract(latency_ms=20, jitter_ms=0, ms_per_mb=0)
+    backend = AsyncTextractBackend(client, client.s3, "ocr-staging", poll_seconds=0.01)
+
+    blocks = backend.detect_document_text(text_pdf([["Folio A17", "Total 100"], ["Pagina dos"]]))
+
+    assert {page: ocr_service._lines_from_blocks([b for b in page_blocks if b["BlockType"] == "LINE"]) for page, page_blocks in blocks.items()} == {
+        1: ["Folio A17", "Total 100"], 2: ["Pagina dos"]
+    }
+    # Polled while IN_PROGRESS, then paged through the results 5 blocks at a time
+    assert client.stats["calls"] > 1 + 3
+    assert client.s3.list_objects_v2(Bucket="ocr-staging")["KeyCount"] == 0
+
+def test_large_pdfs_run_an_async_job_on_the_local_stand_in(monkeypatch):
+    monkeypatch.setenv("OCR_TEXTRACT_LOCAL", "true")
+    monkeypatch.setenv("OCR_TEXTRACT_LOCAL_LATENCY_MS", "5")
+    monkeypatch.setenv("OCR_ASYNC_S3_BUCKET", "ocr-staging")
+    monkeypatch.setenv("OCR_ASYNC_MIN_PAGES", "2")
+    monkeypatch.setenv("OCR_ASYNC_POLL_SECONDS", "0.01")
+    aws_clients.reset_clients()
+    client = aws_clients.get_textract_client()
+    pdf_bytes = text_pdf([["Factura 1: concepto, cantidad, importe y total a pagar"], []])
+
+    result = ocr_service._process_multipage_document(client, pdf_bytes)
+
+    assert [page["source"] for page in result["pages"]] == ["native", "textract"]
+    assert len(client._jobs) == 1
+    assert aws_clients.get_s3_client() is client.s3
+    assert client.s3.objects == {}
+    aws_clients.reset_clients()
@@ -0,0 +1,91 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.services import ocr_service
+from src.services.textract_forms import field_aliases, key_values_from_blocks, match_form_fields, normalize_key
+from src.services.textract_local import LocalTextract
+
+def word(block_id, text):
+    return {"BlockType": "WORD", "Id": block_id, "Text": text}
+
+def cell(block_id, row, column, child, confidence=99):
+    return {"BlockType": "CELL", "Id": block_id, "RowIndex": row, "ColumnIndex": column, "Confidence": confidence,
+            "Relationships": [{"Type": "CHILD", "Ids": [child]}]}
+
+class Invoice(BaseModel):
+    folio: str = Field(..., description="Número de factura (folio)")
+    total: Optional[float] = Field(None, description="Importe total a pagar o total")
+    fecha_emision: Optional[str] = Field(None, description="Fecha de emisión")
+    conceptos: List[str] = Field(default_factory=list, description="Conceptos facturados")
+
+def test_normalized_keys_and_aliases():
+    assert normalize_key("Fecha de Emisión:") == "fecha de emision"
+    assert normalize_key("fechaEmision") == "fecha emision"
+    assert field_aliases("total", "Importe total a pagar o total, en pesos mexicanos de la factura") == ["total", "importe total a pagar"]
+
+def test_key_values_from_forms_and_tables():
+    blocks = [
+        word("w1", "Folio:"), word("w2", "A17"), word("w3", "Concepto"), word("w4", "Litros"), word("w5", "Magna"), word("w6", "40"),
+        {"BlockType": "SELECTION_ELEMENT", "Id": "s1", "SelectionStatus": "SELECTED"}, word("w7", "Pagado"),
+        {"BlockType": "KEY_VALUE_SET", "Id": "k1", "EntityTypes": ["KEY"], "Confidence": 95,
+         "Relationships": [{"Type": "VALUE", "Ids": ["v1"]}, {"Type": "CHILD", "Ids": ["w1"]}]},
+        {"BlockType": "KEY_VALUE_SET", "Id": "v1", "EntityTypes": ["VALUE"], "Confidence": 80,
+         "Relationships": [{"Type": "CHILD", "Ids": ["w2"]}]},
+        {"BlockType": "KEY_VALUE_SET", "Id": "k2", "EntityTypes": ["KEY"], "Confidence": 99,
+         "Relationships": [{"Type": "VALUE", "Ids": ["v2"]}, {"Type": "CHILD", "Ids": ["w7"]}]},
+        {"BlockType": "KEY_VALUE_SET", "Id": "v2", "EntityTypes": ["VALUE"], "Confidence": 99,
+         "Relationships": [{"Type": "CHILD", "Ids": ["s1"]}]},
+        {"BlockType": "TABLE", "Id": "t1", "Relationships": [{"Type": "CHILD", "Ids": ["c1", "c2", "c3", "c4", "c5", "c6"]}]},
+        cell("c1", 1, 1, "w3"), cell("c2", 1, 2, "w4"), cell("c3", 1, 3, "w4"),
+        cell("c4", 2, 1, "w5"), cell("c5", 2, 2, "w6"), cell("c6", 2, 3, "w6", confidence=70),
+    ]
+
+    assert key_values_from_blocks(blocks) == [
+        {"key": "Folio:", "value": "A17", "confidence": 80},
+        {"key": "Pagado", "value": "true", "confidence": 99},
+        {"key": "Concepto", "value": "Magna", "confidence": 99},
+        {"key": "Litros", "value": "40", "confidence": 99},
+        {"key": "Litros", "value": "40", "confidence": 70},
+    ]
+
+def test_form_fields_are_matched_by_alias_type_and_confidence():
+    key_values = [
+        {"key": "No. de factura", "value": "A17", "confidence": 99},
+        {"key": "Subtotal", "value": "$1,000.00", "confidence": 99},
+        {"key": "Total a pagar:", "value": "sin dato", "confidence": 99},
+        {"key": "TOTAL", "value": "$1,160.00", "confidence": 97},
+        {"key": "Fecha de emisión", "value": "2024-03-15", "confidence": 60},
+        {"key": "Conceptos facturados", "value": ["Magna", "Premium"], "confidence": 95},
+    ]
+
+    confident, uncertain = match_form_fields(Invoice, key_values, min_confidence=90)
+
+    assert confident == {"total": 1160.0, "conceptos": ["Magna", "Premium"]}
+    assert uncertain == {"fecha_emision": "2024-03-15"}
+
+def test_look_alike_labels_are_never_confident():
+    class Bill(BaseModel):
+        fecha: Optional[str] = Field(None, description="Fecha de emision")
+        total: Optional[float] = Field(None, description="Total")
+
+    confident, uncertain = match_form_fields(Bill, [
+        {"key": "Fecha de vencimiento:", "value": "2026-01-01", "confidence": 99},
+        {"key": "Subtotal IVA total:", "value": "16.00", "confidence": 99},
+    ], min_confidence=90)
+
+    assert confident == {}
+    assert uncertain == {"fecha": "2026-01-01", "total": 16.0}
+
+def test_analyze_document_key_values_reach_the_ocr_result(monkeypatch):
+    monkeypatch.setenv("OCR_TEXTRACT_FEATURES", "FORMS,TABLES")
+    monkeypatch.setenv("OCR_CACHE_ENABLED", "false")
+    client = LocalTextract(latency_ms=0, jitter_ms=0, ms_per_mb=0)
+    client.register_fixture(b"scan", ["FACTURA", "Folio: A17", "Total: $1,160.00"])
+    monkeypatch.setattr(ocr_service, "get_textract_client", lambda: client)
+
+    result = ocr_service.ocr_document(b"scan")
+
+    assert [(pair["key"], pair["value"], pair["page"]) for pair in result["key_values"]] == [
+        ("Folio:", "A17", 1), ("Total:", "$1,160.00", 1)
+    ]
@@ -0,0 +1,36 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from src.services import textract_local
+from src.services.ocr_service import _lines_from_blocks
+from src.services.textract_local import LocalTextract
+
+def test_blocks_are_shaped_like_textract():
+    client = LocalTextract(latency_ms=0, jitter_ms=0, ms_per_mb=0)
+    client.register_fixture(b"doc", ["Folio A17", "Total 100"])
+
+    response = client.detect_document_text(Document={"Bytes": b"doc"})
+
+    blocks = response["Blocks"]
+    assert [block["BlockType"] for block in blocks] == ["PAGE", "LINE", "WORD", "WORD", "LINE", "WORD", "WORD"]
+    assert [block["Text"] for block in blocks if block["BlockType"] == "LINE"] == ["Folio A17", "Total 100"]
+    assert blocks[0]["Relationships"][0]["Ids"] == [blocks[1]["Id"], blocks[4]["Id"]]
+    assert set(blocks[2]["Geometry"]["BoundingBox"]) == {"Left", "Top", "Width", "Height"}
+
+def test_unknown_documents_get_deterministic_filler():
+    client = LocalTextract(latency_ms=0, jitter_ms=0, ms_per_mb=0)
+
+    first = client.detect_document_text(Document={"Bytes": b"scan"})
+    second = client.detect_document_text(Document={"Bytes": b"scan"})
+
+    assert _lines_from_blocks(first["Blocks"]) == _lines_from_blocks(second["Blocks"])
+    assert client.stats["calls"] == 2
+
+def test_calls_over_the_rate_limit_are_throttled(monkeypatch):
+    monkeypatch.setattr(textract_local.time, "sleep", lambda seconds: None)
+    client = LocalTextract(latency_ms=0, jitter_ms=0, ms_per_mb=0, tps=1, max_attempts=2)
+    client.detect_document_text(Document={"Bytes": b"one"})
+
+    with pytest.raises(ClientError, match="ThrottlingException"):
+        client.detect_document_text(Document={"Bytes": b"two"})
+    assert client.stats == {"calls": 1, "throttled": 2, "failed": 1, "max_active": 1}